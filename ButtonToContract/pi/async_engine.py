@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+asyncio runtime for the toggle app (ENGINE=async in .env).
+
+Everything runs as tasks on one event loop with an AsyncWeb3:
+
+  button    gestures from the line's event fd (EdgeButton.wait_gesture_async),
+            or the blocking backend in a worker thread
+  presses   toggles in press order; in pipelined mode it only submits
+  tx-track  receipt polling and fee bumps (txpipe.AsyncTxPipeline)
+  follow    StateChanged log filter + periodic reconcile (AsyncStateFollower)
+  flicker   LED animation, started and cancelled around pending work
+
+A slow RPC only blocks the task awaiting it, and the LEDs are only written
+from the loop thread: cancelling the flicker task and then setting the final
+colour cannot interleave. Startup is ordered (seed state, start the tracker,
+then the tasks); shutdown cancels the task group, waits for every task to
+finish, closes the tracker, then hands back to the caller to release the
+hardware. Press-to-LED latency is measured per press and summarised at exit.
+"""
+import sys, asyncio, time
+from statefollow import state_from_receipt
+
+def _pct(xs, f):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(f * len(xs)))] if xs else float("nan")
+
+class ToggleEngine:
+    def __init__(self, contract, pipe, cache, follower, gpio, button, oled, stop_ev, pipelined=False,
+                 receipt_timeout_s=180, flicker_period_s=0.08, on_ready=None):
+        self.contract, self.pipe, self.cache, self.follower = contract, pipe, cache, follower
+        self.gpio, self.button, self.oled = gpio, button, oled
+        self.stop_ev = stop_ev  # set on shutdown, for a blocking button backend in its thread
+        self.pipelined = pipelined
+        self.receipt_timeout_s = receipt_timeout_s
+        self.flicker_period_s = flicker_period_s
+        self.on_ready = on_ready  # called once the state is shown and presses are accepted (boot report)
+        self.latencies = []  # press -> final LED colour, seconds
+        self._flicker = None
+        self._waiting = []  # press times not yet settled on the LED (pipelined)
+        cache.on_change = self._on_change
+
+    # ----- UI (loop thread only) -----
+    def show(self, state):
+        self.gpio.set_color("green" if state == "ON" else "red")
+        self.oled.center(state, "Press to toggle")
+        print(f"[STATE] {state}", flush=True)
+
+    def busy(self, on):
+        if on and self._flicker is None:
+            self._flicker = asyncio.get_running_loop().create_task(self._flicker_task(), name="flicker")
+        elif not on and self._flicker is not None:
+            self._flicker.cancel()  # its next step raises CancelledError; no more LED writes
+            self._flicker = None
+
+    async def _flicker_task(self):
+        while True:
+            self.gpio.set_color("red");   await asyncio.sleep(self.flicker_period_s)
+            self.gpio.set_color("green"); await asyncio.sleep(self.flicker_period_s)
+
+    def _on_change(self, state, source):
+        if source != "receipt" and self._flicker is None:
+            self.show(state)
+
+    def _settled(self, t_presses):
+        now = time.monotonic()
+        for t in t_presses:
+            self.latencies.append(now - t)
+        if t_presses:
+            print(f"[Latency] press→LED {(now - t_presses[-1]) * 1000:.0f}ms", flush=True)
+
+    # ----- tasks -----
+    async def _buttons(self, presses):
+        while True:
+            if hasattr(self.button, "wait_gesture_async") and hasattr(self.button.line, "event_get_fd"):
+                g = await self.button.wait_gesture_async()
+            else:
+                g = await asyncio.to_thread(self.button.wait_gesture)
+            if g is None:
+                return
+            presses.put_nowait((g, time.monotonic()))
+
+    async def _resync(self):
+        self.oled.center("Syncing…", "readState")
+        try:
+            await self.follower.reconcile()
+            self.show(self.cache.state)
+        except Exception as e:
+            self.oled.center("Error", "read failed")
+            print(f"[ERROR] readState: {e}", file=sys.stderr)
+
+    async def _toggle(self, t_press):
+        self.oled.center("Toggle")
+        self.busy(True)
+        final = None
+        try:
+            tx = await self.pipe.submit(timeout=self.receipt_timeout_s)
+            self.oled.center("Pending…", tx.tx_hash[:8] + "…")
+            rcpt = await tx.wait(self.receipt_timeout_s)
+            if rcpt.status != 1:
+                self.oled.center("Denied", "not owner?")
+            else:
+                s, pos = state_from_receipt(rcpt, self.contract.address)
+                if s is None:
+                    self.cache.snapshot(await self.follower.read_state_async(rcpt.blockNumber), rcpt.blockNumber, "receipt")
+                else:
+                    self.cache.apply(s, pos, "receipt")
+                final = self.cache.state
+        except Exception as e:
+            self.oled.center("Error", "toggle failed")
+            print(f"[ERROR] toggle: {e}", file=sys.stderr)
+        finally:
+            self.busy(False)
+        if final is not None:
+            self.show(final)
+            self._settled([t_press])
+        elif self.cache.state is not None:
+            self.gpio.set_color("green" if self.cache.state == "ON" else "red")
+
+    def _tx_done(self, tx):
+        # pipelined: called from the tracker task for every finished tx
+        if tx.error is not None:
+            print(f"[ERROR] tx nonce {tx.nonce}: {tx.error}", file=sys.stderr)
+        elif tx.receipt.status != 1:
+            print(f"[ERROR] tx nonce {tx.nonce} reverted (not owner?)", file=sys.stderr)
+        else:
+            self.cache.apply(*state_from_receipt(tx.receipt, self.contract.address), "receipt")
+        if len(self.pipe):
+            self.oled.center("Pending…", f"{len(self.pipe)} in flight")
+            return
+        self.busy(False)
+        if self.cache.state is not None:
+            self.show(self.cache.state)
+        self._settled(self._waiting); self._waiting = []
+
+    async def _presses(self, presses):
+        while True:
+            g, t_press = await presses.get()
+            if g == "long":
+                if not len(self.pipe):
+                    await self._resync()
+            elif not self.pipelined:
+                await self._toggle(t_press)
+            else:
+                self.busy(True)
+                try:
+                    tx = await self.pipe.submit(timeout=self.receipt_timeout_s)
+                    self._waiting.append(t_press)
+                    print(f"[TX] nonce {tx.nonce} {tx.tx_hash}", flush=True)
+                    self.oled.center("Pending…", f"{len(self.pipe)} in flight")
+                except Exception as e:
+                    print(f"[ERROR] toggle: {e}", file=sys.stderr)
+                    if not len(self.pipe):
+                        self.busy(False)
+                        self.oled.center("Error", "toggle failed")
+
+    async def run(self):
+        """Until cancelled (SIGINT/SIGTERM) or the button backend stops."""
+        self.oled.center("Starting", "connecting…")
+        try:
+            self.show(await self.follower.seed())
+        except Exception as e:
+            self.oled.center("Error", "read failed"); self.gpio.off()
+            print(f"[ERROR] initial readState: {e}", file=sys.stderr)
+        if self.pipelined:
+            self.pipe.on_done = self._tx_done
+        self.pipe.start()
+        presses = asyncio.Queue()
+        mode = f"pipelined, up to {self.pipe.max_inflight} in flight" if self.pipelined else "asyncio"
+        print(f"Ready ({mode}). Press button to toggle. Ctrl+C to exit.")
+        if self.on_ready is not None:
+            self.on_ready()
+        try:
+            async with asyncio.TaskGroup() as tg:
+                buttons = tg.create_task(self._buttons(presses), name="button")
+                work = tg.create_task(self._presses(presses), name="presses")
+                follow = tg.create_task(self.follower.run(), name="follow")
+                await buttons  # returns when the blocking backend sees stop_ev
+                work.cancel(); follow.cancel()
+        finally:
+            self.stop_ev.set()
+            self.busy(False)
+            await self.pipe.close()
+            print(f"[Tx] {self.pipe.stats()}")
+            if self.latencies:
+                print(f"[Latency] press→LED p50={_pct(self.latencies, .5) * 1000:.0f}ms "
+                      f"p95={_pct(self.latencies, .95) * 1000:.0f}ms n={len(self.latencies)}")
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Button input for the toggle app: edge events instead of 5 ms polling.
+
+PollButton is the original loop (sample get_value() every 5 ms, 60 ms
+stable-low debounce, report on release): about 200 wakeups/s all day and a
+press shorter than a sample period can fall between samples.
+
+EdgeButton requests the line with both-edge events (LINE_REQ_EV_BOTH_EDGES)
+and sleeps in event_wait() until the kernel reports an edge, waking only to
+check the stop flag every `idle_s`. Debouncing uses the kernel event
+timestamps: a press counts once the line has stayed down for `debounce_s`
+with no further edges (so glitches and short bounces are rejected, like
+before); a release is taken on its first edge and the bounces after it are
+ignored for `debounce_s`, so a press is reported as soon as the button is
+let go. Gestures:
+
+  press   released before long_s
+  long    held for long_s (reported while still held); 0 = off
+  double  a second press starting within double_s of the first release;
+          0 = off (then a press is reported without waiting for a second)
+
+EdgeButton.wait_gesture_async() is the same loop for asyncio: the line's
+event fd is watched by the event loop (no idle wakeups at all; shutdown
+cancels the task).
+
+Both classes take an injectable clock (and sleep for PollButton) so
+bench/bench_button.py can drive them from a scripted fake line on virtual
+time and count wakeups.
+"""
+import asyncio, time
+
+# gpiod v1 LineEvent.type values
+RISING_EDGE, FALLING_EDGE = 1, 2
+
+class PollButton:
+    def __init__(self, line, stop_ev, debounce_s=0.06, period_s=0.005, active_low=True,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.line, self.stop_ev = line, stop_ev
+        self.debounce_s, self.period_s = debounce_s, period_s
+        self.active_low = active_low
+        self.clock, self.sleep = clock, sleep
+        self.wakeups = 0
+        self.gesture = None
+
+    def pressed(self) -> bool:
+        return (self.line.get_value() == 0) == self.active_low
+
+    def _nap(self):
+        self.sleep(self.period_s)
+        self.wakeups += 1
+
+    def wait_gesture(self):
+        while not self.stop_ev.is_set():
+            if self.pressed():
+                t0 = self.clock()
+                ok = True
+                while self.clock() - t0 < self.debounce_s:
+                    if self.stop_ev.is_set(): return None
+                    if not self.pressed():
+                        ok = False; break
+                    self._nap()
+                if ok:
+                    while not self.stop_ev.is_set() and self.pressed():
+                        self._nap()
+                    self.gesture = "press"
+                    return self.gesture
+            self._nap()
+        return None
+
+    def wait_press(self) -> bool:
+        return self.wait_gesture() is not None
+
+class EdgeButton:
+    def __init__(self, line, stop_ev, debounce_s=0.06, long_s=0.0, double_s=0.0, active_low=True,
+                 idle_s=1.0, clock=time.monotonic):
+        self.line, self.stop_ev = line, stop_ev
+        self.debounce_s, self.long_s, self.double_s = debounce_s, long_s, double_s
+        self.active_low = active_low
+        self.idle_s = idle_s
+        self.clock = clock  # must match the event timestamps (CLOCK_MONOTONIC)
+        self.pressed = False  # debounced level
+        self.wakeups = self.edges = 0
+        self.gesture = None
+        self.t_gesture = None  # when the gesture physically completed (release edge / long_s reached)
+        self._raw = False
+        self._edge_t = None
+        self._settle_at = None  # quiet-period deadline after the last edge
+        self._t_down = None
+        self._long_fired = False
+        self._release_t = None  # first release of a possible double press
+        self._second = False
+
+    def _read(self):
+        if hasattr(self.line, "event_read_multiple"):
+            return self.line.event_read_multiple()
+        return [self.line.event_read()]
+
+    def _down(self, ev_type) -> bool:
+        return (ev_type == FALLING_EDGE) == self.active_low
+
+    def _settling_down(self) -> bool:
+        return self._settle_at is not None and self._raw
+
+    def _deadline(self):
+        ds = []
+        if self._settle_at is not None:
+            ds.append(self._settle_at)
+        if self.pressed and self.long_s and not self._long_fired:
+            ds.append(self._t_down + self.long_s)
+        if self._release_t is not None and not self._settling_down():
+            ds.append(self._release_t + self.double_s)
+        return min(ds) if ds else None
+
+    def _fire(self, gesture, t):
+        self.gesture, self.t_gesture = gesture, t
+        return gesture
+
+    def _released(self, t):
+        self.pressed = False
+        if self._long_fired:
+            return None
+        if self._second:
+            self._second = False
+            return self._fire("double", t)
+        if self.double_s > 0:
+            self._release_t = t
+            return None
+        return self._fire("press", t)
+
+    def _edge(self, down, t):
+        self.edges += 1
+        self._raw = down
+        if not down and self.pressed and self._settle_at is None:
+            # first release edge: act now, ignore the bounces that follow
+            self._settle_at = t + self.debounce_s
+            return self._released(t)
+        if self._settle_at is None:
+            self._edge_t = t
+        self._settle_at = t + self.debounce_s
+        return None
+
+    def _step(self, now):
+        if self._settle_at is not None and now >= self._settle_at:
+            t_last, self._settle_at = self._settle_at - self.debounce_s, None
+            if self._raw and not self.pressed:
+                t = self._edge_t
+                first, self._release_t = self._release_t, None
+                self.pressed, self._t_down, self._long_fired = True, t, False
+                self._second = first is not None and t - first < self.double_s
+                if first is not None and not self._second:
+                    return self._fire("press", first)
+            elif not self._raw and self.pressed:
+                g = self._released(t_last)  # release hidden inside a bounce burst
+                if g:
+                    return g
+        if self.pressed and self.long_s and not self._long_fired and now >= self._t_down + self.long_s:
+            self._long_fired, self._second = True, False
+            return self._fire("long", self._t_down + self.long_s)
+        if self._release_t is not None and now >= self._release_t + self.double_s and not self._settling_down():
+            # a second press still debouncing is decided when it settles
+            t, self._release_t = self._release_t, None
+            return self._fire("press", t)
+        return None
+
+    def wait_gesture(self):
+        """'press' / 'long' / 'double', or None once stop_ev is set."""
+        while not self.stop_ev.is_set():
+            dl = self._deadline()
+            timeout = self.idle_s if dl is None else max(0.0, min(self.idle_s, dl - self.clock()))
+            sec, nsec = divmod(int(timeout * 1e9) + 1000, 1_000_000_000)  # +1us: wake after the deadline, not on it
+            got = self.line.event_wait(sec=sec, nsec=nsec)
+            self.wakeups += 1
+            g = None
+            if got:
+                for ev in self._read():
+                    r = self._edge(self._down(ev.type), ev.sec + ev.nsec / 1e9)
+                    g = g or r
+            r = self._step(self.clock())
+            g = g or r
+            if g:
+                return g
+        return None
+
+    def wait_press(self) -> bool:
+        return self.wait_gesture() is not None
+
+    async def wait_gesture_async(self):
+        """wait_gesture() on the running event loop (needs a real line with event_get_fd())."""
+        loop = asyncio.get_running_loop()
+        fd = self.line.event_get_fd()
+        ready = asyncio.Event()
+        loop.add_reader(fd, ready.set)
+        try:
+            while True:
+                dl = self._deadline()
+                try:
+                    await asyncio.wait_for(ready.wait(), None if dl is None else max(0.0, dl - self.clock()) + 1e-6)
+                except asyncio.TimeoutError:
+                    pass
+                self.wakeups += 1
+                g = None
+                if ready.is_set():
+                    ready.clear()
+                    for ev in self._read():
+                        r = self._edge(self._down(ev.type), ev.sec + ev.nsec / 1e9)
+                        g = g or r
+                r = self._step(self.clock())
+                g = g or r
+                if g:
+                    return g
+        finally:
+            loop.remove_reader(fd)
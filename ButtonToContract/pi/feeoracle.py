@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+EIP-1559 fees from eth_feeHistory instead of fixed MAX_FEE_GWEI / MAX_PRIORITY_FEE_GWEI.
+
+FeeOracle keeps the next block's base fee and the priority fees paid in the
+last `blocks` blocks at a few percentiles (the tiers), refreshed in the
+background every `refresh_s`. fees() is a lookup, with no RPC on the press
+path:
+
+  maxPriorityFeePerGas  the current tier's percentile tip, at most the tip cap
+  maxFeePerGas          2 x next base fee + tip, at most the fee cap (covers
+                        ~6 full blocks of +12.5% base fee growth; only base +
+                        tip is actually paid)
+
+The configured MAX_FEE_GWEI / MAX_PRIORITY_FEE_GWEI stay the hard caps; the
+fixed caps are used as-is until the first refresh, and a base fee above the
+cap is reported (the tx would not be included at any tip).
+
+The tier starts from the inclusion target (target_s / block time: next block
+-> p75, a few blocks -> p50, slower -> p25) and tunes itself from what the
+pipeline measures: observe() gets every mined toggle's time to inclusion. A
+tx slower than target_s, or one that needed a fee bump, moves the tier up;
+when the current tier includes well inside the target, the next cheaper tier
+is tried, unless it has already shown it is too slow.
+
+estimate_gas() replaces the fixed 120000 gas with one estimate per run.
+AsyncFeeOracle refreshes through an AsyncWeb3 (run() is a task).
+"""
+import sys, time, asyncio, threading
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+def _gas_limit(estimate) -> int:
+    # margin for the other toggle direction (false->true writes a fresh slot: ~+17k gas)
+    return int(estimate * 1.2) + 20000
+
+def estimate_gas(fn, sender, fallback=120000) -> int:
+    """Gas limit for `fn` (e.g. contract.functions.changeState()) from one estimate."""
+    try:
+        return _gas_limit(fn.estimate_gas({"from": sender}))
+    except Exception as e:
+        print(f"[Fee] estimate_gas failed ({e}); using {fallback}", file=sys.stderr)
+        return fallback
+
+async def estimate_gas_async(fn, sender, fallback=120000) -> int:
+    try:
+        return _gas_limit(await fn.estimate_gas({"from": sender}))
+    except Exception as e:
+        print(f"[Fee] estimate_gas failed ({e}); using {fallback}", file=sys.stderr)
+        return fallback
+
+def _median(xs):
+    xs = sorted(xs)
+    return xs[len(xs) // 2] if xs else 0
+
+class TierStats:
+    __slots__ = ("n", "ewma_s", "bumped")
+    def __init__(self):
+        self.n, self.ewma_s, self.bumped = 0, None, 0
+
+class FeeOracle:
+    def __init__(self, w3, caps, target_s=6.0, block_time_s=2.0, blocks=20, refresh_s=15.0, alpha=0.3,
+                 min_samples=3, clock=time.monotonic):
+        self.w3 = w3
+        self.caps = dict(caps)
+        self.target_s, self.block_time_s = target_s, block_time_s
+        self.blocks, self.refresh_s = blocks, refresh_s
+        self.alpha, self.min_samples = alpha, min_samples
+        self.clock = clock
+        self.base_next = None  # wei
+        self.tips = None       # wei per tier (PERCENTILES)
+        self.updated_at = None
+        self.refreshes = self.errors = 0
+        self.tiers = [TierStats() for _ in PERCENTILES]
+        tb = target_s / block_time_s
+        self.tier = 3 if tb <= 1.5 else 2 if tb <= 4 else 1
+        self._warned = False
+        self._lock = threading.Lock()
+
+    # ----- fee history -----
+    def update(self, hist):
+        """Take an eth_feeHistory result (percentiles = PERCENTILES)."""
+        base = hist["baseFeePerGas"][-1]  # base fee of the next block
+        busy = [r for r, used in zip(hist.get("reward") or [], hist["gasUsedRatio"]) if used > 0 and r]
+        tips = [_median(r[i] for r in busy) for i in range(len(PERCENTILES))]
+        with self._lock:
+            self.base_next, self.tips, self.updated_at = int(base), [int(t) for t in tips], self.clock()
+            self.refreshes += 1
+
+    def refresh(self):
+        self.update(self.w3.eth.fee_history(self.blocks, "latest", list(PERCENTILES)))
+
+    def run(self, stop_ev):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                self.errors += 1
+                print(f"[Fee] fee_history failed: {e}", file=sys.stderr)
+            if stop_ev.wait(self.refresh_s):
+                return
+
+    def start(self, stop_ev):
+        t = threading.Thread(target=self.run, args=(stop_ev,), name="fee-oracle", daemon=True)
+        t.start()
+        return t
+
+    # ----- picking fees -----
+    def fees(self):
+        """(tier, {"maxFeePerGas", "maxPriorityFeePerGas"}); tier is None while the fixed caps are used."""
+        with self._lock:
+            base, tips, tier = self.base_next, self.tips, self.tier
+        cap_fee, cap_tip = self.caps["maxFeePerGas"], self.caps["maxPriorityFeePerGas"]
+        if base is None:
+            return None, dict(self.caps)
+        tip = min(cap_tip, max(1, tips[tier]))
+        if base + tip > cap_fee:
+            if not self._warned:
+                print(f"[Fee] next base fee {base / 1e9:.3f} gwei is above the {cap_fee / 1e9:.3f} gwei cap; "
+                      f"toggles wait until it drops", file=sys.stderr)
+                self._warned = True
+            return None, dict(self.caps)  # not the tier's fault if this one is slow
+        self._warned = False
+        return tier, {"maxFeePerGas": min(cap_fee, 2 * base + tip), "maxPriorityFeePerGas": tip}
+
+    def observe(self, tier, inclusion_s, bumps=0):
+        """A tx sent at `tier` was mined `inclusion_s` after the first send, after `bumps` fee bumps."""
+        if tier is None:
+            return
+        with self._lock:
+            st = self.tiers[tier]
+            st.n += 1; st.bumped += bumps > 0
+            st.ewma_s = inclusion_s if st.ewma_s is None else st.ewma_s + self.alpha * (inclusion_s - st.ewma_s)
+            if tier != self.tier:
+                return
+            if (inclusion_s > self.target_s or bumps) and tier < len(PERCENTILES) - 1:
+                self.tier = tier + 1
+                print(f"[Fee] inclusion {inclusion_s:.1f}s > target {self.target_s:.0f}s: tier p{PERCENTILES[tier]} "
+                      f"-> p{PERCENTILES[tier + 1]}", file=sys.stderr)
+            elif tier > 0 and st.n >= self.min_samples and st.ewma_s < self.target_s / 2:
+                lower = self.tiers[tier - 1]
+                if lower.ewma_s is None or lower.ewma_s <= self.target_s:
+                    self.tier = tier - 1
+
+    def stats(self) -> dict:
+        return {"tier": f"p{PERCENTILES[self.tier]}", "base_gwei": None if self.base_next is None else round(self.base_next / 1e9, 4),
+                "tips_gwei": None if self.tips is None else [round(t / 1e9, 4) for t in self.tips],
+                "refreshes": self.refreshes, "errors": self.errors,
+                "inclusion_s": {f"p{p}": (st.n, None if st.ewma_s is None else round(st.ewma_s, 1))
+                                for p, st in zip(PERCENTILES, self.tiers) if st.n}}
+
+class AsyncFeeOracle(FeeOracle):
+    """FeeOracle for an AsyncWeb3; run() refreshes until cancelled."""
+    async def refresh(self):
+        self.update(await self.w3.eth.fee_history(self.blocks, "latest", list(PERCENTILES)))
+
+    async def run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                self.errors += 1
+                print(f"[Fee] fee_history failed: {e}", file=sys.stderr)
+            await asyncio.sleep(self.refresh_s)
@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+"""
+Fleet mode: one process toggling many Switch contracts from several accounts.
+
+A fleet file says which account toggles which contract (changeState() is
+onlyOwner, so normally the account that deployed it):
+
+    {"accounts":  {"ops1": "FLEET_KEY_1", "ops2": "FLEET_KEY_2"},
+     "contracts": [{"address": "0x…", "account": "ops1"}, "0x…", ...]}
+
+An account's key is the name of an environment variable holding it (keep the
+keys in .env) or the hex key itself (0x optional). Contracts listed without an account are
+sharded round robin over all accounts.
+
+Every account is a lane with its own local nonce counter (txpipe's
+NonceManager), so lanes never wait on each other. toggle() reserves a run
+of nonces per lane, signs the transactions in a process pool (signing is
+pure-Python ECDSA, ~10 ms per tx; the keys go to each worker once, through
+the pool initializer) and sends each lane's raw transactions in nonce
+order, a chunk at a time as soon as it is signed, all lanes at once on a
+thread pool; with a `batcher` (pi_common.rpcbatch) a chunk's sends are one
+JSON-RPC batch and the block scans are batched too. A send that fails is
+retried once: at a fresh nonce if another tx took its nonce, else at the
+same nonce with bumped fees.
+
+Receipts are not polled per transaction. One tracker thread follows the tip
+and takes each new block's receipts in one call (eth_getBlockReceipts), or,
+on nodes without it, the blocks' transaction hashes plus one eth_getLogs for
+StateChanged over the fleet's addresses for the whole new range. A fleet tx
+found with its StateChanged log is done (the log gives the new state), one
+found without it reverted. A lane whose oldest tx stays unmined for
+`stuck_after_s` has its unmined txs re-sent at the same nonces with fees
+raised by `bump` (never above the caps), as TxPipeline does for one account.
+A tx still unmined `receipt_timeout_s` after its first send is given up
+(finished with a TimeoutError) and its lane's nonce re-read from the chain's
+latest count, so the lane's next round replaces it.
+
+stats() has toggles/s and time to inclusion (first send -> seen mined)
+percentiles; bench/bench_fleet.py runs it against a local dev chain.
+"""
+import os, sys, json, time, signal, threading, multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from eth_utils import keccak, to_checksum_address
+from txpipe import NonceManager, pick_fees, bumped_fees, is_nonce_too_low, is_already_known
+from statefollow import TOPIC0, decode_state
+
+CHANGE_STATE = "0x" + keccak(text="changeState()")[:4].hex()
+
+def _hex(h) -> str:
+    return h.lower() if isinstance(h, str) else "0x" + bytes(h).hex()
+
+def _pct(xs, q):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(q * len(xs)))] if xs else None
+
+def _r(x):
+    return round(x, 3) if x is not None else None
+
+def _nonce_taken(e) -> bool:
+    # a first send refused as an underpriced replacement: another process holds that nonce in the mempool
+    return is_nonce_too_low(e) or "replacement transaction underpriced" in str(getattr(e, "message", None) or e).lower()
+
+def _unsupported(e) -> bool:
+    m = str(getattr(e, "message", None) or e).lower()
+    return any(s in m for s in ("-32601", "not found", "unknown rpc", "not supported", "does not exist", "unsupported"))
+
+# ---------- Fleet file ----------
+def _env_name(ref) -> bool:
+    # looks like a variable name rather than a (mistyped) 64-hex-digit key, so it is safe to print
+    return ref.isidentifier() and len(ref) < 40 and not all(c in "0123456789abcdefABCDEF" for c in ref)
+
+def load_fleet(path, env=None):
+    """([(account name, key)], [(contract address, account name)]) from a fleet JSON file."""
+    env = os.environ if env is None else env
+    with open(path) as f:
+        spec = json.load(f)
+    from eth_account import Account
+    accounts = []
+    for name, ref in spec.get("accounts", {}).items():
+        var = ref if ref in env else None
+        key = (env[var] if var else ref).strip()
+        key = key if key.startswith("0x") else "0x" + key
+        try:
+            Account.from_key(key)
+        except Exception:
+            # name the variable, never echo the value: it may be a (malformed) key
+            if var:
+                raise ValueError(f"fleet account {name}: {var} is not a valid private key") from None
+            if _env_name(ref):
+                raise ValueError(f"fleet account {name}: no private key (set {ref} in .env)") from None
+            raise ValueError(f"fleet account {name}: the inline key is not a valid private key") from None
+        accounts.append((name, key))
+    if not accounts:
+        raise ValueError(f"{path}: no accounts")
+    names = [n for n, _ in accounts]
+    contracts = []
+    for i, c in enumerate(spec.get("contracts", [])):
+        addr, acct = (c, None) if isinstance(c, str) else (c["address"], c.get("account"))
+        acct = acct or names[i % len(names)]
+        if acct not in names:
+            raise ValueError(f"fleet contract {addr}: unknown account {acct}")
+        contracts.append((to_checksum_address(addr), acct))
+    return accounts, contracts
+
+# ---------- Signing (worker processes) ----------
+_ACCTS = None
+
+def _init_signer(keys):
+    global _ACCTS
+    from eth_account import Account
+    _ACCTS = [Account.from_key(k) for k in keys]
+
+def _init_worker(keys):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C is for the controller, which shuts the pool down
+    _init_signer(keys)
+
+def _sign(index, txs):
+    """[(raw tx, hash)] for txs signed by account `index`."""
+    acct, out = _ACCTS[index], []
+    for tx in txs:
+        s = acct.sign_transaction(tx)
+        raw = getattr(s, "raw_transaction", None) or getattr(s, "rawTransaction")
+        out.append((bytes(raw), _hex(s.hash)))
+    return out
+
+class Signer:
+    """Signs on `processes` worker processes (None: one per CPU; 0: in the calling thread)."""
+    def __init__(self, keys, processes=None, chunk=32):
+        self.chunk = chunk
+        self.pool = None
+        if processes == 0:
+            _init_signer(keys)
+            return
+        # forkserver/spawn: the workers are not forked from a process that already runs threads
+        methods = multiprocessing.get_all_start_methods()
+        ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        n = processes or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(n, mp_context=ctx, initializer=_init_worker, initargs=(list(keys),))
+        for f in [self.pool.submit(os.getpid) for _ in range(n)]:
+            f.result()  # workers up (and eth_account imported) before the first round
+
+    def sign(self, index, txs):
+        """[(raw, hash)] chunks in the order of txs, each yielded as soon as it is signed; all
+        chunks are queued at once, so several workers sign them in parallel."""
+        if self.pool is None:
+            for i in range(0, len(txs), self.chunk):
+                yield _sign(index, txs[i:i + self.chunk])
+            return
+        futs = [self.pool.submit(_sign, index, txs[i:i + self.chunk]) for i in range(0, len(txs), self.chunk)]
+        for f in futs:
+            yield f.result()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+# ---------- Fleet ----------
+class FleetTx:
+    __slots__ = ("contract", "lane", "nonce", "fees", "tier", "hashes", "first_sent", "sent_at", "bumps", "capped",
+                 "block", "state", "mined_at", "error", "done")
+    def __init__(self, contract, lane, nonce, fees, tier=None):
+        self.contract, self.lane, self.nonce, self.fees, self.tier = contract, lane, nonce, fees, tier
+        self.hashes = []
+        self.first_sent = self.sent_at = None
+        self.bumps = 0
+        self.capped = False
+        self.block = self.state = self.mined_at = self.error = None
+        self.done = threading.Event()
+
+    @property
+    def inclusion_s(self):
+        return self.mined_at - self.first_sent if self.block is not None and self.error is None else None
+
+    def wait(self, timeout=None):
+        """Block until mined; returns the new state ('ON'/'OFF') or raises the error."""
+        if not self.done.wait(timeout):
+            raise TimeoutError(f"toggle of {self.contract} not mined within {timeout}s")
+        if self.error is not None:
+            raise self.error
+        return self.state
+
+class Lane:
+    """One account: its contracts, nonce counter and unmined txs by nonce."""
+    def __init__(self, w3, index, name, address):
+        self.index, self.name, self.address = index, name, address
+        self.contracts = []
+        self.nonces = NonceManager(w3, address)
+        self.pending = {}  # nonce -> FleetTx (guarded by the controller's condition)
+        self.lock = threading.Lock()  # one round's nonces reserved and sent at a time
+
+class FleetController:
+    def __init__(self, w3, accounts, contracts, chain_id, caps, gas=60000, signers=None, batcher=None,
+                 poll_s=0.5, max_range=50, stuck_after_s=30.0, bump=1.125, max_bumps=3, receipt_timeout_s=180.0, receipts="auto",
+                 oracle=None, inclusion=None, on_done=None):
+        from eth_account import Account
+        self.w3, self.chain_id, self.gas = w3, chain_id, gas
+        self.caps = dict(caps)
+        self.oracle = oracle  # feeoracle.FeeOracle, as for TxPipeline
+        self.inclusion = inclusion  # anything with observe(seconds from first send to mined)
+        self.on_done = on_done  # on_done(fleet_tx) from the tracker thread
+        self.batcher = batcher
+        self.poll_s, self.max_range = poll_s, max_range
+        self.stuck_after_s, self.bump, self.max_bumps = stuck_after_s, bump, max_bumps
+        self.receipt_timeout_s = receipt_timeout_s
+        self.receipts = receipts  # "auto": eth_getBlockReceipts until the node refuses it; "logs": never
+        self.lanes = {}
+        for i, (name, key) in enumerate(accounts):
+            self.lanes[name] = Lane(w3, i, name, Account.from_key(key).address)
+        self.lane_of = {}
+        for addr, name in contracts:
+            self.lanes[name].contracts.append(addr)
+            self.lane_of[addr] = self.lanes[name]
+        self.addresses = list(self.lane_of)
+        self.signer = Signer([k for _, k in accounts], signers)
+        self._senders = ThreadPoolExecutor(max(1, len(self.lanes)), thread_name_prefix="fleet-send")
+        self.sent = self.mined = self.reverted = self.failed = self.replaced = self.resyncs = 0
+        self.blocks_scanned = self.scan_calls = self.send_batches = 0
+        self._batch_sends = True
+        self._t_first = self._t_last = None
+        self._inclusions = []
+        self._by_hash = {}  # every hash sent -> FleetTx
+        self._scanned = None  # last block looked at
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread = threading.Thread(target=self._track, name="fleet-track", daemon=True)
+
+    def start(self):
+        """Prime every lane's nonce and the tip in one batch (if batching), then start tracking."""
+        lanes = list(self.lanes.values())
+        calls = [lambda: self.w3.eth.block_number]
+        calls += [lambda a=lane.address: self.w3.eth.get_transaction_count(a, "pending") for lane in lanes]
+        res = self.batcher.run(*calls) if self.batcher is not None else [c() for c in calls]
+        self._scanned = res[0]
+        for lane, n in zip(lanes, res[1:]):
+            lane.nonces.prime(n)
+        self._thread.start()
+        return self
+
+    def __len__(self):
+        with self._cond:
+            return sum(len(lane.pending) for lane in self.lanes.values())
+
+    # ----- sending -----
+    def toggle(self, contracts=None):
+        """One changeState() per contract (all of them by default); returns the FleetTxs once sent."""
+        by_lane = {}
+        for addr in (self.addresses if contracts is None else contracts):
+            addr = to_checksum_address(addr)
+            by_lane.setdefault(self.lane_of[addr], []).append(addr)
+        tier, fees = pick_fees(self.oracle, self.caps)
+        rounds = self._senders.map(lambda item: self._round(item[0], item[1], fees, tier), by_lane.items())
+        return [tx for txs in rounds for tx in txs]
+
+    def _tx(self, tx):
+        return {"to": tx.contract, "data": CHANGE_STATE, "value": 0, "gas": self.gas, "chainId": self.chain_id,
+                "type": 2, "nonce": tx.nonce, **tx.fees}
+
+    def _send_raw(self, raws):
+        """Exception or hash per raw tx, in order."""
+        if self.batcher is not None and self._batch_sends and len(raws) > 1:
+            try:
+                return self._send_batch(raws)
+            except (AttributeError, NotImplementedError, TypeError, ValueError) as e:
+                self._batch_sends = False
+                print(f"[Fleet] RPC does not take batched sends ({e}); sending one by one", file=sys.stderr)
+        out = []
+        for r in raws:
+            try:
+                out.append(self.w3.eth.send_raw_transaction(r))
+            except Exception as e:
+                out.append(e)
+        return out
+
+    def _send_batch(self, raws):
+        # straight to the provider: web3's batch_requests() (and so rpcbatch) refuses sends
+        resps = self.w3.provider.make_batch_request([("eth_sendRawTransaction", ["0x" + r.hex()]) for r in raws])
+        if not isinstance(resps, list) or len(resps) != len(raws):
+            raise ValueError(resps.get("error") if isinstance(resps, dict) else "malformed batch response")
+        self.send_batches += 1
+        return [RuntimeError(r["error"].get("message", r["error"])) if r.get("error") else r.get("result")
+                for r in resps]
+
+    def _broadcast(self, lane, txs):
+        """Sign and send txs of one lane, chunk by chunk as they come out of the signer (a chunk is
+        on the wire while the next is signed); [(tx, error)] for the sends that failed."""
+        failed, i = [], 0
+        for signed in self.signer.sign(lane.index, [self._tx(tx) for tx in txs]):
+            chunk, i = txs[i:i + len(signed)], i + len(signed)
+            now = time.monotonic()
+            with self._cond:
+                # registered before sending: the tracker may see a block with them before the send returns
+                for tx, (_, h) in zip(chunk, signed):
+                    tx.hashes.append(h)
+                    tx.sent_at = now
+                    if tx.first_sent is None:
+                        tx.first_sent = now
+                    lane.pending[tx.nonce] = tx
+                    self._by_hash[h] = tx
+                self._cond.notify_all()
+            for tx, (_, h), r in zip(chunk, signed, self._send_raw([raw for raw, _ in signed])):
+                if isinstance(r, Exception) and not is_already_known(r):
+                    with self._cond:
+                        tx.hashes.remove(h)
+                        self._by_hash.pop(h, None)
+                        if lane.pending.get(tx.nonce) is tx and not tx.hashes:
+                            del lane.pending[tx.nonce]
+                    failed.append((tx, r))
+                elif not tx.bumps:
+                    self.sent += 1
+        return failed
+
+    def _round(self, lane, addrs, fees, tier):
+        with lane.lock:
+            txs = [FleetTx(a, lane.name, lane.nonces.next(), dict(fees), tier) for a in addrs]
+            if self._t_first is None:
+                self._t_first = time.monotonic()
+            failed = self._broadcast(lane, txs)
+            if failed:
+                lane.nonces.resync(); self.resyncs += 1
+                print(f"[Fleet] {lane.name}: {len(failed)} of {len(txs)} sends failed ({failed[0][1]}); retrying",
+                      file=sys.stderr)
+                retry = []
+                for tx, e in failed:
+                    if _nonce_taken(e):
+                        tx.nonce = lane.nonces.next()  # the nonce went to another tx: nothing of ours to replace
+                    else:
+                        tx.fees = bumped_fees(tx.fees, self.bump, self.caps, self.oracle) or tx.fees
+                    retry.append(tx)
+                for tx, e in self._broadcast(lane, sorted(retry, key=lambda t: t.nonce)):
+                    self._finish(tx, error=e)
+            return txs
+
+    def _replace(self, lane, txs):
+        """Re-send a stuck lane's unmined txs at the same nonces with bumped fees (those not at the caps yet)."""
+        fees = [bumped_fees(tx.fees, self.bump, self.caps, self.oracle) for tx in txs]
+        if fees[0] is None:
+            txs[0].capped = True  # later nonces cannot be mined before it: nothing worth re-sending
+            print(f"[Fleet] {lane.name}: nonce {txs[0].nonce} stuck at the fee caps, not re-sent", file=sys.stderr)
+            return
+        txs = [tx for tx, f in zip(txs, fees) if f is not None]
+        for tx, f in zip(txs, [f for f in fees if f is not None]):
+            tx.fees = f
+            tx.bumps += 1
+        with lane.lock:
+            failed = self._broadcast(lane, txs)
+        for tx, e in failed:
+            print(f"[Fleet] fee bump for {lane.name} nonce {tx.nonce} failed: {e}", file=sys.stderr)
+            tx.sent_at = time.monotonic()
+        self.replaced += len(txs) - len(failed)
+        print(f"[Fleet] {lane.name}: nonce {txs[0].nonce} stuck, re-sent {len(txs)} txs "
+              f"with maxFee={txs[0].fees['maxFeePerGas']}", file=sys.stderr)
+
+    # ----- tracking -----
+    def _finish(self, tx, block=None, state=None, error=None):
+        with self._cond:
+            if tx.done.is_set():
+                return
+            lane = self.lanes[tx.lane]
+            if lane.pending.get(tx.nonce) is tx:
+                del lane.pending[tx.nonce]
+            for h in tx.hashes:
+                self._by_hash.pop(h, None)
+            tx.block, tx.state, tx.error, tx.mined_at = block, state, error, time.monotonic()
+            if error is None:
+                self.mined += 1
+                self._t_last = tx.mined_at
+                self._inclusions.append(tx.inclusion_s)
+            elif block is not None:
+                self.reverted += 1
+            else:
+                self.failed += 1
+            self._cond.notify_all()
+        tx.done.set()
+        if error is None:
+            if self.oracle is not None:
+                self.oracle.observe(tx.tier, tx.inclusion_s, tx.bumps)
+            if self.inclusion is not None:
+                self.inclusion.observe(tx.inclusion_s)
+        if self.on_done is not None:
+            try:
+                self.on_done(tx)
+            except Exception as e:
+                print(f"[Fleet] on_done: {e}", file=sys.stderr)
+
+    def _run(self, calls):
+        self.scan_calls += len(calls)
+        return self.batcher.run(*calls) if self.batcher is not None and len(calls) > 1 else [c() for c in calls]
+
+    def _scan_receipts(self, a, b):
+        """[(tx hash, block, state or None, ok)] for every tx in blocks a..b, from their receipts."""
+        out = []
+        for rcpts in self._run([lambda n=n: self.w3.eth.get_block_receipts(n) for n in range(a, b + 1)]):
+            for r in rcpts:
+                state = None
+                for lg in r["logs"]:
+                    state = decode_state(lg) or state
+                out.append((_hex(r["transactionHash"]), r["blockNumber"], state, r["status"] == 1))
+        return out
+
+    def _scan_logs(self, a, b):
+        """The same from the blocks' tx hashes and one eth_getLogs for StateChanged over the range."""
+        calls = [lambda n=n: self.w3.eth.get_block(n) for n in range(a, b + 1)]
+        calls.append(lambda: self.w3.eth.get_logs({"fromBlock": a, "toBlock": b, "address": self.addresses,
+                                                   "topics": [_hex(TOPIC0)]}))
+        *blocks, logs = self._run(calls)
+        states = {_hex(lg["transactionHash"]): decode_state(lg) for lg in logs}
+        return [(_hex(h), blk["number"], states.get(_hex(h)), _hex(h) in states)
+                for blk in blocks for h in blk["transactions"]]
+
+    def _scan(self, a, b):
+        if self.receipts == "auto":
+            try:
+                return self._scan_receipts(a, b)
+            except Exception as e:
+                if not _unsupported(e):
+                    raise
+                self.receipts = "logs"
+                print(f"[Fleet] no eth_getBlockReceipts ({e}); blocks + eth_getLogs instead", file=sys.stderr)
+        return self._scan_logs(a, b)
+
+    def _check_stuck(self):
+        now = time.monotonic()
+        with self._cond:
+            expired = [tx for lane in self.lanes.values() for tx in lane.pending.values()
+                       if tx.first_sent is not None and now - tx.first_sent > self.receipt_timeout_s]
+        for name in sorted({tx.lane for tx in expired}):
+            lane = self.lanes[name]
+            lane.nonces.resync("latest"); self.resyncs += 1  # "pending" still counts the abandoned txs
+            gone = sorted(tx.nonce for tx in expired if tx.lane == name)
+            print(f"[Fleet] {name}: {len(gone)} tx(s) from nonce {gone[0]} unmined after "
+                  f"{self.receipt_timeout_s:.0f}s, giving up", file=sys.stderr)
+        for tx in expired:
+            self._finish(tx, error=TimeoutError(f"toggle of {tx.contract} (nonce {tx.nonce}) not mined within "
+                                                f"{self.receipt_timeout_s:.0f}s"))
+        with self._cond:
+            stuck = [(lane, [lane.pending[n] for n in sorted(lane.pending)]) for lane in self.lanes.values()
+                     if lane.pending and now - lane.pending[min(lane.pending)].sent_at > self.stuck_after_s]
+        for lane, txs in stuck:
+            oldest = txs[0]
+            # the nonce is used as of the last scanned block, but not by any hash of ours
+            if self.w3.eth.get_transaction_count(lane.address, self._scanned) > oldest.nonce:
+                lane.nonces.resync(); self.resyncs += 1
+                self._finish(oldest, error=RuntimeError(f"nonce {oldest.nonce} was used by another transaction"))
+            elif oldest.bumps < self.max_bumps and not oldest.capped:
+                self._replace(lane, txs)
+
+    def _track(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._stop or any(l.pending for l in self.lanes.values()))
+                if self._stop:
+                    return
+            try:
+                tip = self.w3.eth.block_number
+                while self._scanned < tip:
+                    a, b = self._scanned + 1, min(tip, self._scanned + self.max_range)
+                    for h, block, state, ok in self._scan(a, b):
+                        with self._cond:
+                            tx = self._by_hash.get(h)
+                        if tx is not None:
+                            self._finish(tx, block, state, None if ok else RuntimeError(f"toggle of {tx.contract} reverted"))
+                    self._scanned = b
+                    self.blocks_scanned += b - a + 1
+                self._check_stuck()
+            except Exception as e:
+                print(f"[Fleet] block scan failed: {e}", file=sys.stderr)
+            with self._cond:
+                if self._stop:
+                    return
+                self._cond.wait(self.poll_s)
+
+    def wait(self, txs, timeout=None) -> bool:
+        """Wait until all of txs are mined or failed."""
+        t_end = None if timeout is None else time.monotonic() + timeout
+        for tx in txs:
+            if not tx.done.wait(None if t_end is None else max(0.0, t_end - time.monotonic())):
+                return False
+        return True
+
+    def close(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._thread.is_alive():
+            self._thread.join(timeout=2.0)
+        self._senders.shutdown()
+        self.signer.close()
+
+    def stats(self) -> dict:
+        with self._cond:
+            incl = list(self._inclusions)
+        span = (self._t_last - self._t_first) if self._t_last is not None else None
+        return {"lanes": len(self.lanes), "contracts": len(self.addresses), "sent": self.sent, "mined": self.mined,
+                "reverted": self.reverted, "failed": self.failed, "replaced": self.replaced, "resyncs": self.resyncs,
+                "inflight": len(self), "receipts": self.receipts, "blocks_scanned": self.blocks_scanned,
+                "scan_calls": self.scan_calls, "send_batches": self.send_batches,
+                "toggles_per_s": round(self.mined / span, 2) if span else None,
+                "inclusion_p50_s": _r(_pct(incl, 0.50)), "inclusion_p95_s": _r(_pct(incl, 0.95)),
+                "inclusion_p99_s": _r(_pct(incl, 0.99))}
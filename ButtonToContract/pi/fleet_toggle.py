@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Fleet toggle controller: flip many Switch contracts from one process, no
+GPIO or OLED. Contracts and accounts come from a fleet file (format in
+fleet.py); each account is a nonce lane, txs are signed in a process pool,
+sent concurrently and found mined by block-level receipt/log scans.
+
+.env:
+  RPC_URL=https://sepolia.base.org   (several, comma-separated: pooled with hedged reads + failover)
+  CHAIN_ID=84532
+  FLEET_FILE=fleet.json
+  FLEET_KEY_1=0x...           (the keys named in the fleet file)
+  MAX_FEE_GWEI=1.5            (caps; actual fees come from eth_feeHistory, see feeoracle.py)
+  MAX_PRIORITY_FEE_GWEI=0.2
+  # FLEET_EVERY_S=60 (optional: toggle the whole fleet every 60 s until Ctrl-C; 0 = once, then exit)
+  # FLEET_SIGNERS=4 (optional: signing processes, default one per CPU; 0 = sign in this process)
+  # FEE_ORACLE=0, FEE_TARGET_S=6, BATCH_RPC=0, METRICS_PORT=9101, METRICS_LOG_S=60 (as for state_button_oled.py)
+
+Prints each round's send time and, at exit, toggles/s and time-to-inclusion
+percentiles ([Fleet] stats).
+"""
+
+import os, sys, time, signal, threading
+from dotenv import load_dotenv
+from web3 import Web3
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))  # repo root
+from pi_common.rpc import PooledHTTPProvider
+from pi_common.rpcbatch import Batcher
+from pi_common import metrics
+from feeoracle import FeeOracle, estimate_gas
+from fleet import FleetController, load_fleet
+
+load_dotenv()
+
+# ---------- Config ----------
+FLEET_FILE     = os.getenv("FLEET_FILE", "fleet.json")
+FLEET_EVERY_S  = float(os.getenv("FLEET_EVERY_S", "0"))  # 0: one round, wait for it, exit
+FLEET_SIGNERS  = int(os.getenv("FLEET_SIGNERS")) if os.getenv("FLEET_SIGNERS") else None
+BATCH_RPC      = os.getenv("BATCH_RPC", "1") != "0"
+RECEIPT_TIMEOUT_S = 180
+POLL_S         = 1.0    # new blocks checked for fleet txs
+STUCK_AFTER_S  = 30.0   # re-send a lane's unmined txs at the same nonces with higher fees after this long
+FEE_BUMP       = 1.125
+MAX_BUMPS      = 5
+FEE_ORACLE     = os.getenv("FEE_ORACLE", "1") != "0"
+FEE_TARGET_S   = float(os.getenv("FEE_TARGET_S", "6"))
+BLOCK_TIME_S   = 2.0    # Base / Base Sepolia
+FEE_REFRESH_S  = 15.0
+
+METRICS_PORT  = int(os.getenv("METRICS_PORT", "0"))
+METRICS_LOG_S = float(os.getenv("METRICS_LOG_S", "60"))
+
+CHANGE_STATE_ABI = [{"inputs":[],"name":"changeState","outputs":[],"stateMutability":"nonpayable","type":"function"}]
+
+stop_ev = threading.Event()
+
+# ---------- Metrics ----------
+INCLUSION = metrics.histogram("fleet_toggle_inclusion_seconds", "Fleet toggle tx first send -> seen mined",
+                              (1, 2, 3, 4, 6, 8, 10, 15, 20, 30, 60, 120, 180))
+FLEET_TXS = metrics.counter("fleet_toggle_txs_total", "Fleet toggle txs by outcome", labels=("result",))
+
+def watch_fleet(fleet):
+    for result in ("sent", "mined", "reverted", "failed", "replaced"):
+        FLEET_TXS.labels(result).set_function(lambda r=result: getattr(fleet, r))
+    return fleet
+
+# ---------- Main ----------
+def chain_env():
+    rpc = os.getenv("RPC_URL")
+    cid = int(os.getenv("CHAIN_ID", "0"))
+    max_fee = float(os.getenv("MAX_FEE_GWEI", "1.5"))
+    max_tip = float(os.getenv("MAX_PRIORITY_FEE_GWEI", "0.2"))
+    if not (rpc and cid):
+        print("Missing RPC_URL / CHAIN_ID in .env", file=sys.stderr)
+        sys.exit(1)
+    caps = {
+        "maxFeePerGas":         Web3.to_wei(max_fee, "gwei"),
+        "maxPriorityFeePerGas": Web3.to_wei(max_tip, "gwei"),
+    }
+    return rpc, cid, caps
+
+def main():
+    rpc, cid, caps = chain_env()
+    try:
+        accounts, contracts = load_fleet(FLEET_FILE)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Bad fleet file {FLEET_FILE}: {e}", file=sys.stderr)
+        sys.exit(1)
+    if not contracts:
+        print(f"No contracts in {FLEET_FILE}", file=sys.stderr)
+        sys.exit(1)
+    w3 = Web3(PooledHTTPProvider(rpc, timeout=20))
+    if not w3.is_connected():
+        print("Cannot connect to RPC", file=sys.stderr); sys.exit(1)
+    signal.signal(signal.SIGINT,  lambda *_: stop_ev.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop_ev.set())
+
+    batch = Batcher(w3) if BATCH_RPC else None
+    oracle = FeeOracle(w3, caps, FEE_TARGET_S, BLOCK_TIME_S, refresh_s=FEE_REFRESH_S) if FEE_ORACLE else None
+    if oracle is not None:
+        oracle.start(stop_ev)
+    # every Switch runs the same code: one estimate, from the first contract's owner, serves them all
+    addr, owner = contracts[0]
+    owner = w3.eth.account.from_key(dict(accounts)[owner]).address
+    gas = estimate_gas(w3.eth.contract(address=addr, abi=CHANGE_STATE_ABI).functions.changeState(), owner)
+    fleet = watch_fleet(FleetController(w3, accounts, contracts, cid, caps, gas=gas, signers=FLEET_SIGNERS,
+                                        batcher=batch, poll_s=POLL_S, stuck_after_s=STUCK_AFTER_S, bump=FEE_BUMP,
+                                        max_bumps=MAX_BUMPS, receipt_timeout_s=RECEIPT_TIMEOUT_S, oracle=oracle,
+                                        inclusion=INCLUSION)).start()
+    exporter = metrics.Exporter(METRICS_PORT, METRICS_LOG_S).start()
+    print(f"[Fleet] {len(contracts)} contracts on {len(accounts)} accounts, gas {gas}")
+
+    txs = []
+    try:
+        while not stop_ev.is_set():
+            t0 = time.monotonic()
+            txs = fleet.toggle()
+            print(f"[Fleet] round: {len(txs)} toggles signed and sent in {time.monotonic() - t0:.2f}s")
+            if FLEET_EVERY_S <= 0:
+                t_end = time.monotonic() + RECEIPT_TIMEOUT_S
+                while not stop_ev.is_set() and not fleet.wait(txs, 1.0) and time.monotonic() < t_end:
+                    pass
+                break
+            stop_ev.wait(max(0.0, FLEET_EVERY_S - (time.monotonic() - t0)))
+    finally:
+        fleet.close()
+        if oracle is not None:
+            print(f"[Fee] {oracle.stats()}")
+        print(f"[Fleet] {fleet.stats()}")
+        print(f"[Fleet] last round: {sum(tx.state == 'ON' for tx in txs)} ON, {sum(tx.state == 'OFF' for tx in txs)} OFF, "
+              f"{sum(not tx.done.is_set() for tx in txs)} unmined, {sum(tx.error is not None for tx in txs)} failed")
+        exporter.stop()
+
+if __name__ == "__main__":
+    main()
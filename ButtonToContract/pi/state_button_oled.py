@@ -11,25 +11,42 @@ Wiring (BCM):
   OLED SSD1306 128x64 @ 0x3C: SDA->GPIO2, SCL->GPIO3, VCC->3V3, GND->GND
 
 .env:
-  RPC_URL=https://sepolia.base.org
+  RPC_URL=https://sepolia.base.org   (several, comma-separated: pooled with hedged reads + failover)
   CHAIN_ID=84532
   CONTRACT_ADDRESS=0xYourContract
   PRIVATE_KEY=0xyourprivatekeyhex
-  MAX_FEE_GWEI=1.5
+  MAX_FEE_GWEI=1.5            (caps; actual fees come from eth_feeHistory, see feeoracle.py)
   MAX_PRIORITY_FEE_GWEI=0.2
+  # FEE_TARGET_S=6 (optional: wanted press -> inclusion time), FEE_ORACLE=0 (optional: always pay the caps)
+  # BUTTON_BACKEND=poll (optional: old 5 ms polling instead of gpiod edge events)
+  # ENGINE=async (optional: asyncio runtime with AsyncWeb3, see async_engine.py)
+  # BATCH_RPC=0 (optional: no JSON-RPC batches, e.g. for an RPC that mishandles them)
+  # METRICS_PORT=9101 (optional: Prometheus text on 127.0.0.1:9101/metrics), METRICS_LOG_S=60 ([Metrics] line, 0 = off)
+  # PIPELINE=1 (optional: presses queue up as in-flight txs instead of waiting for each receipt)
   # GPIO_CHIP=/dev/gpiochip4 (optional)
+  # BOOT_PROFILE=boot.jsonl (optional: append each start's [Boot] stage times)
+
+Startup is staged: the OLED and GPIO come up with light imports and show a
+frame first; web3 and the modules built on it load on a boot thread meanwhile
+(chain_imports), see pi_common/boot.py.
 """
 
-import os, sys, time, threading, signal
+import os, sys, time, threading, signal, asyncio
 import gpiod
 from dotenv import load_dotenv
-from web3 import Web3
-from web3.exceptions import ContractLogicError
 
-from PIL import Image, ImageDraw, ImageFont
 from luma.core.interface.serial import i2c
 from luma.oled.device import ssd1306
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))  # repo root
+from pi_common.oled import Oled
+from pi_common.display import DisplayService
+from pi_common.boot import Boot
+from pi_common import metrics
+from button import EdgeButton, PollButton
+
+load_dotenv()  # .env options below (GPIO_CHIP, PIPELINE, BUTTON_BACKEND, LONG_PRESS_S, ...) are read at import
+
 # ---------- Config ----------
 BUTTON = 17
 LED_R  = 18
@@ -41,37 +58,80 @@ I2C_BUS   = 1
 OLED_ADDR = 0x3C
 
 DEBOUNCE_S = 0.06
+BUTTON_BACKEND = os.getenv("BUTTON_BACKEND", "edge")  # "edge" (gpiod edge events) or "poll" (5 ms sampling)
+LONG_PRESS_S   = float(os.getenv("LONG_PRESS_S", "0"))    # >0: a hold this long re-reads the state instead of toggling
+DOUBLE_PRESS_S = float(os.getenv("DOUBLE_PRESS_S", "0"))  # >0: report double presses (a single press then waits this long after release)
+DISPLAY_FPS = 10.0  # max OLED redraws/s (display thread, latest frame wins)
 
 STATE_READ_RETRIES   = 5
 STATE_READ_DELAY_S   = 0.4
-STATE_POLL_S         = 0.5
-STATE_WAIT_TIMEOUT_S = 20.0
-
-ABI = [
+FOLLOW_POLL_S        = 2.0    # StateChanged log filter poll (toggles from other wallets)
+RECONCILE_S          = 300.0  # readState() cross-check of the cached state
+BATCH_RPC            = os.getenv("BATCH_RPC", "1") != "0"  # blockNumber + readState (+ nonce at startup) in one request
+
+RECEIPT_TIMEOUT_S = 180
+ENGINE         = os.getenv("ENGINE", "sync")  # "sync" (threads) or "async" (asyncio + AsyncWeb3)
+PIPELINE       = os.getenv("PIPELINE", "0") == "1"
+MAX_INFLIGHT   = 8      # pipelined presses waiting for receipts before a press blocks
+STUCK_AFTER_S  = 30.0   # re-send at the same nonce with higher fees after this long unmined
+FEE_BUMP       = 1.125  # x maxFee / maxPriorityFee per replacement (nodes require >= +10%)
+MAX_BUMPS      = 5
+FEE_ORACLE     = os.getenv("FEE_ORACLE", "1") != "0"  # fees from eth_feeHistory (MAX_*_GWEI become caps)
+FEE_TARGET_S   = float(os.getenv("FEE_TARGET_S", "6"))  # wanted press -> inclusion time
+BLOCK_TIME_S   = 2.0    # Base / Base Sepolia
+FEE_REFRESH_S  = 15.0   # background eth_feeHistory refresh
+
+METRICS_PORT  = int(os.getenv("METRICS_PORT", "0"))      # >0: Prometheus text on http://127.0.0.1:PORT/metrics
+METRICS_LOG_S = float(os.getenv("METRICS_LOG_S", "60"))  # [Metrics] JSON summary every N s (0 = off)
+
+ABI = [  # + statefollow.EVENT_ABI once loaded
     {"inputs":[],"name":"changeState","outputs":[],"stateMutability":"nonpayable","type":"function"},
     {"inputs":[],"name":"readState","outputs":[{"internalType":"string","name":"","type":"string"}],"stateMutability":"view","type":"function"},
 ]
 
+# rendered into the frame cache while web3 loads, so they cost no render when first shown
+BOOT_FRAMES = [("center", "Starting", "connecting…"), ("center", "ON", "Press to toggle"),
+               ("center", "OFF", "Press to toggle"), ("center", "Toggle", None), ("center", "Error", "read failed")]
+
 stop_ev    = threading.Event()
 flicker_ev = threading.Event()
 
+# ---------- Metrics (RPC and OLED timings come from pi_common) ----------
+INCLUSION = metrics.histogram("toggle_inclusion_seconds", "Toggle tx first send -> mined",
+                              (1, 2, 3, 4, 6, 8, 10, 15, 20, 30, 60, 120, 180))
+TOGGLE_TXS = metrics.counter("toggle_txs_total", "Toggle txs by outcome", labels=("result",))
+
+def watch_pipeline(pipe):
+    for result in ("sent", "mined", "failed", "replaced"):
+        TOGGLE_TXS.labels(result).set_function(lambda r=result: getattr(pipe, r))
+    return pipe
+
+# ---------- Deferred imports ----------
+def chain_imports():
+    """web3 and everything built on it (seconds on a Pi Zero); runs on a boot thread."""
+    global Web3, AsyncWeb3, ContractLogicError, PooledHTTPProvider, AsyncPooledHTTPProvider, Batcher, AsyncBatcher
+    global TxPipeline, FeeOracle, AsyncFeeOracle, estimate_gas, estimate_gas_async
+    global EVENT_ABI, StateCache, StateFollower, AsyncStateFollower, state_from_receipt
+    from web3 import Web3, AsyncWeb3
+    from web3.exceptions import ContractLogicError
+    from pi_common.rpc import PooledHTTPProvider, AsyncPooledHTTPProvider
+    from pi_common.rpcbatch import Batcher, AsyncBatcher
+    from txpipe import TxPipeline
+    from feeoracle import FeeOracle, AsyncFeeOracle, estimate_gas, estimate_gas_async
+    from statefollow import EVENT_ABI, StateCache, StateFollower, AsyncStateFollower, state_from_receipt
+
 # ---------- OLED ----------
 def oled_make():
     serial = i2c(port=I2C_BUS, address=OLED_ADDR)
     dev = ssd1306(serial, width=128, height=64)
-    dev.clear()
-    return dev
-
-def oled_center(dev, text, note=None):
-    img = Image.new("1", (dev.width, dev.height))
-    d = ImageDraw.Draw(img)
-    font = ImageFont.load_default()
-    w, h = d.textbbox((0,0), text, font=font)[2:]
-    d.text(((dev.width - w)//2, (dev.height - h)//2), text, 255, font=font)
-    if note:
-        w2, h2 = d.textbbox((0,0), note, font=font)[2:]
-        d.text(((dev.width - w2)//2, dev.height - h2 - 2), note, 255, font=font)
-    dev.display(img)
+    # cached frames, only changed pages go over I2C; drawn on the display thread
+    oled = DisplayService(Oled(dev), fps=DISPLAY_FPS)
+    oled.center("Starting", "loading…")
+    oled.flush()  # first frame on the panel
+    return oled
+
+def oled_center(oled, text, note=None):
+    oled.center(text, note)  # posts a frame; never blocks on the bus
 
 # ---------- GPIO (libgpiod v1) ----------
 class GPIO:
@@ -85,7 +145,13 @@ class GPIO:
         flags = 0
         if hasattr(gpiod, "LINE_REQ_FLAG_BIAS_PULL_UP"):
             flags |= gpiod.LINE_REQ_FLAG_BIAS_PULL_UP
-        self.btn.request(consumer="onchain-toggle", type=gpiod.LINE_REQ_DIR_IN, flags=flags)
+        if BUTTON_BACKEND == "poll":
+            self.btn.request(consumer="onchain-toggle", type=gpiod.LINE_REQ_DIR_IN, flags=flags)
+            self.button = PollButton(self.btn, stop_ev, DEBOUNCE_S)
+        else:
+            # kernel-timestamped edges; the thread sleeps in event_wait() between presses
+            self.btn.request(consumer="onchain-toggle", type=gpiod.LINE_REQ_EV_BOTH_EDGES, flags=flags)
+            self.button = EdgeButton(self.btn, stop_ev, DEBOUNCE_S, LONG_PRESS_S, DOUBLE_PRESS_S)
 
     def _level(self, on: bool) -> int:
         return 1 if (COMMON_CATHODE and on) or ((not COMMON_CATHODE) and (not on)) else 0
@@ -105,21 +171,11 @@ class GPIO:
         return self.btn.get_value() == 0  # active-LOW
 
     def wait_press(self) -> bool:
-        while not stop_ev.is_set():
-            if self.button_pressed():
-                t0 = time.monotonic()
-                ok = True
-                while time.monotonic() - t0 < DEBOUNCE_S:
-                    if stop_ev.is_set(): return False
-                    if not self.button_pressed():
-                        ok = False; break
-                    time.sleep(0.005)
-                if ok:
-                    while not stop_ev.is_set() and self.button_pressed():
-                        time.sleep(0.005)
-                    return True
-            time.sleep(0.005)
-        return False
+        return self.button.wait_press()
+
+    def wait_gesture(self):
+        """'press' / 'long' / 'double' (edge backend), or None on shutdown."""
+        return self.button.wait_gesture()
 
     def off(self): self.set_color("off")
 
@@ -138,7 +194,7 @@ def flicker(gpio: GPIO, period=0.08):
         gpio.set_color("green"); time.sleep(period)
 
 # ---------- Web3 ----------
-def load_chain():
+def chain_env():
     load_dotenv()
     rpc  = os.getenv("RPC_URL")
     cid  = int(os.getenv("CHAIN_ID", "0"))
@@ -150,17 +206,47 @@ def load_chain():
     if not (rpc and cid and addr and pk):
         print("Missing RPC_URL / CHAIN_ID / CONTRACT_ADDRESS / PRIVATE_KEY in .env", file=sys.stderr)
         sys.exit(1)
+    caps = {
+        "maxFeePerGas":         Web3.to_wei(max_fee, "gwei"),
+        "maxPriorityFeePerGas": Web3.to_wei(max_tip, "gwei"),
+    }
+    return rpc, cid, Web3.to_checksum_address(addr), pk, caps
+
+def fee_report(oracle):
+    if oracle is not None:
+        print(f"[Fee] {oracle.stats()}")
+
+def rpc_report(provider, batch=None):
+    st = provider.pool.stats()
+    print(f"[RPC] {st['calls']} calls, {st['hedges']} hedged ({st['hedge_wins']} won), {st['failovers']} failovers")
+    if batch is not None:
+        b = batch.stats()
+        print(f"[RPC] batching: {b['calls']} calls in {b['round_trips']} round trips ({b['saved']} saved)")
+    for ep in st["endpoints"]:
+        print(f"[RPC]   {ep['url']} {ep['state']} calls={ep['calls']} errors={ep['errors']} "
+              f"ewma={ep['lat_ms']}ms p95={ep['p95_ms']}ms")
+
+def load_chain(boot):
+    rpc, cid, addr, pk, caps = chain_env()
+    w3 = Web3(PooledHTTPProvider(rpc, timeout=20))
+    connected = boot.background("connected", w3.is_connected)  # round trip while the objects are built
 
-    w3 = Web3(Web3.HTTPProvider(rpc, request_kwargs={"timeout": 20}))
-    if not w3.is_connected():
+    acct = w3.eth.account.from_key(pk)
+    con  = w3.eth.contract(address=addr, abi=ABI + [EVENT_ABI])
+    if not connected.result():
         print("Cannot connect to RPC", file=sys.stderr); sys.exit(1)
+    return w3, acct, con, cid, caps
+
+async def load_chain_async(boot):
+    rpc, cid, addr, pk, caps = chain_env()
+    w3 = AsyncWeb3(AsyncPooledHTTPProvider(rpc, timeout=20))
+    connected = asyncio.ensure_future(w3.is_connected())
 
     acct = w3.eth.account.from_key(pk)
-    con  = w3.eth.contract(address=Web3.to_checksum_address(addr), abi=ABI)
-    caps = {
-        "maxFeePerGas":         w3.to_wei(max_fee, "gwei"),
-        "maxPriorityFeePerGas": w3.to_wei(max_tip, "gwei"),
-    }
+    con  = w3.eth.contract(address=addr, abi=ABI + [EVENT_ABI])
+    if not await connected:
+        print("Cannot connect to RPC", file=sys.stderr); sys.exit(1)
+    boot.mark("connected")
     return w3, acct, con, cid, caps
 
 def read_state(contract, block_identifier="latest") -> str:
@@ -174,59 +260,190 @@ def read_state_retry(contract, block_identifier="latest", tries=STATE_READ_RETRI
             last = e; time.sleep(delay)
     raise last
 
-def send_toggle(w3, acct, contract, chain_id, caps) -> str:
-    nonce = w3.eth.get_transaction_count(acct.address, "pending")
-    tx = contract.functions.changeState().build_transaction({
-        "from": acct.address,
-        "chainId": chain_id,
-        "nonce": nonce,
-        "type": 2,
-        "gas": 120000,
-        **caps,
-    })
-    signed = acct.sign_transaction(tx)
-    raw = getattr(signed, "rawTransaction", None) or getattr(signed, "raw_transaction", None)
-    if raw is None:
-        raise AttributeError("SignedTransaction missing rawTransaction/raw_transaction")
-    return w3.eth.send_raw_transaction(raw).hex()
-
-def wait_until_state_latest(contract, target: str, timeout_s=STATE_WAIT_TIMEOUT_S, poll_s=STATE_POLL_S) -> bool:
-    end = time.monotonic() + timeout_s
-    while time.monotonic() < end and not stop_ev.is_set():
-        try:
-            if read_state(contract, "latest") == target:
-                return True
-        except Exception:
-            pass
-        time.sleep(poll_s)
-    return False
+def make_pipeline(w3, acct, contract, chain_id, caps, on_done=None, oracle=None, gas=120000) -> "TxPipeline":
+    """changeState() sender: local nonces, receipts tracked in the background, fee bumps when stuck."""
+    return watch_pipeline(TxPipeline(w3, acct, contract.address, contract.encode_abi("changeState"), chain_id, caps,
+                                     gas=gas, max_inflight=MAX_INFLIGHT if PIPELINE else 1, stuck_after_s=STUCK_AFTER_S,
+                                     bump=FEE_BUMP, max_bumps=MAX_BUMPS, receipt_timeout_s=RECEIPT_TIMEOUT_S,
+                                     on_done=on_done, oracle=oracle, inclusion=INCLUSION))
 
 def set_ui_from_state(gpio: GPIO, oled, state_str: str):
     gpio.set_color("green" if state_str == "ON" else "red")
     oled_center(oled, state_str, "Press to toggle")
     print(f"[STATE] {state_str}", flush=True)
 
+# ---------- Pipelined presses ----------
+def run_pipelined(gpio: GPIO, oled, contract, pipe: "TxPipeline", cache: "StateCache", on_long):
+    """Every press is sent at once with the next local nonce; receipts arrive on the tracker thread.
+    The LED flickers while anything is in flight and shows the cached state once all are mined."""
+    lock = threading.Lock()
+    flick = [None]
+    rpc = contract.w3.provider
+    presses, c0 = 0, rpc.calls
+
+    def settle(tx):
+        if tx.error is not None:
+            print(f"[ERROR] tx nonce {tx.nonce}: {tx.error}", file=sys.stderr)
+        elif tx.receipt.status != 1:
+            print(f"[ERROR] tx nonce {tx.nonce} reverted (not owner?)", file=sys.stderr)
+        else:
+            cache.apply(*state_from_receipt(tx.receipt, contract.address), "receipt")
+        with lock:
+            if len(pipe):
+                oled_center(oled, "Pending…", f"{len(pipe)} in flight")
+                return
+            flicker_ev.clear()
+            if flick[0] is not None:
+                flick[0].join(timeout=1.0); flick[0] = None
+            if cache.state is not None:
+                set_ui_from_state(gpio, oled, cache.state)
+            else:
+                gpio.off(); oled_center(oled, "Error", "state unknown")
+
+    pipe.on_done = settle
+    print(f"Ready (pipelined, up to {pipe.max_inflight} in flight). Press button to toggle. Ctrl+C to exit.")
+    while not stop_ev.is_set():
+        g = gpio.wait_gesture()
+        if g is None:
+            break
+        if g == "long":
+            with lock:
+                if not len(pipe):
+                    on_long()
+            continue
+        presses += 1
+        with lock:
+            if flick[0] is None:
+                flicker_ev.set()
+                flick[0] = threading.Thread(target=flicker, args=(gpio,), daemon=True); flick[0].start()
+        try:
+            tx = pipe.submit(timeout=RECEIPT_TIMEOUT_S)
+            print(f"[TX] nonce {tx.nonce} {tx.tx_hash}", flush=True)
+            with lock:
+                oled_center(oled, "Pending…", f"{len(pipe)} in flight")
+        except Exception as e:
+            print(f"[ERROR] toggle: {e}", file=sys.stderr)
+            with lock:
+                if not len(pipe):
+                    flicker_ev.clear()
+                    oled_center(oled, "Error", "toggle failed")
+    pipe.wait_idle(timeout=5.0)
+    pipe.close()
+    flicker_ev.clear()
+    print(f"[Tx] {pipe.stats()}")
+    if presses:
+        print(f"[RPC] {(rpc.calls - c0) / presses:.1f} calls/press over {presses} presses (incl. log follower)")
+
+# ---------- asyncio runtime ----------
+async def main_async(gpio: GPIO, oled, boot):
+    from async_engine import ToggleEngine
+    from txpipe import AsyncTxPipeline
+
+    w3, acct, contract, chain_id, caps = await load_chain_async(boot)
+    cache = StateCache()
+    batch = AsyncBatcher(w3) if BATCH_RPC else None
+    follower = AsyncStateFollower(w3, contract, cache, FOLLOW_POLL_S, RECONCILE_S, STATE_READ_RETRIES, STATE_READ_DELAY_S,
+                                  batcher=batch)
+    oracle = AsyncFeeOracle(w3, caps, FEE_TARGET_S, BLOCK_TIME_S, refresh_s=FEE_REFRESH_S) if FEE_ORACLE else None
+    gas = await estimate_gas_async(contract.functions.changeState(), acct.address)
+    pipe = watch_pipeline(AsyncTxPipeline(w3, acct, contract.address, contract.encode_abi("changeState"), chain_id, caps,
+                                          gas=gas, max_inflight=MAX_INFLIGHT if PIPELINE else 1, stuck_after_s=STUCK_AFTER_S,
+                                          bump=FEE_BUMP, max_bumps=MAX_BUMPS, receipt_timeout_s=RECEIPT_TIMEOUT_S,
+                                          oracle=oracle, inclusion=INCLUSION))
+    if batch is not None:
+        # the pending nonce rides along with the startup blockNumber + readState batch
+        batch.piggyback(lambda: w3.eth.get_transaction_count(acct.address, "pending"), pipe.prime_nonce)
+    engine = ToggleEngine(contract, pipe, cache, follower, gpio, gpio.button, oled, stop_ev, PIPELINE, RECEIPT_TIMEOUT_S,
+                          on_ready=lambda: (boot.mark("ready"), boot.report()))
+
+    loop, task = asyncio.get_running_loop(), asyncio.current_task()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, task.cancel)
+    c0 = w3.provider.calls
+    fee_task = loop.create_task(oracle.run(), name="fee-oracle") if oracle is not None else None
+    try:
+        await engine.run()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        if fee_task is not None:
+            fee_task.cancel()
+            fee_report(oracle)
+        print(f"[RPC] {w3.provider.calls - c0} calls")
+        rpc_report(w3.provider, batch)
+
 # ---------- Main ----------
 def main():
+    boot = Boot("state_button_oled")
+    boot.mark("imports")
     signal.signal(signal.SIGINT,  lambda *_: stop_ev.set())
     signal.signal(signal.SIGTERM, lambda *_: stop_ev.set())
 
-    gpio = GPIO(GPIO_CHIP)
+    exporter = metrics.Exporter(METRICS_PORT, METRICS_LOG_S).start()
+    loaded = boot.background("web3", chain_imports)  # display and GPIO come up meanwhile
     oled = oled_make()
-    w3, acct, contract, chain_id, caps = load_chain()
-
+    boot.mark("first_frame")
+    gpio = GPIO(GPIO_CHIP)
+    boot.mark("gpio")
+    oled.prerender(BOOT_FRAMES)
+    loaded.result()
     oled_center(oled, "Starting", "connecting…")
+    if ENGINE == "async":
+        asyncio.run(main_async(gpio, oled, boot))
+        return shutdown(gpio, oled, exporter)
+
+    w3, acct, contract, chain_id, caps = load_chain(boot)
+
+    def on_change(state, source):
+        # toggles from other wallets (follower) or a reconcile correction; presses update the UI themselves
+        if source != "receipt" and not flicker_ev.is_set():
+            set_ui_from_state(gpio, oled, state)
+
+    cache = StateCache(on_change)
+    batch = Batcher(w3) if BATCH_RPC else None
+    follower = StateFollower(w3, contract, cache, read_state_retry, FOLLOW_POLL_S, RECONCILE_S, batcher=batch)
+    oracle = FeeOracle(w3, caps, FEE_TARGET_S, BLOCK_TIME_S, refresh_s=FEE_REFRESH_S) if FEE_ORACLE else None
+    if oracle is not None:
+        oracle.start(stop_ev)
+    pipe = make_pipeline(w3, acct, contract, chain_id, caps, oracle=oracle,
+                         gas=estimate_gas(contract.functions.changeState(), acct.address))
+    if batch is not None:
+        # the pending nonce rides along with the startup blockNumber + readState batch
+        batch.piggyback(lambda: w3.eth.get_transaction_count(acct.address, "pending"), pipe.prime_nonce)
+
     try:
-        s0 = read_state_retry(contract, "latest")
-        set_ui_from_state(gpio, oled, s0)
+        set_ui_from_state(gpio, oled, follower.seed())
     except Exception as e:
         oled_center(oled, "Error", "read failed"); gpio.off()
         print(f"[ERROR] initial readState: {e}", file=sys.stderr)
+    follower.start(stop_ev)
+
+    def resync():
+        # long press: show the state as the contract reports it right now
+        oled_center(oled, "Syncing…", "readState")
+        try:
+            follower.reconcile()
+            set_ui_from_state(gpio, oled, cache.state)
+        except Exception as e:
+            oled_center(oled, "Error", "read failed")
+            print(f"[ERROR] readState: {e}", file=sys.stderr)
+
+    boot.mark("ready")
+    boot.report()
+    if PIPELINE:
+        run_pipelined(gpio, oled, contract, pipe, cache, resync)
+        fee_report(oracle)
+        rpc_report(w3.provider, batch)
+        return shutdown(gpio, oled, exporter)
 
     print("Ready. Press button to toggle. Ctrl+C to exit.")
     while not stop_ev.is_set():
-        if not gpio.wait_press():
+        g = gpio.wait_gesture()
+        if g is None:
             break
+        if g == "long":
+            resync()
+            continue
 
         # Start flicker first
         oled_center(oled, "Toggle")
@@ -234,33 +451,22 @@ def main():
         t = threading.Thread(target=flicker, args=(gpio,), daemon=True); t.start()
 
         final_state = None
+        c0 = w3.provider.calls
         try:
-            before = read_state_retry(contract, "latest")
-            target = "OFF" if before == "ON" else "ON"
-
-            txh = send_toggle(w3, acct, contract, chain_id, caps)
-            oled_center(oled, "Pending…", txh[:8] + "…")
-            rcpt = w3.eth.wait_for_transaction_receipt(txh, timeout=180)
-
-            # Verify at inclusion block, then ensure latest catches up
-            try:
-                s_block = read_state_retry(contract, block_identifier=rcpt.blockNumber)
-            except Exception as e:
-                s_block = None
-                print(f"[WARN] read at block failed: {e}", file=sys.stderr)
-
-            if s_block != target:
-                oled_center(oled, "Syncing…", "waiting state")
-                ok = wait_until_state_latest(contract, target)
-                if not ok:
-                    print(f"[WARN] target '{target}' not seen on latest within timeout", file=sys.stderr)
-
-            # Decide final state from latest (or target as fallback)
-            try:
-                final_state = read_state_retry(contract, "latest")
-            except Exception as e:
-                final_state = target
-                print(f"[WARN] final read failed, using target: {e}", file=sys.stderr)
+            tx = pipe.submit(timeout=RECEIPT_TIMEOUT_S)
+            oled_center(oled, "Pending…", tx.tx_hash[:8] + "…")
+            rcpt = tx.wait(RECEIPT_TIMEOUT_S)
+            if rcpt.status != 1:
+                raise ContractLogicError("changeState reverted")
+
+            # New state straight from the StateChanged log in the receipt
+            s, pos = state_from_receipt(rcpt, contract.address)
+            if s is None:
+                print("[WARN] no StateChanged in receipt, reading state", file=sys.stderr)
+                cache.snapshot(read_state_retry(contract, rcpt.blockNumber), rcpt.blockNumber, "receipt")
+            else:
+                cache.apply(s, pos, "receipt")
+            final_state = cache.state  # newer than our log if someone else toggled since
 
         except ContractLogicError:
             final_state = None
@@ -277,16 +483,25 @@ def main():
 
             if final_state in ("ON", "OFF"):
                 set_ui_from_state(gpio, oled, final_state)
-            elif final_state is None:
-                # leave OLED as-is; ensure LED not stuck off
-                try:
-                    s_latest = read_state_retry(contract, "latest")
-                    set_ui_from_state(gpio, oled, s_latest)
-                except Exception:
-                    gpio.off()
-
+            elif cache.state is not None:
+                # leave OLED as-is; ensure LED not stuck off (cached state, no RPC)
+                gpio.set_color("green" if cache.state == "ON" else "red")
+            else:
+                gpio.off()
+            print(f"[RPC] {w3.provider.calls - c0} calls this press", flush=True)
+
+    pipe.close()
+    fee_report(oracle)
+    rpc_report(w3.provider, batch)
+    shutdown(gpio, oled, exporter)
+
+def shutdown(gpio: GPIO, oled, exporter=None):
     gpio.off()
     oled_center(oled, "Bye")
+    oled.stop()
+    print(f"[Display] {oled.stats()}")
+    if exporter is not None:
+        exporter.stop()
     gpio.close()
     print("\nClean exit.")
 
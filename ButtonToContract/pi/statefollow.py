@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Switch state from StateChanged logs instead of repeated readState() calls.
+
+Every changeState() emits StateChanged(bool newState), so the receipt of a
+toggle already says what the state became: state_from_receipt() decodes it
+with no extra RPC. StateCache keeps the latest known state together with the
+position it was observed at (block, logIndex) and only moves forward, so the
+same change arriving from the receipt and from the follower is applied once.
+
+StateFollower keeps the cache current for toggles made elsewhere (another
+wallet, Hardhat console): one eth_getFilterChanges per poll on a log filter
+for the contract, or eth_blockNumber + eth_getLogs on providers without
+filters. readState() is only used to seed the cache and to reconcile it
+every `reconcile_s` (which also repairs anything a lost filter or a reorg
+left behind).
+
+With a `batcher` (pi_common.rpcbatch) the follower's dependent-looking pairs
+go out as one JSON-RPC batch: eth_blockNumber + readState() at latest for a
+reconcile, eth_blockNumber + eth_getLogs(to latest) for a getLogs poll (logs
+past that tip are left for the next poll). A node answers a batch in order,
+so `latest` inside it is at least the tip returned before it.
+"""
+import sys, asyncio, threading, time
+from eth_utils import keccak
+
+EVENT_SIG = "StateChanged(bool)"
+TOPIC0 = keccak(text=EVENT_SIG)
+EVENT_ABI = {"anonymous": False, "inputs": [{"indexed": False, "internalType": "bool", "name": "newState", "type": "bool"}],
+             "name": "StateChanged", "type": "event"}
+
+def _raw(b) -> bytes:
+    return bytes.fromhex(b[2:] if b[:2] in ("0x", "0X") else b) if isinstance(b, str) else bytes(b)
+
+def decode_state(lg):
+    """'ON' / 'OFF' from a StateChanged log, None for any other log."""
+    topics = lg["topics"]
+    if not topics or _raw(topics[0]) != TOPIC0:
+        return None
+    return "ON" if int.from_bytes(_raw(lg["data"])[-32:], "big") else "OFF"
+
+def state_from_receipt(receipt, address):
+    """(state, (block, logIndex)) of the last StateChanged emitted by `address` in a receipt, or (None, None)."""
+    out = (None, None)
+    addr = address.lower()
+    for lg in receipt["logs"]:
+        if str(lg["address"]).lower() != addr:
+            continue
+        s = decode_state(lg)
+        if s is not None:
+            out = (s, (lg["blockNumber"], lg["logIndex"]))
+    return out
+
+class StateCache:
+    def __init__(self, on_change=None):
+        self.state = None
+        self.pos = (-1, -1)  # (block, logIndex) the state was observed at
+        self.on_change = on_change  # on_change(state, source) when the state flips
+        self._lock = threading.Lock()
+
+    @property
+    def block(self):
+        return self.pos[0]
+
+    def apply(self, state, pos, source="log"):
+        """Take `state` if observed after what we have; returns True if the state flipped."""
+        with self._lock:
+            if state is None or pos <= self.pos:
+                return False
+            changed = state != self.state
+            self.state, self.pos = state, pos
+        if changed and self.on_change is not None:
+            self.on_change(state, source)
+        return changed
+
+    def snapshot(self, state, block, source="read"):
+        """readState() at `block`: newer than any log in that block."""
+        return self.apply(state, (block, 1 << 30), source)
+
+class StateFollower:
+    def __init__(self, w3, contract, cache, read_state, poll_s=2.0, reconcile_s=300.0, batcher=None):
+        self.w3, self.contract, self.cache = w3, contract, cache
+        self.batcher = batcher
+        self.read_state = read_state  # read_state(contract, block_identifier) -> "ON"/"OFF"
+        self.poll_s, self.reconcile_s = poll_s, reconcile_s
+        self.reconciles = self.corrections = 0
+        self._filter = None
+        self._use_logs = False  # provider has no eth_newFilter: poll eth_getLogs by block range
+        self._seen = None  # last block covered by getLogs polling; None until a seed() succeeds
+        self._last_reconcile = 0.0
+
+    def _params(self):
+        return {"address": self.contract.address, "topics": ["0x" + TOPIC0.hex()]}
+
+    def seed(self):
+        """Create the log filter, then read the state (anything after the read arrives as logs)."""
+        if not self._use_logs:
+            try:
+                self._filter = self.w3.eth.filter(self._params())
+            except Exception as e:
+                print(f"[Follow] no log filters on this RPC ({e}); polling eth_getLogs", file=sys.stderr)
+                self._use_logs = True
+        self.reconcile()
+        self._seen = self.cache.block
+        return self.cache.state
+
+    def _tip_and(self, call):
+        """(tip, result of call() or its exception) from one batch."""
+        tip, res = self.batcher.run(lambda: self.w3.eth.block_number, call, return_exceptions=True)
+        if isinstance(tip, Exception):
+            raise tip
+        return tip, res
+
+    def reconcile(self):
+        if self.batcher is not None:
+            blk, s = self._tip_and(lambda: self.contract.functions.readState().call())
+            s = self.read_state(self.contract, blk) if isinstance(s, Exception) else s.upper()
+        else:
+            blk = self.w3.eth.block_number
+            s = self.read_state(self.contract, blk)
+        self.reconciles += 1
+        self._last_reconcile = time.monotonic()
+        if self.cache.state not in (None, s) and self.cache.block <= blk:
+            self.corrections += 1
+            print(f"[Follow] reconcile: cached {self.cache.state}, chain {s} at block {blk}", file=sys.stderr)
+        self.cache.snapshot(s, blk, "reconcile")
+
+    def poll(self):
+        if self._seen is None or (self._filter is None and not self._use_logs):
+            self.seed()  # never scan logs from block 0: start where the seeding read left off
+        if self._use_logs:
+            lo, logs = self._seen + 1, None
+            if self.batcher is not None and self.batcher.batching():
+                tip, logs = self._tip_and(lambda: self.w3.eth.get_logs({**self._params(), "fromBlock": lo, "toBlock": "latest"}))
+                logs = None if isinstance(logs, Exception) else [lg for lg in logs if lg["blockNumber"] <= tip]
+            else:
+                tip = self.w3.eth.block_number
+            if tip < lo:
+                return
+            if logs is None:
+                logs = self.w3.eth.get_logs({**self._params(), "fromBlock": lo, "toBlock": tip})
+            self._seen = tip
+        else:
+            logs = self._filter.get_new_entries()
+        for lg in logs:
+            self.cache.apply(decode_state(lg), (lg["blockNumber"], lg["logIndex"]), "log")
+
+    def run(self, stop_ev):
+        while not stop_ev.wait(self.poll_s):
+            try:
+                self.poll()
+                if time.monotonic() - self._last_reconcile > self.reconcile_s:
+                    self.reconcile()
+            except Exception as e:
+                print(f"[Follow] {e} (recreating filter)", file=sys.stderr)
+                self._filter = None
+
+    def start(self, stop_ev):
+        t = threading.Thread(target=self.run, args=(stop_ev,), name="state-follow", daemon=True)
+        t.start()
+        return t
+
+class AsyncStateFollower(StateFollower):
+    """StateFollower for an AsyncWeb3 (async_engine); run() is a task, cancelled on shutdown."""
+    def __init__(self, w3, contract, cache, poll_s=2.0, reconcile_s=300.0, tries=5, delay_s=0.4, batcher=None):
+        super().__init__(w3, contract, cache, None, poll_s, reconcile_s, batcher)
+        self.tries, self.delay_s = tries, delay_s
+
+    async def read_state_async(self, block_identifier="latest"):
+        last = None
+        for _ in range(self.tries):
+            try:
+                return (await self.contract.functions.readState().call(block_identifier=block_identifier)).upper()
+            except Exception as e:
+                last = e
+                await asyncio.sleep(self.delay_s)
+        raise last
+
+    async def seed(self):
+        if not self._use_logs:
+            try:
+                self._filter = await self.w3.eth.filter(self._params())
+            except Exception as e:
+                print(f"[Follow] no log filters on this RPC ({e}); polling eth_getLogs", file=sys.stderr)
+                self._use_logs = True
+        await self.reconcile()
+        self._seen = self.cache.block
+        return self.cache.state
+
+    async def _tip_and(self, call):
+        tip, res = await self.batcher.run(lambda: self.w3.eth.block_number, call, return_exceptions=True)
+        if isinstance(tip, Exception):
+            raise tip
+        return tip, res
+
+    async def reconcile(self):
+        if self.batcher is not None:
+            blk, s = await self._tip_and(lambda: self.contract.functions.readState().call())
+            s = await self.read_state_async(blk) if isinstance(s, Exception) else s.upper()
+        else:
+            blk = await self.w3.eth.block_number
+            s = await self.read_state_async(blk)
+        self.reconciles += 1
+        self._last_reconcile = time.monotonic()
+        if self.cache.state not in (None, s) and self.cache.block <= blk:
+            self.corrections += 1
+            print(f"[Follow] reconcile: cached {self.cache.state}, chain {s} at block {blk}", file=sys.stderr)
+        self.cache.snapshot(s, blk, "reconcile")
+
+    async def poll(self):
+        if self._seen is None or (self._filter is None and not self._use_logs):
+            await self.seed()  # never scan logs from block 0: start where the seeding read left off
+        if self._use_logs:
+            lo, logs = self._seen + 1, None
+            if self.batcher is not None and self.batcher.batching():
+                tip, logs = await self._tip_and(lambda: self.w3.eth.get_logs({**self._params(), "fromBlock": lo, "toBlock": "latest"}))
+                logs = None if isinstance(logs, Exception) else [lg for lg in logs if lg["blockNumber"] <= tip]
+            else:
+                tip = await self.w3.eth.block_number
+            if tip < lo:
+                return
+            if logs is None:
+                logs = await self.w3.eth.get_logs({**self._params(), "fromBlock": lo, "toBlock": tip})
+            self._seen = tip
+        else:
+            logs = await self._filter.get_new_entries()
+        for lg in logs:
+            self.cache.apply(decode_state(lg), (lg["blockNumber"], lg["logIndex"]), "log")
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.poll_s)
+            try:
+                await self.poll()
+                if time.monotonic() - self._last_reconcile > self.reconcile_s:
+                    await self.reconcile()
+            except Exception as e:
+                print(f"[Follow] {e} (recreating filter)", file=sys.stderr)
+                self._filter = None
@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+"""
+Nonce manager and pipelined transaction sender for the toggle app.
+
+NonceManager hands out nonces from a local counter: one
+get_transaction_count(..., "pending") at first use, then none until a send
+fails ("nonce too low" from another wallet/process, or any rejected send),
+which drops the cache so the next nonce is read from the chain again.
+
+TxPipeline signs and broadcasts on the caller's thread (no RPC besides
+send_raw_transaction) and tracks every in-flight transaction on a background
+thread, so a press never waits for the previous one to be mined. Receipts
+are polled oldest nonce first and the scan stops at the first unmined one
+(later nonces cannot be mined before it). A transaction pending longer than
+`stuck_after_s` is re-sent at the same nonce with both fee caps raised by
+`bump`, never above the caps (at most `max_bumps` times, and not at all once
+the caps leave less than the +10% a node accepts; without an oracle txs are
+sent at the caps, so they are never re-sent); every hash sent for a nonce is checked,
+since any of them may be the one that lands. A bump the node refuses still
+counts towards `max_bumps`. One still unmined `receipt_timeout_s` after its
+first send is given up, bumped or not: finished with an error (on_done), its
+slot freed and the nonce re-read from the chain's latest count, so the next
+send replaces it. With a feeoracle.FeeOracle the
+fees come from fee history instead of the fixed caps, and each mined tx's
+time to inclusion is fed back to it (and to `inclusion`, e.g. a metrics
+histogram, if given).
+
+AsyncTxPipeline is the same for an AsyncWeb3 (async_engine): receipts are
+tracked by a task on the event loop instead of a thread.
+"""
+import sys, asyncio, threading, time
+from web3.exceptions import TransactionNotFound
+
+def _msg(exc) -> str:
+    return str(getattr(exc, "message", None) or exc).lower()
+
+def pick_fees(oracle, caps):
+    """(tier, fees) from a FeeOracle, or (None, the fixed caps) without one."""
+    return oracle.fees() if oracle is not None else (None, dict(caps))
+
+def _min_replacement(v) -> int:
+    return (v * 11 + 9) // 10  # nodes (geth price bump) refuse a replacement that raises a fee by < 10%
+
+def bumped_fees(fees, bump, caps, oracle=None):
+    """Replacement fees: every field raised by `bump`, or to the oracle's current pick if higher, at most
+    the caps. None if the caps leave no room to raise both fields by the 10% a node accepts."""
+    out = {k: int(v * bump) + 1 for k, v in fees.items()}
+    if oracle is not None:
+        tier, fresh = oracle.fees()
+        if tier is not None:
+            out = {k: max(v, fresh[k]) for k, v in out.items()}
+    out = {k: min(v, caps[k]) for k, v in out.items()}
+    if any(out[k] < _min_replacement(v) for k, v in fees.items()):
+        return None
+    return out
+
+def _given_up(tx, timeout_s):
+    print(f"[Tx] nonce {tx.nonce} still unmined {timeout_s:.0f}s after sending ({tx.bumps} fee bump(s)), giving up",
+          file=sys.stderr)
+    return TimeoutError(f"tx nonce {tx.nonce} not mined within {timeout_s:.0f}s ({tx.bumps} fee bump(s))")
+
+def is_nonce_too_low(exc) -> bool:
+    m = _msg(exc)
+    return "nonce too low" in m or "nonce has already been used" in m
+
+def is_already_known(exc) -> bool:
+    m = _msg(exc)
+    return "already known" in m or "known transaction" in m
+
+class NonceManager:
+    def __init__(self, w3, address):
+        self.w3, self.address = w3, address
+        self.syncs = 0
+        self._next = None
+        self._sync_from = "pending"
+        self._lock = threading.Lock()
+
+    def next(self) -> int:
+        with self._lock:
+            if self._next is None:
+                self._next = self.w3.eth.get_transaction_count(self.address, self._sync_from)
+                self._sync_from = "pending"
+                self.syncs += 1
+            n = self._next
+            self._next += 1
+            return n
+
+    def prime(self, pending):
+        """Pending nonce fetched elsewhere (e.g. batched with the startup reads); ignored once counting."""
+        with self._lock:
+            if self._next is None:
+                self._next = pending
+                self.syncs += 1
+
+    def resync(self, block_identifier="pending"):
+        """Forget the local counter; the next nonce is read from the chain ("latest": reuse a nonce
+        whose tx was given up on, so the next send replaces it)."""
+        with self._lock:
+            self._next = None
+            self._sync_from = block_identifier
+
+class InFlight:
+    __slots__ = ("nonce", "hashes", "fees", "tier", "sent_at", "first_sent", "bumps", "bump_failures", "capped", "tag", "receipt", "receipt_at",
+                 "error", "done")
+    def __init__(self, nonce, fees, tag=None, tier=None):
+        self.nonce, self.fees, self.tag, self.tier = nonce, fees, tag, tier
+        self.hashes = []
+        self.sent_at = self.first_sent = time.monotonic()
+        self.bumps = self.bump_failures = 0  # replacements sent / refused by the node
+        self.capped = False  # fees at the caps: no further replacement
+        self.receipt = self.receipt_at = self.error = None
+        self.done = threading.Event()
+
+    @property
+    def tx_hash(self):
+        return self.hashes[-1]
+
+    def wait(self, timeout=None):
+        """Block until mined; returns the receipt or raises the tracking error."""
+        if not self.done.wait(timeout):
+            raise TimeoutError(f"tx nonce {self.nonce} not mined within {timeout}s")
+        if self.error is not None:
+            raise self.error
+        return self.receipt
+
+class TxPipeline:
+    def __init__(self, w3, acct, to, data, chain_id, caps, gas=120000, max_inflight=8, poll_s=0.25,
+                 stuck_after_s=30.0, bump=1.125, max_bumps=5, receipt_timeout_s=180.0, on_done=None, oracle=None,
+                 inclusion=None):
+        self.w3, self.acct = w3, acct
+        self.base_tx = {"to": to, "data": data, "value": 0, "gas": gas, "chainId": chain_id, "type": 2}
+        self.caps = dict(caps)
+        self.oracle = oracle  # feeoracle.FeeOracle: fees per tx from fee history, fed back with inclusion times
+        self.inclusion = inclusion  # anything with observe(seconds from first send to mined)
+        self.max_inflight = max_inflight
+        self.poll_s = poll_s
+        self.stuck_after_s = stuck_after_s
+        self.bump = bump
+        self.max_bumps = max_bumps
+        self.receipt_timeout_s = receipt_timeout_s  # give up on a tx still unmined this long after its first send
+        self.on_done = on_done  # on_done(inflight) from the tracker thread (receipt or error set)
+        self.nonces = NonceManager(w3, acct.address)
+        self.sent = self.mined = self.failed = self.replaced = self.resyncs = self.receipt_calls = 0
+        self._inflight = {}  # nonce -> InFlight
+        self._cond = threading.Condition()
+        self._send_lock = threading.Lock()
+        self._stop = False
+        self._thread = threading.Thread(target=self._track, name="tx-track", daemon=True)
+        self._thread.start()
+
+    def prime_nonce(self, pending):
+        self.nonces.prime(pending)
+
+    def __len__(self):
+        with self._cond:
+            return len(self._inflight)
+
+    # ----- sending -----
+    def _send(self, nonce, fees) -> str:
+        signed = self.acct.sign_transaction({**self.base_tx, "nonce": nonce, **fees})
+        raw = getattr(signed, "rawTransaction", None) or getattr(signed, "raw_transaction", None)
+        try:
+            h = self.w3.eth.send_raw_transaction(raw)
+        except Exception as e:
+            if not is_already_known(e):
+                raise
+            h = signed.hash
+        return "0x" + bytes(h).hex()
+
+    def submit(self, tag=None, timeout=None) -> InFlight:
+        """Sign and broadcast one transaction; blocks only while max_inflight are pending."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: len(self._inflight) < self.max_inflight or self._stop, timeout):
+                raise TimeoutError("too many transactions in flight")
+        with self._send_lock:
+            nonce = self.nonces.next()
+            tier, fees = pick_fees(self.oracle, self.caps)
+            try:
+                h = self._send(nonce, fees)
+            except Exception as e:
+                self.nonces.resync(); self.resyncs += 1
+                if not is_nonce_too_low(e):
+                    raise
+                print(f"[Nonce] {nonce} too low, resyncing", file=sys.stderr)
+                nonce = self.nonces.next()
+                h = self._send(nonce, fees)
+            tx = InFlight(nonce, fees, tag, tier)
+            tx.hashes.append(h)
+            self.sent += 1
+        with self._cond:
+            self._inflight[nonce] = tx
+            self._cond.notify_all()
+        return tx
+
+    def _replace(self, tx):
+        fees = bumped_fees(tx.fees, self.bump, self.caps, self.oracle)
+        if fees is None:
+            tx.capped = True
+            print(f"[Tx] nonce {tx.nonce} stuck at the fee caps, not re-sent", file=sys.stderr)
+            return
+        try:
+            with self._send_lock:
+                h = self._send(tx.nonce, fees)
+        except Exception as e:
+            print(f"[Tx] fee bump for nonce {tx.nonce} failed: {e}", file=sys.stderr)
+            tx.bump_failures += 1; tx.sent_at = time.monotonic()
+            return
+        tx.hashes.append(h); tx.fees = fees; tx.bumps += 1; tx.sent_at = time.monotonic()
+        self.replaced += 1
+        print(f"[Tx] nonce {tx.nonce} stuck, re-sent with maxFee={fees['maxFeePerGas']} -> {h[:10]}…", file=sys.stderr)
+
+    # ----- tracking -----
+    def _receipt(self, tx):
+        for h in reversed(tx.hashes):
+            self.receipt_calls += 1
+            try:
+                return self.w3.eth.get_transaction_receipt(h)
+            except TransactionNotFound:
+                continue
+        return None
+
+    def _finish(self, tx, receipt=None, error=None):
+        tx.receipt, tx.error, tx.receipt_at = receipt, error, time.monotonic()
+        if error is None and receipt is not None and receipt["status"] == 1:
+            self.mined += 1
+            if self.oracle is not None:
+                self.oracle.observe(tx.tier, tx.receipt_at - tx.first_sent, tx.bumps)
+            if self.inclusion is not None:
+                self.inclusion.observe(tx.receipt_at - tx.first_sent)
+        else:
+            self.failed += 1
+        with self._cond:
+            self._inflight.pop(tx.nonce, None)
+            self._cond.notify_all()
+        tx.done.set()
+        if self.on_done is not None:
+            try:
+                self.on_done(tx)
+            except Exception as e:
+                print(f"[Tx] on_done: {e}", file=sys.stderr)
+
+    def _track(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._inflight or self._stop)
+                if self._stop:
+                    return
+                pending = [self._inflight[n] for n in sorted(self._inflight)]
+            for tx in pending:
+                try:
+                    rcpt = self._receipt(tx)
+                except Exception as e:
+                    print(f"[Tx] receipt poll failed: {e}", file=sys.stderr)
+                    break
+                if rcpt is not None:
+                    self._finish(tx, rcpt)
+                    continue
+                if time.monotonic() - tx.first_sent > self.receipt_timeout_s:
+                    self.nonces.resync("latest"); self.resyncs += 1  # "pending" still counts the abandoned tx
+                    self._finish(tx, error=_given_up(tx, self.receipt_timeout_s))
+                    continue
+                if time.monotonic() - tx.sent_at > self.stuck_after_s:
+                    try:
+                        used = self.w3.eth.get_transaction_count(self.acct.address, "latest") > tx.nonce
+                    except Exception as e:
+                        print(f"[Tx] nonce check failed: {e}", file=sys.stderr)
+                        break
+                    if used:
+                        # nonce used by a transaction we did not send (another wallet/process)
+                        self.nonces.resync(); self.resyncs += 1
+                        self._finish(tx, error=RuntimeError(f"nonce {tx.nonce} was used by another transaction"))
+                        continue
+                    if tx.bumps + tx.bump_failures < self.max_bumps and not tx.capped:
+                        self._replace(tx)
+                break  # later nonces cannot be mined before this one
+            with self._cond:
+                if self._stop:
+                    return
+                self._cond.wait(self.poll_s)
+
+    def wait_idle(self, timeout=None) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._inflight, timeout)
+
+    def close(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        self._thread.join(timeout=2.0)
+
+    def stats(self) -> dict:
+        return {"sent": self.sent, "mined": self.mined, "failed": self.failed, "replaced": self.replaced,
+                "nonce_syncs": self.nonces.syncs, "resyncs": self.resyncs, "receipt_calls": self.receipt_calls,
+                "inflight": len(self)}
+
+# ---------- asyncio (AsyncWeb3) ----------
+class AsyncInFlight(InFlight):
+    __slots__ = ()
+    def __init__(self, nonce, fees, tag=None, tier=None):
+        super().__init__(nonce, fees, tag, tier)
+        self.done = asyncio.Event()
+
+    async def wait(self, timeout=None):
+        try:
+            await asyncio.wait_for(self.done.wait(), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"tx nonce {self.nonce} not mined within {timeout}s") from None
+        if self.error is not None:
+            raise self.error
+        return self.receipt
+
+class AsyncTxPipeline:
+    """TxPipeline for an AsyncWeb3: same nonce, tracking and fee-bump rules, tracked by a task."""
+    def __init__(self, w3, acct, to, data, chain_id, caps, gas=120000, max_inflight=8, poll_s=0.25,
+                 stuck_after_s=30.0, bump=1.125, max_bumps=5, receipt_timeout_s=180.0, on_done=None, oracle=None,
+                 inclusion=None):
+        self.w3, self.acct = w3, acct
+        self.base_tx = {"to": to, "data": data, "value": 0, "gas": gas, "chainId": chain_id, "type": 2}
+        self.caps = dict(caps)
+        self.oracle = oracle
+        self.inclusion = inclusion
+        self.max_inflight = max_inflight
+        self.poll_s = poll_s
+        self.stuck_after_s = stuck_after_s
+        self.bump = bump
+        self.max_bumps = max_bumps
+        self.receipt_timeout_s = receipt_timeout_s
+        self.on_done = on_done
+        self.sent = self.mined = self.failed = self.replaced = self.resyncs = self.receipt_calls = self.nonce_syncs = 0
+        self._next = None
+        self._sync_from = "pending"
+        self._inflight = {}
+        self._cond = None
+        self._send_lock = None
+        self._task = None
+
+    def prime_nonce(self, pending):
+        if self._next is None:
+            self._next = pending
+            self.nonce_syncs += 1
+
+    def __len__(self):
+        return len(self._inflight)
+
+    def start(self):
+        self._cond = asyncio.Condition()
+        self._send_lock = asyncio.Lock()
+        self._task = asyncio.get_running_loop().create_task(self._track(), name="tx-track")
+        self._task.add_done_callback(self._tracker_done)
+        return self
+
+    @staticmethod
+    def _tracker_done(task):
+        # started outside the engine's TaskGroup: an unexpected exit would otherwise go unnoticed
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[Tx] receipt tracker stopped: {task.exception()!r}", file=sys.stderr)
+
+    async def _nonce(self):
+        if self._next is None:
+            self._next = await self.w3.eth.get_transaction_count(self.acct.address, self._sync_from)
+            self._sync_from = "pending"
+            self.nonce_syncs += 1
+        n = self._next
+        self._next += 1
+        return n
+
+    async def _send(self, nonce, fees) -> str:
+        signed = self.acct.sign_transaction({**self.base_tx, "nonce": nonce, **fees})
+        raw = getattr(signed, "rawTransaction", None) or getattr(signed, "raw_transaction", None)
+        try:
+            h = await self.w3.eth.send_raw_transaction(raw)
+        except Exception as e:
+            if not is_already_known(e):
+                raise
+            h = signed.hash
+        return "0x" + bytes(h).hex()
+
+    async def submit(self, tag=None, timeout=None) -> AsyncInFlight:
+        async with self._cond:
+            await asyncio.wait_for(self._cond.wait_for(lambda: len(self._inflight) < self.max_inflight), timeout)
+        async with self._send_lock:
+            nonce = await self._nonce()
+            tier, fees = pick_fees(self.oracle, self.caps)
+            try:
+                h = await self._send(nonce, fees)
+            except Exception as e:
+                self._next = None; self.resyncs += 1
+                if not is_nonce_too_low(e):
+                    raise
+                print(f"[Nonce] {nonce} too low, resyncing", file=sys.stderr)
+                nonce = await self._nonce()
+                h = await self._send(nonce, fees)
+            tx = AsyncInFlight(nonce, fees, tag, tier)
+            tx.hashes.append(h)
+            self.sent += 1
+        async with self._cond:
+            self._inflight[nonce] = tx
+            self._cond.notify_all()
+        return tx
+
+    async def _replace(self, tx):
+        fees = bumped_fees(tx.fees, self.bump, self.caps, self.oracle)
+        if fees is None:
+            tx.capped = True
+            print(f"[Tx] nonce {tx.nonce} stuck at the fee caps, not re-sent", file=sys.stderr)
+            return
+        try:
+            async with self._send_lock:
+                h = await self._send(tx.nonce, fees)
+        except Exception as e:
+            print(f"[Tx] fee bump for nonce {tx.nonce} failed: {e}", file=sys.stderr)
+            tx.bump_failures += 1; tx.sent_at = time.monotonic()
+            return
+        tx.hashes.append(h); tx.fees = fees; tx.bumps += 1; tx.sent_at = time.monotonic()
+        self.replaced += 1
+        print(f"[Tx] nonce {tx.nonce} stuck, re-sent with maxFee={fees['maxFeePerGas']} -> {h[:10]}…", file=sys.stderr)
+
+    async def _receipt(self, tx):
+        for h in reversed(tx.hashes):
+            self.receipt_calls += 1
+            try:
+                return await self.w3.eth.get_transaction_receipt(h)
+            except TransactionNotFound:
+                continue
+        return None
+
+    async def _finish(self, tx, receipt=None, error=None):
+        tx.receipt, tx.error, tx.receipt_at = receipt, error, time.monotonic()
+        if error is None and receipt is not None and receipt["status"] == 1:
+            self.mined += 1
+            if self.oracle is not None:
+                self.oracle.observe(tx.tier, tx.receipt_at - tx.first_sent, tx.bumps)
+            if self.inclusion is not None:
+                self.inclusion.observe(tx.receipt_at - tx.first_sent)
+        else:
+            self.failed += 1
+        async with self._cond:
+            self._inflight.pop(tx.nonce, None)
+            self._cond.notify_all()
+        tx.done.set()
+        if self.on_done is not None:
+            try:
+                self.on_done(tx)
+            except Exception as e:
+                print(f"[Tx] on_done: {e}", file=sys.stderr)
+
+    async def _track(self):
+        while True:
+            async with self._cond:
+                await self._cond.wait_for(lambda: self._inflight)
+                pending = [self._inflight[n] for n in sorted(self._inflight)]
+            for tx in pending:
+                try:
+                    rcpt = await self._receipt(tx)
+                except Exception as e:
+                    print(f"[Tx] receipt poll failed: {e}", file=sys.stderr)
+                    break
+                if rcpt is not None:
+                    await self._finish(tx, rcpt)
+                    continue
+                if time.monotonic() - tx.first_sent > self.receipt_timeout_s:
+                    self._next, self._sync_from = None, "latest"; self.resyncs += 1
+                    await self._finish(tx, error=_given_up(tx, self.receipt_timeout_s))
+                    continue
+                if time.monotonic() - tx.sent_at > self.stuck_after_s:
+                    try:
+                        used = await self.w3.eth.get_transaction_count(self.acct.address, "latest") > tx.nonce
+                    except Exception as e:
+                        print(f"[Tx] nonce check failed: {e}", file=sys.stderr)
+                        break
+                    if used:
+                        self._next = None; self.resyncs += 1
+                        await self._finish(tx, error=RuntimeError(f"nonce {tx.nonce} was used by another transaction"))
+                        continue
+                    if tx.bumps + tx.bump_failures < self.max_bumps and not tx.capped:
+                        await self._replace(tx)
+                break
+            await asyncio.sleep(self.poll_s)
+
+    async def wait_idle(self, timeout=None) -> bool:
+        try:
+            async with self._cond:
+                await asyncio.wait_for(self._cond.wait_for(lambda: not self._inflight), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {"sent": self.sent, "mined": self.mined, "failed": self.failed, "replaced": self.replaced,
+                "nonce_syncs": self.nonce_syncs, "resyncs": self.resyncs, "receipt_calls": self.receipt_calls,
+                "inflight": len(self)}
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Reorg-aware confirmation stage between log ingest and the worker queue.
+
+Each GatePulse is tracked with its blockHash and released to the worker once
+it is `policy(value)` blocks deep, so small pulses can act at the tip while
+large ones wait. Released events are tagged by depth at release time:
+"tip" (< safe_depth), "safe" (< final_depth) or "finalized".
+
+Heads are fed through on_head(); a ring of recent block hashes is kept
+contiguous (missing ancestors are fetched) and each new header is checked
+against its parent. On a mismatch the stage walks back to the fork point,
+drops pending events from orphaned blocks and emits a retraction for every
+orphaned event that was already released, then calls on_reorg(fork_block)
+so the caller can re-ingest the new canonical blocks. Tracking stops once an
+event is final_depth deep, so the stage is idle (and costs no RPC) when
+there is nothing in flight.
+"""
+import threading
+
+TIP, SAFE, FINALIZED = "tip", "safe", "finalized"
+
+class DepthPolicy:
+    """Confirmations required per pulse: first rule with value <= max_value wins.
+
+    GatePulse value = floor(amount / 100 tokens), so thresholds on value are
+    thresholds on the deposited amount.
+    """
+    def __init__(self, rules=((5, 0), (50, 3)), default=12):
+        self.rules = tuple(rules)
+        self.default = default
+
+    def __call__(self, value) -> int:
+        for max_value, depth in self.rules:
+            if value <= max_value:
+                return depth
+        return self.default
+
+class Tracked:
+    __slots__ = ("key", "blk", "block_hash", "value", "required", "payload", "released", "tag")
+    def __init__(self, key, blk, block_hash, value, required, payload):
+        self.key, self.blk, self.block_hash = key, blk, block_hash
+        self.value, self.required, self.payload = value, required, payload
+        self.released, self.tag = False, None
+
+class BlockRing:
+    """number -> hash for the most recent `size` canonical blocks."""
+    def __init__(self, size=256):
+        self.size = size
+        self._h = {}
+        self.top = None
+
+    def get(self, n):
+        return self._h.get(n)
+
+    def put(self, n, h):
+        self._h[n] = h
+        self.top = n if self.top is None else max(self.top, n)
+        if len(self._h) > 2 * self.size:
+            for k in [k for k in self._h if k <= self.top - self.size]:
+                del self._h[k]
+
+    def clear(self):
+        self._h.clear()
+        self.top = None
+
+    def truncate(self, n):
+        """Forget everything above block n (chain got shorter / reorged)."""
+        for k in [k for k in self._h if k > n]:
+            del self._h[k]
+        self.top = max(self._h, default=None)
+
+class Confirmer:
+    def __init__(self, get_header, on_release, on_retract, on_reorg=None, policy=None,
+                 safe_depth=3, final_depth=64, ring_size=256):
+        self.get_header = get_header   # get_header(number | "latest") -> {number, hash, parentHash}
+        self.on_release = on_release   # on_release(tracked, tag)
+        self.on_retract = on_retract   # on_retract(tracked)
+        self.on_reorg = on_reorg       # on_reorg(fork_block)
+        self.policy = policy or DepthPolicy()
+        self.safe_depth = safe_depth
+        self.final_depth = final_depth
+        self.ring = BlockRing(ring_size)
+        self.tip = None
+        self.reorgs = self.retractions = self.header_calls = 0
+        self._tracked = {}
+        self._lock = threading.RLock()
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._tracked)
+
+    def pending_block(self):
+        """Lowest block with a tracked event not released yet (None if there is none)."""
+        with self._lock:
+            return min((ev.blk for ev in self._tracked.values() if not ev.released), default=None)
+
+    def _fetch(self, n):
+        self.header_calls += 1
+        return self.get_header(n)
+
+    def tag_for(self, depth):
+        return TIP if depth < self.safe_depth else (SAFE if depth < self.final_depth else FINALIZED)
+
+    # ----- ingest side -----
+    def add(self, key, blk, block_hash, value, payload):
+        """Track a new log; releases immediately when its policy depth is already met."""
+        with self._lock:
+            if key in self._tracked:
+                return
+            ev = Tracked(key, blk, block_hash, value, self.policy(value), payload)
+            self._tracked[key] = ev
+            known = self.ring.get(blk)
+            if known is not None and known != block_hash:
+                # log from a block we already know is not canonical
+                del self._tracked[key]
+                return
+            tip = blk if self.tip is None else max(self.tip, blk)
+            if tip - blk >= ev.required and (ev.required == 0 or self._canonical(ev)):
+                self._release(ev, tip - blk)
+
+    def _release(self, ev, depth):
+        ev.released, ev.tag = True, self.tag_for(depth)
+        self.on_release(ev, ev.tag)
+
+    def _canonical(self, ev) -> bool:
+        h = self.ring.get(ev.blk)
+        if h is None:
+            hdr = self._fetch(ev.blk)
+            h = hdr["hash"]
+            self.ring.put(ev.blk, h)
+        return h == ev.block_hash
+
+    # ----- head side -----
+    def tick(self):
+        """Fetch the latest header and process it (call periodically while busy)."""
+        return self.on_head(self._fetch("latest"))
+
+    def on_head(self, head):
+        with self._lock:
+            n = head["number"]
+            if self.tip is not None and n <= self.tip and self.ring.get(n) == head["hash"]:
+                return self.tip  # repeated or lagging head (load-balanced RPCs), same chain
+            # keep the ring contiguous from the previous top up to the new head while
+            # events are in flight; after an idle gap start over (events not covered by
+            # the ring are verified one header each in _advance)
+            chain = [head]
+            top = self.ring.top
+            if top is not None and (not self._tracked or n - top > self.final_depth):
+                self.ring.clear(); top = None
+            if top is not None:
+                k = n - 1
+                while k > top and n - k < self.ring.size:
+                    chain.append(self._fetch(k)); k -= 1
+            fork = None
+            for hdr in reversed(chain):
+                num, parent = hdr["number"], hdr["parentHash"]
+                prev = self.ring.get(num - 1)
+                if prev is not None and prev != parent:
+                    f = self._find_fork(num - 1)
+                    fork = f if fork is None else min(fork, f)
+                known = self.ring.get(num)
+                if known is not None and known != hdr["hash"]:
+                    f = self._find_fork(num)
+                    fork = f if fork is None else min(fork, f)
+                self.ring.put(num, hdr["hash"])
+            if fork is not None:
+                self.ring.truncate(n)  # orphaned branch may have been longer
+            self.tip = n
+            if fork is not None:
+                self._orphan(fork)
+            self._advance()
+            return n
+
+    def _find_fork(self, n):
+        """Walk back from block n until our ring agrees with the chain; return the fork block."""
+        while n >= 0 and self.ring.get(n) is not None:
+            hdr = self._fetch(n)
+            if hdr["hash"] == self.ring.get(n):
+                return n
+            self.ring.put(n, hdr["hash"])
+            n -= 1
+        return n
+
+    def _orphan(self, fork):
+        self.reorgs += 1
+        for key, ev in list(self._tracked.items()):
+            if ev.blk > fork and self.ring.get(ev.blk) != ev.block_hash:
+                self._drop(ev)
+        if self.on_reorg is not None:
+            self.on_reorg(fork)
+
+    def _drop(self, ev):
+        del self._tracked[ev.key]
+        if ev.released:
+            self.retractions += 1
+            self.on_retract(ev)
+
+    def _advance(self):
+        stale = None
+        for ev in list(self._tracked.values()):
+            depth = self.tip - ev.blk
+            due = not ev.released and depth >= ev.required
+            if (due or ev.released) and not self._canonical(ev):
+                self._drop(ev)
+                stale = ev.blk if stale is None else min(stale, ev.blk)
+                continue
+            if due:
+                self._release(ev, depth)
+            if ev.released and depth >= self.final_depth:
+                del self._tracked[ev.key]
+        if stale is not None:
+            # orphan found by direct header check (block was outside the ring)
+            self.reorgs += 1
+            if self.on_reorg is not None:
+                self.on_reorg(stale - 1)
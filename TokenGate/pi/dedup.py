@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Bounded replay guard for GatePulse logs, keyed by chain position.
+
+A log is identified by (blockNumber, logIndex). Everything at or below the
+finalized watermark is remembered by that single position; only the
+unfinalized tail is held in a window kept in (block, logIndex) order
+(OrderedDict, whose front pops stay O(1) under churn, unlike a plain dict;
+a log that arrives out of order marks it for one re-sort before the next
+eviction). Each add/check is O(1) and memory is bounded by `window` entries
+regardless of uptime.
+
+The watermark moves to (`high - finality_depth`, ∞) as newer blocks are seen,
+or explicitly via finalize(). That relies on logs below the watermark having
+been delivered in order, which the scanner, the filter follower and the WS
+subscriber (gap-fill before pushes) all guarantee.
+"""
+import sys
+from collections import OrderedDict
+
+class DedupIndex:
+    def __init__(self, window=4096, finality_depth=64):
+        self.window = window
+        self.finality_depth = finality_depth
+        self.watermark = (-1, sys.maxsize)  # every position <= this has been seen
+        self.high = -1                      # highest block seen
+        self.evicted = 0
+        self._tail = OrderedDict()
+        self._ordered = True  # _tail's insertion order is block order
+        self._last = (-1, -1)  # last position added
+
+    def __len__(self):
+        return len(self._tail)
+
+    def seen(self, blk, lidx) -> bool:
+        key = (blk, lidx)
+        return key <= self.watermark or key in self._tail
+
+    def add(self, blk, lidx) -> bool:
+        """Record (blk, lidx); return False if it was already seen (a replay)."""
+        key = (blk, lidx)
+        if key <= self.watermark or key in self._tail:
+            return False
+        if key < self._last:
+            self._ordered = False
+        self._last = key
+        self._tail[key] = None
+        if blk > self.high:
+            self.high = blk
+            if self.finality_depth is not None:
+                self.finalize(blk - self.finality_depth)
+        if len(self._tail) > self.window:
+            self._sort()
+        while len(self._tail) > self.window:
+            # overflow: fold the oldest entry into the watermark
+            old, _ = self._tail.popitem(last=False)
+            self.evicted += 1
+            if old > self.watermark:
+                self.watermark = old
+        return True
+
+    def _sort(self):
+        if not self._ordered:
+            self._tail = OrderedDict.fromkeys(sorted(self._tail))
+            self._ordered = True
+
+    def rewind(self, block):
+        """Chain reorged after `block`: forget positions above it, including any the
+        watermark covered, so the new canonical logs there are admitted again."""
+        for key in [k for k in self._tail if k[0] > block]:
+            del self._tail[key]
+        self.high = min(self.high, block)
+        self.watermark = min(self.watermark, (block, sys.maxsize))
+        self._last = min(self._last, (block, sys.maxsize))
+
+    def finalize(self, block):
+        """Everything in blocks <= `block` has been processed; fold it into the watermark."""
+        mark = (block, sys.maxsize)
+        if mark <= self.watermark:
+            return
+        self.watermark = mark
+        self._sort()
+        tail = self._tail
+        while tail:
+            old = next(iter(tail))
+            if old[0] > block:
+                break
+            tail.popitem(last=False)
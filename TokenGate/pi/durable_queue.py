@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Durable pulse queue for the TokenGate worker (SQLite in WAL mode).
+
+Every released GatePulse is appended to an on-disk table and only marked
+done once the worker has finished the servo action (ack). Entries that were
+never acked — still queued, or mid-pulse when the process died or got
+SIGTERM — are replayed in order on the next start, and nothing is ever
+dropped for lack of room.
+
+Writes use group commit: put() only buffers, and a committer thread writes
+everything buffered within `group_window_s` in one transaction, i.e. one
+fsync (synchronous=FULL) per group instead of per event. flush() blocks until
+everything put so far is on disk; the listener calls it at the end of each
+log batch, before the scan checkpoint moves past those logs (pulses still
+waiting for confirmations are not here; they hold the checkpoint back). With
+group_commit=False every put() commits (and fsyncs) on its own.
+
+Entries are keyed (blockHash:logIndex); a key that is already stored, done or
+not, is ignored, so backfills and rescans never run a pulse twice. Done rows
+are kept for `keep_done` entries for that purpose and then pruned.
+
+Each entry belongs to a lane (one per gate when the listener drives several);
+lanes share the file and the group commit but are consumed independently
+through lane(name), which has the same put/get/ack API.
+"""
+import sys, json, sqlite3, threading, time
+from collections import deque
+from queue import Empty
+
+PENDING, DONE, RETRACTED = 0, 1, 2
+
+class DurableQueue:
+    def __init__(self, path, group_commit=True, group_window_s=0.005, max_batch=256, keep_done=10_000):
+        self.path = path
+        self.group_commit = group_commit
+        self.group_window_s = group_window_s
+        self.max_batch = max_batch
+        self.keep_done = keep_done
+        self.commits = self.enqueued = self.duplicates = self.replayed = 0
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")  # WAL is fsynced at every commit
+        self._db.execute("CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                         "key TEXT UNIQUE NOT NULL, item TEXT NOT NULL, state INTEGER NOT NULL DEFAULT 0)")
+        if "lane" not in {r[1] for r in self._db.execute("PRAGMA table_info(events)")}:
+            self._db.execute("ALTER TABLE events ADD COLUMN lane TEXT NOT NULL DEFAULT ''")
+        self._db.execute("CREATE INDEX IF NOT EXISTS pending ON events(id) WHERE state = 0")
+        self._db_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._buf = []           # (key, item, lane) waiting for the committer
+        self._ready = {}         # lane -> deque of (id, key, item, t_ready) committed, not yet handed out
+        self._put_seq = self._done_seq = 0
+        self._taken = {}         # key -> id handed to the worker, not acked yet
+        self._taken_key = {}     # id -> key
+        self._retracted = set()  # ids retracted after being handed out
+        self._acks = self._flushing = 0
+        self._stop = False
+        now = time.monotonic()
+        for qid, key, item, lane in self._db.execute(
+                "SELECT id, key, item, lane FROM events WHERE state = 0 ORDER BY id"):
+            self._lane_q(lane).append((qid, key, tuple(json.loads(item)), now))
+            self.replayed += 1
+        self._thread = None
+        if group_commit:
+            self._thread = threading.Thread(target=self._run, name="queue-commit", daemon=True)
+            self._thread.start()
+
+    def _lane_q(self, lane):
+        q = self._ready.get(lane)
+        if q is None:
+            q = self._ready[lane] = deque()
+        return q
+
+    def lane(self, name) -> "Lane":
+        return Lane(self, name)
+
+    # ----- producer side -----
+    def put(self, key, item, lane=""):
+        """Append an entry (a JSON-serialisable tuple); durable after flush() or the group window."""
+        if not self.group_commit:
+            self._commit([(key, item, lane)])
+            return
+        with self._cond:
+            self._buf.append((key, item, lane))
+            self._put_seq += 1
+            self._cond.notify_all()
+
+    def flush(self, timeout=None) -> bool:
+        """Block until everything put so far is committed."""
+        if not self.group_commit:
+            return True
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            target = self._put_seq
+            self._flushing += 1
+            self._cond.notify_all()
+            try:
+                while self._done_seq < target:
+                    left = None if end is None else end - time.monotonic()
+                    if left is not None and left <= 0:
+                        return False
+                    self._cond.wait(left)
+            finally:
+                self._flushing -= 1
+        return True
+
+    def discard(self, key) -> bool:
+        """Retract an entry that has not been acked (reorged-out pulse). Entries the
+        worker already took are reported by retracted(id) so it can skip them."""
+        with self._cond:
+            for i, (k, _, lane) in enumerate(self._buf):
+                if k == key:
+                    self._buf[i] = (k, None, lane)  # committer records it as retracted
+                    return True
+            if key in self._taken:
+                qid = self._taken.pop(key)
+                del self._taken_key[qid]
+                self._retracted.add(qid)
+            else:
+                e = next((e for q in self._ready.values() for e in q if e[1] == key), None)
+                if e is None:
+                    return False
+                for q in self._ready.values():
+                    if e in q:
+                        q.remove(e)
+                qid = e[0]
+        self._set_state((qid,), RETRACTED)
+        return True
+
+    def retracted(self, qid) -> bool:
+        """True (once) if an entry handed out by get()/get_batch() was retracted since."""
+        with self._cond:
+            if qid in self._retracted:
+                self._retracted.discard(qid)
+                return True
+            return False
+
+    # ----- worker side -----
+    def get(self, timeout=None, lane=""):
+        """Return (id, item) of the oldest committed entry; raises queue.Empty on timeout."""
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            ready = self._lane_q(lane)
+            while not ready:
+                left = None if end is None else end - time.monotonic()
+                if left is not None and left <= 0:
+                    raise Empty
+                self._cond.wait(left)
+            qid, key, item, _ = ready.popleft()
+            self._taken[key], self._taken_key[qid] = qid, key
+            return qid, item
+
+    def get_batch(self, timeout=None, max_items=None, lane=""):
+        """Take every committed entry (up to max_items) as [(id, item, t_ready)];
+        waits up to `timeout` for the first one and returns [] if none arrives."""
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            ready = self._lane_q(lane)
+            while not ready:
+                left = None if end is None else end - time.monotonic()
+                if left is not None and left <= 0:
+                    return []
+                self._cond.wait(left)
+            n = len(ready) if max_items is None else min(max_items, len(ready))
+            out = []
+            for _ in range(n):
+                qid, key, item, t = ready.popleft()
+                self._taken[key], self._taken_key[qid] = qid, key
+                out.append((qid, item, t))
+            return out
+
+    def ack(self, *qids):
+        """The servo action for these entries completed; they will not be replayed."""
+        with self._cond:
+            for qid in qids:
+                self._taken.pop(self._taken_key.pop(qid, None), None)
+        self._set_state(qids, DONE)
+        before, self._acks = self._acks, self._acks + len(qids)
+        if self._acks // 256 != before // 256:
+            with self._db_lock:
+                self._db.execute("DELETE FROM events WHERE state != 0 AND id <= "
+                                 "(SELECT MAX(id) FROM events) - ?", (self.keep_done,))
+
+    def qsize(self, lane=None) -> int:
+        """Entries not handed out yet, in one lane or (None) in all of them."""
+        with self._cond:
+            if lane is None:
+                return sum(map(len, self._ready.values())) + len(self._buf)
+            return len(self._ready.get(lane, ())) + sum(1 for e in self._buf if e[2] == lane)
+
+    def empty(self, lane=None) -> bool:
+        return self.qsize(lane) == 0
+
+    def close(self):
+        if self._thread is not None:
+            self.flush(timeout=5.0)
+            with self._cond:
+                self._stop = True
+                self._cond.notify_all()
+            self._thread.join(timeout=5.0)
+        with self._db_lock:
+            self._db.close()
+
+    def stats(self) -> dict:
+        return {"enqueued": self.enqueued, "duplicates": self.duplicates, "commits": self.commits,
+                "replayed": self.replayed, "pending": self.qsize()}
+
+    # ----- storage -----
+    def _set_state(self, qids, state):
+        with self._db_lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.executemany("UPDATE events SET state = ? WHERE id = ?", [(state, q) for q in qids])
+            self._db.execute("COMMIT")
+
+    def _commit(self, batch):
+        added = []
+        with self._db_lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for key, item, lane in batch:
+                    state = PENDING if item is not None else RETRACTED
+                    cur = self._db.execute("INSERT OR IGNORE INTO events (key, item, state, lane) VALUES (?, ?, ?, ?)",
+                                           (key, json.dumps(item), state, lane))
+                    if cur.rowcount and item is not None:
+                        added.append((lane, (cur.lastrowid, key, tuple(item), time.monotonic())))
+                    elif not cur.rowcount:
+                        self.duplicates += 1
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        self.commits += 1
+        self.enqueued += len(added)
+        with self._cond:
+            for lane, e in added:
+                self._lane_q(lane).append(e)
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._buf and not self._stop:
+                    self._cond.wait()
+                if not self._buf:
+                    return
+                # group window: let a burst accumulate unless someone is waiting in flush()
+                end = time.monotonic() + self.group_window_s
+                while len(self._buf) < self.max_batch and not self._flushing and not self._stop:
+                    left = end - time.monotonic()
+                    if left <= 0:
+                        break
+                    self._cond.wait(left)
+                batch, self._buf = self._buf, []
+                seq = self._put_seq
+            try:
+                self._commit(batch)
+            except Exception as e:
+                print(f"[Queue] commit failed, retrying: {e}", file=sys.stderr)
+                with self._cond:
+                    self._buf[:0] = batch
+                time.sleep(0.5)
+                continue
+            with self._cond:
+                self._done_seq = seq
+                self._cond.notify_all()
+
+class Lane:
+    """One lane of a DurableQueue, with the queue API the worker uses."""
+    def __init__(self, queue, name):
+        self.queue, self.name = queue, name
+        self.retracted, self.ack, self.flush = queue.retracted, queue.ack, queue.flush
+
+    def put(self, key, item):
+        self.queue.put(key, item, self.name)
+
+    def get(self, timeout=None):
+        return self.queue.get(timeout, self.name)
+
+    def get_batch(self, timeout=None, max_items=None):
+        return self.queue.get_batch(timeout, max_items, self.name)
+
+    def qsize(self) -> int:
+        return self.queue.qsize(self.name)
+
+    def empty(self) -> bool:
+        return self.queue.qsize(self.name) == 0
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Fast-path decoder for TokenGate's GatePulse event.
+
+GatePulse(uint256 value, address indexed from, uint256 amount, uint256 timestamp)
+has a fixed layout: topics = [topic0, from (left-padded to 32 bytes)] and
+data = three 32-byte big-endian words (value, amount, timestamp). Instead of
+building a web3 event object and running the generic ABI decoder per log,
+the words are sliced directly and the sender is checksummed once per
+distinct address (cached). decode_batch() turns a get_logs result into a
+column-oriented GatePulseBatch; malformed logs are skipped with the reason
+kept in `errors`.
+
+Results match `contract.events.GatePulse().process_log(lg)` field for field
+(bench/bench_decode.py cross-checks them).
+"""
+from array import array
+from functools import lru_cache
+from eth_utils import keccak, to_checksum_address
+
+EVENT_SIG = "GatePulse(uint256,address,uint256,uint256)"
+TOPIC0 = keccak(text=EVENT_SIG)
+
+# Minimal ABI, used for the contract object and as the reference decoder
+GATE_ABI = [{
+    "type": "event",
+    "name": "GatePulse",
+    "anonymous": False,  # <-- important for web3 event decoder
+    "inputs": [
+        {"indexed": False, "name": "value",     "type": "uint256"},
+        {"indexed": True,  "name": "from",      "type": "address"},
+        {"indexed": False, "name": "amount",    "type": "uint256"},
+        {"indexed": False, "name": "timestamp", "type": "uint256"}
+    ]
+}]
+
+def _raw(b) -> bytes:
+    """Plain bytes from HexBytes (whose slices are HexBytes too) or a raw JSON-RPC hex string."""
+    return bytes.fromhex(b[2:] if b[:2] in ("0x", "0X") else b) if isinstance(b, str) else bytes(b)
+
+@lru_cache(maxsize=1024)
+def _sender(word: bytes) -> str:
+    if word[:12].strip(b"\0"):
+        raise ValueError("topics[1] is not an address")
+    return to_checksum_address(word[12:])
+
+class GatePulse:
+    """One decoded log (same fields as process_log's args plus its position)."""
+    __slots__ = ("value", "sender", "amount", "timestamp", "block", "log_index", "tx_hash", "block_hash",
+                 "address")
+    def __init__(self, value, sender, amount, timestamp, block, log_index, tx_hash, block_hash, address=None):
+        self.value, self.sender, self.amount, self.timestamp = value, sender, amount, timestamp
+        self.block, self.log_index, self.tx_hash, self.block_hash = block, log_index, tx_hash, block_hash
+        self.address = address  # emitting gate, as the provider returned it
+
+    def __repr__(self):
+        return (f"GatePulse(value={self.value}, sender={self.sender}, amount={self.amount}, "
+                f"timestamp={self.timestamp}, block={self.block}, log_index={self.log_index})")
+
+def decode(lg, topic0=TOPIC0) -> GatePulse:
+    """Decode a single log; raises ValueError if it is not a well-formed GatePulse."""
+    topics = lg["topics"]
+    if len(topics) != 2 or _raw(topics[0]) != topic0:
+        raise ValueError("not a GatePulse log")
+    data = _raw(lg["data"])
+    if len(data) != 96:
+        raise ValueError(f"GatePulse data is {len(data)} bytes, expected 96")
+    return GatePulse(int.from_bytes(data[:32], "big"), _sender(_raw(topics[1])),
+                     int.from_bytes(data[32:64], "big"), int.from_bytes(data[64:], "big"),
+                     lg["blockNumber"], lg["logIndex"], lg["transactionHash"], lg["blockHash"], lg.get("address"))
+
+class GatePulseBatch:
+    """Column store for a batch of decoded logs.
+
+    Positions and timestamps live in typed arrays; value/amount stay Python ints
+    (uint256) and sender/hash columns hold shared references. Indexing or
+    iterating yields GatePulse records in log order.
+    """
+    __slots__ = ("value", "sender", "amount", "timestamp", "block", "log_index", "tx_hash", "block_hash",
+                 "address", "errors")
+    def __init__(self):
+        self.value, self.sender, self.amount = [], [], []
+        self.timestamp, self.block, self.log_index = array("Q"), array("Q"), array("L")
+        self.tx_hash, self.block_hash, self.address = [], [], []
+        self.errors = []  # (position in the input, reason)
+
+    def __len__(self):
+        return len(self.block)
+
+    def __getitem__(self, i) -> GatePulse:
+        return GatePulse(self.value[i], self.sender[i], self.amount[i], self.timestamp[i],
+                         self.block[i], self.log_index[i], self.tx_hash[i], self.block_hash[i], self.address[i])
+
+    def __iter__(self):
+        return map(GatePulse, self.value, self.sender, self.amount, self.timestamp,
+                   self.block, self.log_index, self.tx_hash, self.block_hash, self.address)
+
+def decode_batch(logs, topic0=TOPIC0) -> GatePulseBatch:
+    """Decode an iterable of logs (get_logs / filter / subscription results)."""
+    b = GatePulseBatch()
+    value, sender, amount, ts = b.value.append, b.sender.append, b.amount.append, b.timestamp.append
+    block, lidx, txh, bh = b.block.append, b.log_index.append, b.tx_hash.append, b.block_hash.append
+    addr = b.address.append
+    from_bytes = int.from_bytes
+    for i, lg in enumerate(logs):
+        try:
+            topics = lg["topics"]
+            data = lg["data"]
+            if type(data) is str or type(topics[0]) is str:
+                topics = [_raw(t) for t in topics]; data = _raw(data)
+            else:
+                data = bytes(data)
+            if len(topics) != 2 or topics[0] != topic0:
+                raise ValueError("not a GatePulse log")
+            if len(data) != 96:
+                raise ValueError(f"GatePulse data is {len(data)} bytes, expected 96")
+            s = _sender(topics[1])
+            t = from_bytes(data[64:], "big")
+            if t >> 64:
+                raise ValueError("timestamp out of range")
+            pos = lg["blockNumber"], lg["logIndex"], lg["transactionHash"], lg["blockHash"], lg.get("address")
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            b.errors.append((i, str(e) or type(e).__name__))
+            continue
+        value(from_bytes(data[:32], "big")); sender(s)
+        amount(from_bytes(data[32:64], "big")); ts(t)
+        block(pos[0]); lidx(pos[1]); txh(pos[2]); bh(pos[3]); addr(pos[4])
+    return b
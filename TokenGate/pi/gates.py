@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Gate configuration and per-gate workers for the TokenGate listener.
+
+One listener can drive several TokenGate contracts. gates.json lists them
+with the lines each one is wired to:
+
+    {"chip": "/dev/gpiochip4",
+     "gates": [{"name": "front", "address": "0x...", "servo": 19, "led_red": 18, "led_green": 27},
+               {"name": "back",  "address": "0x...", "servo": 13, "led_red": 5,  "led_green": 6}]}
+
+A single scanner fetches GatePulse logs for every address in one get_logs
+call; GateRouter maps each decoded log to its gate by the emitting address.
+Every gate has its own queue lane, scheduler and GateWorker thread, so a long
+pulse on one gate never delays another. Only the gate marked "display"
+(default: the first) draws on the OLED.
+"""
+import sys, json, threading, time
+
+class GateConfig:
+    __slots__ = ("name", "address", "servo", "led_red", "led_green", "chip", "display")
+    def __init__(self, name, address, servo, led_red, led_green, chip=None, display=False):
+        from eth_utils import to_checksum_address  # not at import: the listener loads eth_utils after its first frame
+        self.name, self.address = name, to_checksum_address(address)
+        self.servo, self.led_red, self.led_green = servo, led_red, led_green
+        self.chip, self.display = chip, display
+
+def load_gates(path, default=None):
+    """Gates from a JSON config; `default` (a single GateConfig) if the file does not exist."""
+    try:
+        with open(path) as f:
+            cfg = json.load(f)
+    except FileNotFoundError:
+        if default is None:
+            raise
+        default.display = True
+        return [default]
+    gates = [GateConfig(g.get("name") or f"gate{i}", g["address"], g["servo"], g["led_red"], g["led_green"],
+                        g.get("chip", cfg.get("chip")), g.get("display", False))
+             for i, g in enumerate(cfg["gates"])]
+    names = [g.name for g in gates]
+    addrs = [g.address for g in gates]
+    if len(set(names)) != len(names) or len(set(addrs)) != len(addrs):
+        raise ValueError(f"{path}: gate names and addresses must be unique")
+    if gates and not any(g.display for g in gates):
+        gates[0].display = True
+    return gates
+
+class GateRouter:
+    """Emitting contract address -> gate (case-insensitive)."""
+    def __init__(self, gates):
+        self.gates = list(gates)
+        self._by_addr = {g.address.lower(): g for g in self.gates}
+        self.unrouted = 0
+
+    @property
+    def addresses(self):
+        return [g.address for g in self.gates]
+
+    def route(self, address):
+        g = self._by_addr.get(str(address).lower())
+        if g is None:
+            self.unrouted += 1
+        return g
+
+class GateWorker:
+    """Runs one gate's scheduled jobs on its own servo and LEDs (one thread per gate)."""
+    def __init__(self, cfg, queue, sched, servo, led_r, led_g, oled=None, center_us=1500, max_us=2400,
+                 title="TokenGate", on_job=None, on_done=None):
+        self.cfg, self.q, self.sched = cfg, queue, sched
+        self.servo, self.led_r, self.led_g = servo, led_r, led_g
+        self.oled = oled
+        self.center_us, self.max_us = center_us, max_us
+        self.title = title
+        self.on_job = on_job    # on_job(job, t_start), e.g. for latency measurements
+        self.on_done = on_done  # on_done(job, seconds) once the servo action finished (or failed)
+        self.thread = None
+
+    def start(self, stop_flag):
+        self.thread = threading.Thread(target=self.run, args=(stop_flag,), name=f"gate-{self.cfg.name}", daemon=True)
+        self.thread.start()
+        return self
+
+    def backlog(self):
+        return len(self.sched) + self.q.qsize()
+
+    def show(self, lines):
+        if self.oled is not None:
+            self.oled.text(lines)
+
+    def center(self, seconds=0.5):
+        self.servo.move(self.center_us, seconds)
+
+    def close(self):
+        self.center(0.6); self.sched.centered()
+        self.led_r.set_value(1); self.led_g.set_value(0)
+        self.show([self.title, "CENTER", f"Q:{self.backlog()}"])
+
+    def run(self, stop_flag):
+        q, sched = self.q, self.sched
+        tag = f"[Worker {self.cfg.name}]" if self.cfg.name else "[Worker]"
+        while not stop_flag.is_set():
+            sched.offer(q.get_batch(timeout=0 if len(sched) else 0.2))
+            job = sched.next_job(time.monotonic())
+            if job is None:
+                if sched.is_open:  # the pulses we stayed open for were retracted
+                    self.close(); self.servo.release()
+                continue
+            if self.on_job is not None:
+                self.on_job(job, time.monotonic())
+            value, sender, blk, txh, lidx = job.entries[0][1][:5]
+            if len(job) == 1:
+                print(f"{tag} handling value={value} from={sender} blk={blk} tx={txh} idx={lidx} (queue={self.backlog()})")
+            else:
+                print(f"{tag} handling {len(job)} merged pulses value={job.value} from={','.join(sorted(job.senders))} "
+                      f"blk={blk}..{job.entries[-1][1][2]} (queue={self.backlog()})")
+            done, skipped, open_s, t0 = True, False, 0.0, time.monotonic()
+            try:
+                if job.value <= 0:
+                    self.show([self.title, "Pulse: 0s", f"CENTER | Q:{self.backlog()}"])
+                    self.led_r.set_value(1); self.led_g.set_value(0)
+                    if sched.needs_center(job):
+                        self.center(0.5)
+                    else:
+                        skipped = True
+                    sched.centered()
+                else:
+                    # MAX with countdown (one-second steps on absolute deadlines,
+                    # so OLED redraw time does not stretch the open window)
+                    self.led_r.set_value(0); self.led_g.set_value(1)
+                    self.servo.set_position(self.max_us); sched.opened()
+                    t_end = t_open = time.monotonic()
+                    title = f"Pulse: {job.value}s" + (f" x{len(job)}" if len(job) > 1 else "")
+                    for remaining in range(job.value, 0, -1):
+                        t_end += 1.0
+                        self.show([title, f"Remaining: {remaining}s", f"Q:{self.backlog()}"])
+                        if stop_flag.wait(max(0.0, t_end - time.monotonic())):
+                            done = False  # interrupted: not acked, replayed in full on next start
+                            break
+                    open_s = time.monotonic() - t_open
+                    # Return to center, unless the next pulse is already waiting
+                    sched.offer(q.get_batch(timeout=0))
+                    if not done or sched.close_after(job):
+                        self.close()
+                    else:
+                        skipped = True
+                if not self.backlog() and not sched.is_open:
+                    self.servo.release()  # idle: no holding pulses, like before
+            except Exception as e:
+                print(f"{tag} error: {e}", file=sys.stderr)
+            finally:
+                took = time.monotonic() - t0
+                sched.account(took, open_s, skipped)
+                if self.on_done is not None:
+                    self.on_done(job, took)
+                if done:
+                    q.ack(*(e[0] for e in job.entries))
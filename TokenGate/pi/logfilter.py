@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Server-side log filter engine (eth_newFilter / eth_getFilterChanges) for HTTP providers.
+
+The filter is installed once, so each poll is a single small request that
+returns only logs the node has not handed out yet. The poll interval follows
+the chain instead of a fixed 1s: the block time is derived from block
+timestamps, polls run at half a block right after a GatePulse (follow-up
+deposits tend to come in bursts) and back off towards `max_s` while idle.
+
+Filters are dropped by providers after inactivity, node restarts or backend
+fail-over; a "filter not found" answer re-installs it and gap-fills the
+missed range with the LogScanner. Like the WS subscriber, a periodic refresh
+(`refresh_s`, two eth_getBlockByNumber calls) re-measures block time and
+advances the checkpoint to the tip seen at the previous refresh.
+"""
+import sys, time
+
+FILTER_GONE = ("filter not found", "filter does not exist", "unknown filter", "filter id")
+
+def is_filter_gone(exc) -> bool:
+    msg = str(exc).lower()
+    return any(s in msg for s in FILTER_GONE)
+
+# ---------- Adaptive poll interval ----------
+class AdaptiveInterval:
+    """Poll interval driven by block time, recent activity and idleness."""
+    def __init__(self, block_time=2.0, min_s=0.25, max_s=10.0, hot_s=60.0, backoff=1.5):
+        self.min_s = min_s
+        self.max_s = max_s
+        self.hot_s = hot_s
+        self.backoff = backoff
+        self.block_time = block_time
+        self.interval = block_time
+        self._hot_until = 0.0
+
+    def set_block_time(self, seconds):
+        self.block_time = max(self.min_s, seconds)
+        self.interval = min(max(self.interval, self.block_time / 2), self.max_s)
+
+    def on_events(self):
+        self._hot_until = time.monotonic() + self.hot_s
+        self.interval = max(self.min_s, self.block_time / 2)
+
+    def on_empty(self):
+        if time.monotonic() < self._hot_until:
+            self.interval = max(self.min_s, self.block_time / 2)
+        else:
+            self.interval = min(self.max_s, max(self.block_time, self.interval * self.backoff))
+
+# ---------- Filter follower ----------
+class FilterFollower:
+    """Follow GatePulse logs through an installed log filter, feeding `on_logs(logs)`.
+
+    `run(last_block)` mirrors LogSubscriber.run: it blocks until `stop_flag`
+    is set or `max_failures` consecutive requests fail, and returns the last
+    block known to be fully delivered.
+    """
+    def __init__(self, w3, address, topic0, scanner, on_logs, stop_flag, interval=None,
+                 refresh_s=600.0, sample_blocks=64, max_failures=5):
+        self.w3 = w3
+        self.address = address  # one gate address or a list (multi-gate)
+        self.topic0 = topic0
+        self.scanner = scanner
+        self.on_logs = on_logs
+        self.stop_flag = stop_flag
+        self.interval = interval or AdaptiveInterval()
+        self.refresh_s = refresh_s
+        self.sample_blocks = sample_blocks
+        self.max_failures = max_failures
+        self.calls = 0
+        self.last_block = None
+        self._filter_id = None
+        self._synced_tip = None  # tip seen at the previous refresh
+        self._refreshed_at = 0.0
+
+    def _install(self):
+        """(Re)install the filter, then gap-fill everything after last_block."""
+        self.calls += 1
+        self._filter_id = self.w3.eth.filter({"address": self.address, "topics": [self.topic0]}).filter_id
+        tip = self._refresh()
+        if tip > self.last_block:
+            before = self.scanner.requests
+            self.last_block = self.scanner.scan(self.last_block + 1, tip, self.on_logs, self.stop_flag)
+            self.calls += self.scanner.requests - before
+        print(f"[Filter] installed {self._filter_id} at block {tip} (block time {self.interval.block_time:.2f}s)")
+
+    def _refresh(self) -> int:
+        """Re-measure block time from timestamps; advance the checkpoint; return the tip."""
+        self.calls += 2
+        head = self.w3.eth.get_block("latest")
+        base = self.w3.eth.get_block(max(0, head["number"] - self.sample_blocks))
+        if head["number"] > base["number"]:
+            self.interval.set_block_time((head["timestamp"] - base["timestamp"]) / (head["number"] - base["number"]))
+        if self._synced_tip is not None and self._synced_tip > self.last_block:
+            self.last_block = self._synced_tip
+            if self.scanner.checkpoint is not None:
+                self.scanner.checkpoint.save(self.last_block)
+        self._synced_tip = head["number"]
+        self._refreshed_at = time.monotonic()
+        return head["number"]
+
+    def run(self, last_block) -> int:
+        self.last_block = last_block
+        failures = 0
+        while not self.stop_flag.is_set() and failures < self.max_failures:
+            try:
+                if self._filter_id is None:
+                    self._install()
+                elif time.monotonic() - self._refreshed_at >= self.refresh_s:
+                    self._refresh()
+                self.calls += 1
+                logs = self.w3.eth.get_filter_changes(self._filter_id)
+                failures = 0
+            except Exception as e:
+                if self._filter_id is not None and is_filter_gone(e):
+                    print(f"[Filter] expired, re-installing: {e}", file=sys.stderr)
+                else:
+                    failures += 1
+                    print(f"[Filter] error ({failures}/{self.max_failures}): {e}", file=sys.stderr)
+                self._filter_id = None
+                if failures:
+                    self.stop_flag.wait(min(30.0, 2.0 ** failures))
+                continue
+            logs = [lg for lg in logs if not lg.get("removed")]
+            if logs:
+                logs.sort(key=lambda lg: (lg["blockNumber"], lg["logIndex"]))
+                self.on_logs(logs)
+                self.interval.on_events()
+            else:
+                self.interval.on_empty()
+            self.stop_flag.wait(self.interval.interval)
+        self._uninstall()
+        return self.last_block
+
+    def _uninstall(self):
+        if self._filter_id is None:
+            return
+        try:
+            self.w3.eth.uninstall_filter(self._filter_id)
+        except Exception:
+            pass
+        self._filter_id = None
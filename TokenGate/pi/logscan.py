@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Chunked, checkpointed, parallel eth_getLogs scanner for the TokenGate listener.
+
+A block range is split into chunks that are fetched concurrently on a bounded
+thread pool and handed back strictly in block order. The chunk size adapts:
+it halves (and the failed chunk is bisected) when the provider refuses a range
+with a "too many results"-style error, and doubles while results are sparse.
+After every chunk has been handed to the callback, the last fully processed
+block is written to a small checkpoint file so a restart resumes from there.
+"""
+import json, os, sys, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+# Substrings providers use when a getLogs range is too wide / returns too much
+RANGE_ERRORS = (
+    "too many", "more than", "limit exceeded", "response size", "range too large",
+    "block range", "range is too", "query timeout", "-32005",
+)
+
+def is_range_error(exc) -> bool:
+    msg = str(exc).lower()
+    return any(s in msg for s in RANGE_ERRORS)
+
+# ---------- Checkpoint ----------
+class Checkpoint:
+    """Last fully processed block, persisted atomically as JSON.
+
+    Saves are throttled to one every `min_interval_s` unless forced; the
+    scanner forces a save for chunks that produced events, right after
+    on_logs returns. Events can still be replayed: a crash between the two
+    delivers that chunk again on the next start. The listener absorbs
+    replays with its dedup index (and, across a restart, the durable
+    queue's blockHash:logIndex key), so they never pulse twice.
+
+    `hold()` returns the lowest block with events the caller still keeps only
+    in memory (e.g. pulses waiting for confirmations), or None. The saved
+    block then stays just below it, so a restart rescans those events instead
+    of skipping them; `block` is still the scan position.
+    """
+    def __init__(self, path, key="", min_interval_s=10.0, hold=None):
+        self.path = path
+        self.key = key
+        self.min_interval_s = min_interval_s
+        self.hold = hold
+        self.block = None
+        self.saved = None  # block last written to the file
+        self._saved_at = 0.0
+        self._lock = threading.Lock()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self.key and data.get("key") != self.key:
+            return None  # checkpoint belongs to another gate
+        self.block = self.saved = int(data["block"])
+        return self.block
+
+    def save(self, block, force=False):
+        held = self.hold() if self.hold is not None else None
+        with self._lock:
+            self.block = block
+            if held is not None:
+                block = min(block, held - 1)
+            now = time.monotonic()
+            if block == self.saved or (not force and now - self._saved_at < self.min_interval_s):
+                return
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"key": self.key, "block": block}, f)
+                f.flush(); os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self.saved, self._saved_at = block, now
+
+    def flush(self):
+        if self.block is not None:
+            self.save(self.block, force=True)
+
+# ---------- Scanner ----------
+class LogScanner:
+    """Fetch logs for [start, end] in adaptive chunks on a bounded pool.
+
+    `get_logs(from_block, to_block)` performs one provider request and returns
+    a list of logs. `scan` calls `on_logs(logs)` once per chunk, in block
+    order, and advances the checkpoint after each call returns.
+    """
+    def __init__(self, get_logs, checkpoint=None, chunk=500, min_chunk=1, max_chunk=10_000,
+                 workers=4, sparse_results=100):
+        self.get_logs = get_logs
+        self.checkpoint = checkpoint
+        self.chunk = chunk
+        self.min_chunk = min_chunk
+        self.max_chunk = max_chunk
+        self.workers = max(1, workers)
+        self.sparse_results = sparse_results
+        self.requests = 0
+        self.last_done = None  # last block fully processed by scan()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="logscan")
+
+    def _shrink(self, span):
+        with self._lock:
+            self.chunk = max(self.min_chunk, min(self.chunk, span // 2))
+
+    def _observe(self, span, n):
+        # only grow when a full-size chunk came back sparse
+        with self._lock:
+            if n < self.sparse_results and span >= self.chunk:
+                self.chunk = min(self.max_chunk, self.chunk * 2)
+
+    def _fetch(self, lo, hi):
+        """Fetch [lo, hi], bisecting while the provider rejects the range."""
+        with self._lock:
+            self.requests += 1
+        try:
+            logs = list(self.get_logs(lo, hi))
+        except Exception as e:
+            if lo >= hi or not is_range_error(e):
+                raise
+            self._shrink(hi - lo + 1)
+            mid = (lo + hi) // 2
+            return self._fetch(lo, mid) + self._fetch(mid + 1, hi)
+        self._observe(hi - lo + 1, len(logs))
+        return logs
+
+    def scan(self, start, end, on_logs, stop_flag=None) -> int:
+        """Scan [start, end]; return the last block fully processed (start-1 if none)."""
+        done = self.last_done = start - 1
+        while done < end and not (stop_flag and stop_flag.is_set()):
+            ranges, lo = [], done + 1
+            for _ in range(self.workers):
+                if lo > end:
+                    break
+                hi = min(end, lo + self.chunk - 1)
+                ranges.append((lo, hi)); lo = hi + 1
+            futures = [self._pool.submit(self._fetch, a, b) for a, b in ranges]
+            try:
+                for (a, b), fut in zip(ranges, futures):
+                    logs = fut.result()
+                    logs.sort(key=lambda lg: (lg["blockNumber"], lg["logIndex"]))
+                    on_logs(logs)
+                    done = self.last_done = b
+                    if self.checkpoint is not None:
+                        self.checkpoint.save(b, force=bool(logs))
+            finally:
+                for fut in futures:
+                    fut.cancel()
+        return done
+
+    def follow(self, get_tip, last_block, on_logs, stop_flag, poll_s, until=None, prefetch=None) -> int:
+        """Polling loop: scan up to `get_tip()` every `poll_s` seconds.
+
+        With `prefetch(from_block) -> (tip, logs)` the tip and the logs after
+        `from_block` come back from one batched request; logs is None when that
+        half failed (e.g. a range error after downtime) and the range is then
+        scanned in chunks as usual.
+
+        Runs until `stop_flag` is set or the monotonic deadline `until` passes;
+        returns the last block fully processed.
+        """
+        while not stop_flag.is_set() and (until is None or time.monotonic() < until):
+            try:
+                if prefetch is not None:
+                    tip, logs = prefetch(last_block + 1)
+                else:
+                    tip, logs = get_tip(), None
+                if tip > last_block and logs is not None:
+                    logs = sorted((lg for lg in logs if lg["blockNumber"] <= tip),
+                                  key=lambda lg: (lg["blockNumber"], lg["logIndex"]))
+                    on_logs(logs)
+                    last_block = self.last_done = tip
+                    if self.checkpoint is not None:
+                        self.checkpoint.save(tip, force=bool(logs))
+                elif tip > last_block:
+                    last_block = self.scan(last_block + 1, tip, on_logs, stop_flag)
+            except Exception as e:
+                # RPC outage: keep what was processed and retry on the next poll
+                if self.last_done is not None:
+                    last_block = max(last_block, self.last_done)
+                print(f"[Scan] error after block {last_block}: {e}", file=sys.stderr)
+            stop_flag.wait(poll_s)
+        return last_block
+
+    def close(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        if self.checkpoint is not None:
+            self.checkpoint.flush()
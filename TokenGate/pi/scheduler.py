@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Pulse scheduling between the durable queue and the servo worker.
+
+The worker offers everything the queue has ready and asks for the next Job.
+A job is one or more queue entries served as a single action: a positive
+job keeps the gate open for the sum of its values, a zero job centres it.
+Policies decide how entries are grouped and ordered:
+
+  fifo   one entry per job, in arrival order (the original behaviour)
+  merge  consecutive positive pulses at the head are merged into one open
+         window (capped at max_open_s), so back-to-back deposits do not
+         close and reopen the gate
+  fair   per-sender queues served round-robin, each turn merging up to
+         quantum_s of that sender's pulses, so one large depositor cannot
+         starve everyone queued behind them
+
+Independently of the policy, with skip_center the worker keeps the gate
+open when more work is already queued, and a zero pulse does not move a
+servo that is already centred. SchedStats keeps gate-busy utilisation and
+per-entry queue waits for comparing policies (bench/bench_sched.py).
+"""
+import time
+from collections import OrderedDict, deque
+from servo_pwm import percentile
+
+class Job:
+    __slots__ = ("entries", "value", "senders")
+    def __init__(self, entries):
+        self.entries = entries  # [(qid, item, t_ready)], item = (value, sender, blk, txhash, logIndex)
+        self.value = sum(max(0, e[1][0]) for e in entries)
+        self.senders = {e[1][1] for e in entries}
+
+    def __len__(self):
+        return len(self.entries)
+
+class FifoPolicy:
+    name = "fifo"
+    def __init__(self):
+        self._q = deque()
+    def __len__(self):
+        return len(self._q)
+    def offer(self, entry):
+        self._q.append(entry)
+    def take(self):
+        return Job([self._q.popleft()]) if self._q else None
+
+class MergePolicy(FifoPolicy):
+    name = "merge"
+    def __init__(self, max_open_s=120):
+        super().__init__()
+        self.max_open_s = max_open_s
+    def take(self):
+        if not self._q:
+            return None
+        out = [self._q.popleft()]
+        total = out[0][1][0]
+        while total > 0 and self._q and 0 < self._q[0][1][0] and total + self._q[0][1][0] <= self.max_open_s:
+            e = self._q.popleft(); out.append(e); total += e[1][0]
+        return Job(out)
+
+class FairSharePolicy:
+    name = "fair"
+    def __init__(self, quantum_s=10):
+        self.quantum_s = quantum_s
+        self._by_sender = OrderedDict()  # sender -> deque of entries, in round-robin order
+        self._n = 0
+    def __len__(self):
+        return self._n
+    def offer(self, entry):
+        self._by_sender.setdefault(entry[1][1], deque()).append(entry)
+        self._n += 1
+    def take(self):
+        if not self._n:
+            return None
+        sender, dq = next(iter(self._by_sender.items()))
+        out = [dq.popleft()]
+        total = out[0][1][0]
+        while total > 0 and dq and 0 < dq[0][1][0] and total + dq[0][1][0] <= self.quantum_s:
+            e = dq.popleft(); out.append(e); total += e[1][0]
+        self._n -= len(out)
+        # this sender goes to the back of the rotation (or leaves it)
+        del self._by_sender[sender]
+        if dq:
+            self._by_sender[sender] = dq
+        return Job(out)
+
+POLICY_NAMES = ("fifo", "merge", "fair")
+
+def make_policy(name, max_open_s=120, quantum_s=10):
+    if name == "merge":
+        return MergePolicy(max_open_s)
+    if name == "fair":
+        return FairSharePolicy(quantum_s)
+    return FifoPolicy()
+
+class SchedStats:
+    """Gate-busy utilisation and queue waits (seconds, monotonic clock)."""
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.t0 = clock()
+        self.busy_s = self.open_s = 0.0
+        self.jobs = self.entries = self.cycles = self.centers_skipped = 0
+        self.waits = []
+
+    def started(self, job, now):
+        self.jobs += 1
+        self.entries += len(job)
+        self.waits.extend(now - e[2] for e in job.entries)
+
+    def summary(self, now=None) -> dict:
+        elapsed = max(1e-9, (self.clock() if now is None else now) - self.t0)
+        w = self.waits
+        return {"elapsed_s": round(elapsed, 1), "jobs": self.jobs, "entries": self.entries, "cycles": self.cycles,
+                "centers_skipped": self.centers_skipped,
+                "busy_util": round(self.busy_s / elapsed, 3),
+                "open_share": round(self.open_s / self.busy_s, 3) if self.busy_s else 0.0,
+                "wait_p50_s": round(percentile(w, .50), 2), "wait_p95_s": round(percentile(w, .95), 2),
+                "wait_max_s": round(max(w, default=0.0), 2)}
+
+class Scheduler:
+    def __init__(self, policy=None, skip_center=True, clock=time.monotonic, dropped=None):
+        self.policy = FifoPolicy() if policy is None else policy
+        self.skip_center = skip_center
+        self.dropped = dropped  # dropped(qid) -> True for entries retracted while pending
+        self.stats = SchedStats(clock)
+        self.at_center = False
+        self.is_open = False
+
+    def __len__(self):
+        return len(self.policy)
+
+    def offer(self, entries):
+        for e in entries:
+            self.policy.offer(e)
+
+    def next_job(self, now):
+        while True:
+            job = self.policy.take()
+            if job is None:
+                return None
+            if self.dropped is not None:
+                live = [e for e in job.entries if not self.dropped(e[0])]
+                if len(live) != len(job):
+                    if not live:
+                        continue
+                    job = Job(live)
+            self.stats.started(job, now)
+            return job
+
+    # ----- decisions the worker asks for -----
+    def needs_center(self, job) -> bool:
+        """Zero pulse: move only if not centred already."""
+        return not (self.skip_center and self.at_center)
+
+    def close_after(self, job) -> bool:
+        """Centre after an open window unless more work is already queued."""
+        return not (self.skip_center and len(self.policy) > 0)
+
+    def opened(self):
+        if not self.is_open:
+            self.stats.cycles += 1
+        self.is_open, self.at_center = True, False
+
+    def centered(self):
+        self.is_open, self.at_center = False, True
+
+    def account(self, busy_s, open_s=0.0, skipped=False):
+        self.stats.busy_s += busy_s
+        self.stats.open_s += open_s
+        self.stats.centers_skipped += skipped
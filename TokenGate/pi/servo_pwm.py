@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Deadline-scheduled software PWM for the TokenGate servo.
+
+A dedicated thread owns the servo line and emits a continuous 50Hz pulse
+train. Every edge is scheduled against an absolute time.monotonic() deadline:
+the thread sleeps until `spin_s` before the edge and busy-waits the rest, so
+neither scheduler wake-up latency nor time spent elsewhere (OLED redraws,
+RPC) accumulates into pulse width or period drift. If a period is overrun
+the schedule is re-anchored instead of emitting a burst of catch-up pulses.
+
+The worker only calls set_position(us) / hold() / release(); per-period
+rise-time and pulse-width errors are kept for jitter statistics.
+
+Other Python threads can hold the GIL for a whole switch interval (5ms by
+default), which is longer than a servo pulse, so start() lowers the
+process-wide interval to `switch_interval_s`.
+"""
+import sys, threading, time
+from collections import deque
+
+FREQ_HZ  = 50.0
+PERIOD_S = 1.0 / FREQ_HZ
+
+def percentile(xs, f):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(f * len(xs)))] if xs else 0.0
+
+class ServoPWM:
+    """Continuous software PWM on a gpiod output line (libgpiod v1 `set_value`)."""
+    def __init__(self, line, period_s=PERIOD_S, spin_s=0.0005, min_us=500, max_us=2500, window=3000,
+                 switch_interval_s=0.0002):
+        self.line = line
+        self.period_s = period_s
+        self.spin_s = spin_s
+        self.switch_interval_s = switch_interval_s
+        self.min_us = min_us
+        self.max_us = max_us
+        self.periods = 0
+        self.overruns = 0
+        self.rise_err = deque(maxlen=window)   # seconds late vs. scheduled rising edge
+        self.width_err = deque(maxlen=window)  # measured - requested pulse width, seconds
+        self._us = None
+        self._active = False
+        self._stop = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="servo-pwm", daemon=True)
+
+    # ----- control API (any thread) -----
+    def start(self):
+        if self.switch_interval_s:
+            sys.setswitchinterval(min(sys.getswitchinterval(), self.switch_interval_s))
+        self._thread.start()
+        return self
+
+    def set_position(self, us):
+        """Set the pulse width (µs) and make sure the pulse train is running."""
+        with self._cond:
+            self._us = max(self.min_us, min(self.max_us, us))
+            self._active = True
+            self._cond.notify()
+
+    def hold(self):
+        """Resume pulses at the last position."""
+        with self._cond:
+            self._active = self._us is not None
+            self._cond.notify()
+
+    def release(self):
+        """Stop pulses and leave the line low (servo goes limp)."""
+        with self._cond:
+            self._active = False
+
+    def move(self, us, seconds):
+        """set_position() then wait `seconds`; the position keeps being held afterwards."""
+        self.set_position(us)
+        time.sleep(seconds)
+
+    def stop(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._thread.is_alive():
+            self._thread.join(timeout=1.0)
+
+    def stats(self) -> dict:
+        rise = list(self.rise_err); width = [abs(x) for x in self.width_err]
+        us = lambda s: round(s * 1e6, 1)
+        return {
+            "periods": self.periods, "overruns": self.overruns,
+            "rise_p50_us": us(percentile(rise, .50)), "rise_p99_us": us(percentile(rise, .99)),
+            "rise_max_us": us(max(rise, default=0.0)),
+            "width_p50_us": us(percentile(width, .50)), "width_p99_us": us(percentile(width, .99)),
+            "width_max_us": us(max(width, default=0.0)),
+        }
+
+    # ----- engine thread -----
+    def _sleep_until(self, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining > self.spin_s:
+            time.sleep(remaining - self.spin_s)
+        while time.monotonic() < deadline:
+            pass
+
+    def _run(self):
+        rise_at = None
+        while True:
+            with self._cond:
+                while not self._stop and not self._active:
+                    self.line.set_value(0)
+                    rise_at = None
+                    self._cond.wait()
+                if self._stop:
+                    break
+                high_s = self._us / 1e6
+            if rise_at is None:
+                rise_at = time.monotonic() + self.spin_s
+
+            self._sleep_until(rise_at)
+            self.line.set_value(1); t_rise = time.monotonic()
+            self._sleep_until(t_rise + high_s)  # width matters more than phase
+            self.line.set_value(0); t_fall = time.monotonic()
+
+            self.periods += 1
+            self.rise_err.append(t_rise - rise_at)
+            self.width_err.append((t_fall - t_rise) - high_s)
+
+            rise_at += self.period_s
+            now = time.monotonic()
+            if now > rise_at:
+                # missed a whole period: re-anchor rather than burst catch-up pulses
+                self.overruns += 1
+                rise_at = now + self.spin_s
+        self.line.set_value(0)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Push-based GatePulse delivery over eth_subscribe("logs") on a WebSocket provider.
+
+Logs are pushed as soon as the node sees them, so there is no poll interval
+and no RPC traffic while the gate is idle apart from a slow heartbeat. After
+every (re)connect the blocks missed while disconnected are gap-filled with the
+regular LogScanner (eth_getLogs), and duplicates are left to the caller's
+dedup. The heartbeat (one eth_blockNumber per `heartbeat_s`) detects dead
+sockets and advances the scanner checkpoint: every block at or below the
+previous heartbeat's tip has had its logs pushed by the time the next one
+fires.
+"""
+import asyncio, sys
+from web3 import AsyncWeb3, WebSocketProvider
+
+class LogSubscriber:
+    """Follow GatePulse logs over a WS subscription, feeding `on_logs(logs)`.
+
+    `run(last_block)` blocks until `stop_flag` is set or `max_failures`
+    consecutive connection attempts fail, and returns the last block known
+    to be fully delivered so the caller can fall back to polling from there.
+    """
+    def __init__(self, ws_url, address, topic0, scanner, on_logs, stop_flag,
+                 heartbeat_s=30.0, max_failures=3):
+        self.ws_url = ws_url
+        self.address = address  # one gate address or a list (multi-gate)
+        self.topic0 = topic0
+        self.scanner = scanner
+        self.on_logs = on_logs
+        self.stop_flag = stop_flag
+        self.heartbeat_s = heartbeat_s
+        self.max_failures = max_failures
+        self.last_block = None
+        self._failures = 0
+
+    def run(self, last_block) -> int:
+        self.last_block = last_block
+        self._failures = 0
+        asyncio.run(self._main())
+        return self.last_block
+
+    async def _main(self):
+        while not self.stop_flag.is_set() and self._failures < self.max_failures:
+            try:
+                await self._session()
+            except Exception as e:
+                self._failures += 1
+                print(f"[WS] disconnected ({self._failures}/{self.max_failures}): {e}", file=sys.stderr)
+                await asyncio.sleep(min(30.0, 2.0 ** self._failures))
+
+    async def _session(self):
+        async with AsyncWeb3(WebSocketProvider(self.ws_url)) as w3:
+            await w3.eth.subscribe("logs", {"address": self.address, "topics": [self.topic0]})
+            # subscribe first, then gap-fill: overlap is deduped, nothing falls in between
+            tip = await w3.eth.block_number
+            if tip > self.last_block:
+                self.last_block = await asyncio.to_thread(
+                    self.scanner.scan, self.last_block + 1, tip, self.on_logs, self.stop_flag)
+            self._failures = 0
+            print(f"[WS] subscribed at block {tip}")
+
+            tasks = {
+                asyncio.create_task(self._read(w3)),
+                asyncio.create_task(self._heartbeat(w3, tip)),
+                asyncio.create_task(self._wait_stop()),
+            }
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for t in pending:
+                t.cancel()
+            for t in done:
+                t.result()  # re-raise socket/heartbeat errors -> reconnect
+
+    async def _read(self, w3):
+        async for msg in w3.socket.process_subscriptions():
+            lg = msg["result"]
+            if lg.get("removed"):
+                continue  # reorged out; the dedup/confirmation layers handle the rest
+            self.on_logs([lg])
+        raise ConnectionError("subscription stream ended")
+
+    async def _heartbeat(self, w3, tip):
+        while True:
+            await asyncio.sleep(self.heartbeat_s)
+            new_tip = await asyncio.wait_for(w3.eth.block_number, timeout=self.heartbeat_s)
+            if tip > self.last_block:
+                self.last_block = tip
+                if self.scanner.checkpoint is not None:
+                    self.scanner.checkpoint.save(tip)
+            tip = new_tip
+
+    async def _wait_stop(self):
+        while not self.stop_flag.is_set():
+            await asyncio.sleep(0.2)
@@ -1,72 +1,152 @@
 #!/usr/bin/env python3
 # TokenGate Pi listener — queued handling & start-after-launch
 # LEDs: BCM 18 (red), 27 (green) | Servo: BCM 19 | OLED: SSD1306 @ 0x3C on I2C bus 1
-# Env: RPCURL, GATE_ADDRESS
-import os, sys, time, signal, threading
-from queue import Queue, Empty
+# Env: RPCURL (comma-separated for a pooled, failover set), GATE_ADDRESS (or GATES_FILE), WSURL / INGEST_MODE / CHECKPOINT_FILE / QUEUE_FILE / BATCH_RPC (optional)
+#      METRICS_PORT / METRICS_LOG_S (optional: Prometheus /metrics on 127.0.0.1, periodic [Metrics] line)
+#      BOOT_PROFILE (optional: append each start's [Boot] stage times to this file)
+# Startup is staged (pi_common/boot.py): OLED first frame, then GPIO/servo/queue setup while web3 is
+# imported and the RPC connected on a boot thread (chain_imports / connect below).
+import os, sys, time, signal, threading, argparse
 from dotenv import load_dotenv
-from web3 import Web3
-from web3.exceptions import Web3RPCError
 import gpiod
 from luma.core.interface.serial import i2c
 from luma.oled.device import ssd1306
-from PIL import Image, ImageDraw, ImageFont
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))  # repo root
+from pi_common.oled import Oled, load_font
+from pi_common.display import DisplayService
+from pi_common.boot import Boot
+from pi_common import metrics
+from logscan import LogScanner, Checkpoint, is_range_error
+from logfilter import FilterFollower, AdaptiveInterval
+from servo_pwm import ServoPWM
+from dedup import DedupIndex
+from confirm import Confirmer, DepthPolicy
+from durable_queue import DurableQueue
+from scheduler import Scheduler, make_policy, POLICY_NAMES
+from gates import GateConfig, GateRouter, GateWorker, load_gates
 
-# ---------- GPIO/servo config ----------
+# ---------- GPIO/servo config (single gate; several gates: see gates.json) ----------
+GATES_FILE = "gates.json"
 GPIO_CHIP = "/dev/gpiochip4"   # change if your system uses a different one
 LED_RED_PIN = 18
 LED_GREEN_PIN = 27
 SERVO_PIN = 19
 
-FREQ_HZ  = 50.0
-PERIOD_S = 1.0 / FREQ_HZ
 MIN_US, CENTER_US, MAX_US = 600, 1500, 2400
 POLL_INTERVAL = 1.0  # seconds
+DISPLAY_FPS   = 10.0 # max OLED redraws/s (display thread, latest frame wins)
 
-# ---------- Minimal ABI: GatePulse ----------
-EVENT_SIG = "GatePulse(uint256,address,uint256,uint256)"
-GATE_ABI = [{
-    "type": "event",
-    "name": "GatePulse",
-    "anonymous": False,  # <-- important for web3 event decoder
-    "inputs": [
-        {"indexed": False, "name": "value",     "type": "uint256"},
-        {"indexed": True,  "name": "from",      "type": "address"},
-        {"indexed": False, "name": "amount",    "type": "uint256"},
-        {"indexed": False, "name": "timestamp", "type": "uint256"}
-    ]
-}]
+# ---------- Log scanning ----------
+SCAN_CHUNK   = 500   # initial blocks per eth_getLogs (adapts at runtime)
+SCAN_WORKERS = 4     # parallel eth_getLogs requests during catch-up/backfill
+CHECKPOINT_FILE = "tokengate.checkpoint.json"
+QUEUE_FILE      = "tokengate.queue.sqlite"  # durable pulse queue (unacked pulses replay on start)
+
+# ---------- Pulse scheduling ----------
+SCHED_POLICY     = "merge"  # fifo | merge (back-to-back pulses share one open window) | fair (per sender)
+MERGE_MAX_OPEN_S = 120      # longest merged open window
+FAIR_QUANTUM_S   = 10       # open seconds per sender turn in fair mode
+SKIP_CENTER      = True     # stay open when more pulses are queued; no re-centring when centred
+DEDUP_WINDOW    = 4096  # unfinalized (blockNumber, logIndex) entries kept for replay checks
+FINALITY_DEPTH  = 64    # blocks below the newest seen log that are treated as final
+
+# ---------- Confirmation policy (reorg-aware release to the worker) ----------
+CONFIRM_RULES   = ((5, 0), (50, 3))  # (max pulse value, blocks deep before acting): small pulses act at tip
+CONFIRM_DEFAULT = 12                 # blocks deep for anything larger
+SAFE_DEPTH      = 3                  # release tags: tip < SAFE_DEPTH <= safe < FINALITY_DEPTH <= finalized
+CONFIRM_POLL_S  = 1.0                # head polling while events are in flight (idle: no calls)
+
+# ---------- WebSocket push mode (WSURL set) ----------
+WS_HEARTBEAT_S = 30.0   # eth_blockNumber liveness check / checkpoint cadence
+WS_RETRY_S     = 300.0  # after WS/filter gives up, poll this long before trying again
+
+# ---------- Server-side filter mode (--mode filter) ----------
+FILTER_MIN_POLL_S = 0.25   # fastest poll, used right after a GatePulse
+FILTER_MAX_POLL_S = 10.0   # idle back-off ceiling
+FILTER_HOT_S      = 60.0   # stay at half-block polling this long after a pulse
+
+# ---------- Metrics (RPC and OLED timings come from pi_common) ----------
+METRICS_PORT  = 0     # >0: Prometheus text on http://127.0.0.1:PORT/metrics (env METRICS_PORT)
+METRICS_LOG_S = 60.0  # [Metrics] JSON summary every N s, 0 = off (env METRICS_LOG_S)
+
+GETLOGS_BLOCKS  = metrics.histogram("getlogs_range_blocks", "Blocks per eth_getLogs request",
+                                    (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000))
+GETLOGS_RESULTS = metrics.histogram("getlogs_result_logs", "Logs returned per eth_getLogs request",
+                                    (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000))
+INGEST_SECONDS  = metrics.histogram("gate_ingest_seconds", "GatePulse block timestamp -> enqueued (1 s resolution)",
+                                    (1, 2, 3, 5, 10, 20, 30, 60, 120, 300), labels=("mode",))
+QUEUE_DEPTH     = metrics.gauge("gate_queue_depth", "Pulses queued or scheduled, not handled yet", labels=("gate",))
+QUEUE_WAIT      = metrics.histogram("gate_queue_wait_seconds", "Pulse committed to the queue -> servo job start",
+                                    (0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300), labels=("gate",))
+SERVO_SECONDS   = metrics.histogram("gate_servo_action_seconds", "Servo job duration (open window incl. countdown, or centring)",
+                                    (0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120), labels=("gate", "action"))
+
+def watch_worker(w, name):
+    """Queue depth, queue wait and servo action time for one gate's worker."""
+    QUEUE_DEPTH.labels(name).set_function(w.backlog)
+    wait = QUEUE_WAIT.labels(name)
+    opened, centred = SERVO_SECONDS.labels(name, "open"), SERVO_SECONDS.labels(name, "center")
+    prev_job, prev_done = w.on_job, w.on_done  # keep hooks already set (bench/bench_e2e.py)
+    def on_job(job, t):
+        for _, _, t_ready in job.entries:
+            wait.observe(t - t_ready)
+        if prev_job is not None:
+            prev_job(job, t)
+    def on_done(job, seconds):
+        (opened if job.value > 0 else centred).observe(seconds)
+        if prev_done is not None:
+            prev_done(job, seconds)
+    w.on_job, w.on_done = on_job, on_done
+    return w
+
+# ---------- Deferred imports (web3 takes seconds on a Pi Zero) ----------
+BOOT_FRAMES = [("lines", ("TokenGate", "Connecting…")), ("lines", ("TokenGate", "Waiting for events…", "Q:0")),
+               ("lines", ("TokenGate", "CENTER", "Q:0"))]  # rendered into the frame cache while web3 loads
+
+def chain_imports():
+    global Web3, Web3RPCError, PooledHTTPProvider, Batcher, LogSubscriber, EVENT_SIG, decode_batch
+    from web3 import Web3
+    from web3.exceptions import Web3RPCError
+    from pi_common.rpc import PooledHTTPProvider
+    from pi_common.rpcbatch import Batcher
+    from subscribe import LogSubscriber
+    from gatepulse import EVENT_SIG, decode_batch
+
+def connect(rpcurl):
+    """Boot thread: imports, then the pooled provider and a connectivity check."""
+    chain_imports()
+    w3 = Web3(PooledHTTPProvider(rpcurl, timeout=30))  # RPCURL may list several endpoints, comma-separated
+    if not w3.is_connected():
+        print("ERROR: Web3 not connected to RPCURL.", file=sys.stderr); sys.exit(2)
+    return w3
 
 # ---------- OLED ----------
 class OLED:
     def __init__(self):
         self.serial = i2c(port=1, address=0x3C)
         self.dev = ssd1306(self.serial)
-        # Bigger font (falls back to default if not found)
-        try:
-            self.font = ImageFont.truetype(
-                "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 12  # <-- change size here
-            )
-        except Exception:
-            self.font = ImageFont.load_default()
-        # Precompute line height (Pillow 10+: use getbbox)
-        box = self.font.getbbox("A")
-        self.line_h = (box[3] - box[1]) + 2
-        self.clear()
+        # Bigger font (falls back to default if not found); frames/metrics are cached
+        # and only changed pages are sent (pi_common.oled)
+        self.screen = Oled(self.dev, font=load_font(
+            "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 12  # <-- change size here
+        ))
+        # I2C transfers happen on the display thread; text()/clear() only post
+        self.view = DisplayService(self.screen, fps=DISPLAY_FPS)
+        self.text(["TokenGate", "Starting…"])
+        self.view.flush()  # first frame on the panel
 
     def clear(self):
-        img = Image.new("1", self.dev.size, 0)
-        self.dev.display(img)
+        self.view.clear()
+
+    def prerender(self, frames):
+        self.view.prerender(frames)
 
     def text(self, lines):
-        W, H = self.dev.size
-        img = Image.new("1", (W, H), 0)
-        d = ImageDraw.Draw(img)
-        y = 0
-        for ln in lines:
-            d.text((0, y), ln, 255, font=self.font)
-            y += self.line_h
-        self.dev.display(img)
+        self.view.lines(lines)
+
+    def close(self):
+        self.view.stop()
+        print(f"[Display] {self.view.stats()}")
 
 
 # ---------- GPIO (libgpiod v1-style) ----------
@@ -75,167 +155,291 @@ def open_line(chip, offset):
     line.request(consumer="tokengate", type=gpiod.LINE_REQ_DIR_OUT, default_val=0)
     return line
 
-def drive_servo_us(line, high_us, duration_s):
-    """Software PWM @50Hz for duration_s seconds."""
-    high_s = max(0.0, min(PERIOD_S, high_us / 1_000_000.0))
-    cycles = max(1, int(duration_s / PERIOD_S))
-    for _ in range(cycles):
-        line.set_value(1); time.sleep(high_s)
-        line.set_value(0); low_s = PERIOD_S - high_s
-        if low_s > 0: time.sleep(low_s)
-
-def center(line, seconds=0.5): drive_servo_us(line, CENTER_US, seconds)
-def maxpos(line, seconds=1.0): drive_servo_us(line, MAX_US, seconds)
-
-# ---------- Worker: consume events sequentially ----------
-def worker_loop(stop_flag, q, oled, servo, led_r, led_g):
-    while not stop_flag.is_set():
-        try:
-            evt = q.get(timeout=0.2)  # (value, sender, blk, txhash, logIndex)
-        except Empty:
-            continue
-        value, sender, blk, txh, lidx = evt
-        print(f"[Worker] handling value={value} from={sender} blk={blk} tx={txh} idx={lidx} (queue={q.qsize()})")
-        try:
-            if value <= 0:
-                oled.text(["TokenGate", "Pulse: 0s", f"CENTER | Q:{q.qsize()}"])
-                led_r.set_value(1); led_g.set_value(0)
-                center(servo, 0.5)
-            else:
-                # MAX with countdown (one-second steps)
-                led_r.set_value(0); led_g.set_value(1)
-                for remaining in range(value, 0, -1):
-                    oled.text([f"Pulse: {value}s", f"Remaining: {remaining}s", f"Q:{q.qsize()}"])
-                    maxpos(servo, 1.0)
-                # Return to center
-                center(servo, 0.6)
-                led_r.set_value(1); led_g.set_value(0)
-                oled.text(["TokenGate", "CENTER", f"Q:{q.qsize()}"])
-        except Exception as e:
-            print(f"[Worker] error: {e}", file=sys.stderr)
-        finally:
-            q.task_done()
+# Servo PWM runs on its own deadline-scheduled thread (servo_pwm.ServoPWM); each
+# gate's GateWorker (gates.py) consumes its queue lane and drives its lines.
+
+# ---------- Event-to-enqueue latency ----------
+class LatencyStats:
+    """Block-timestamp -> enqueue latency per ingest mode (1s timestamp resolution)."""
+    def __init__(self):
+        self.samples = {}
+
+    def add(self, mode, seconds):
+        self.samples.setdefault(mode, []).append(seconds)
+
+    def summary(self):
+        out = []
+        for mode, xs in sorted(self.samples.items()):
+            xs = sorted(xs)
+            p = lambda f: xs[min(len(xs) - 1, int(f * len(xs)))]
+            out.append(f"{mode}: n={len(xs)} p50={p(0.50):.2f}s p95={p(0.95):.2f}s max={xs[-1]:.2f}s")
+        return " | ".join(out) or "no events"
 
 # ---------- Main ----------
+def parse_args():
+    ap = argparse.ArgumentParser(description="TokenGate Pi listener")
+    ap.add_argument("--from-block", type=int, default=None,
+                    help="backfill GatePulse logs from this block (overrides the checkpoint)")
+    ap.add_argument("--mode", choices=("auto", "poll", "ws", "filter"), default=os.getenv("INGEST_MODE", "auto"),
+                    help="log ingest engine; auto = ws if WSURL is set, else poll")
+    ap.add_argument("--sched", choices=POLICY_NAMES, default=os.getenv("SCHED_POLICY", SCHED_POLICY),
+                    help="pulse scheduling policy for queued deposits")
+    return ap.parse_args()
+
 def main():
+    boot = Boot("tokengate_pi")
+    boot.mark("imports")
+    args = parse_args()
     load_dotenv()  # loads .env in cwd if present
+    exporter = metrics.Exporter(int(os.getenv("METRICS_PORT", METRICS_PORT)),
+                                float(os.getenv("METRICS_LOG_S", METRICS_LOG_S))).start()
     RPCURL = os.getenv("RPCURL")
+    WSURL = os.getenv("WSURL")
     GATE_ADDRESS = os.getenv("GATE_ADDRESS")
-    if not RPCURL or not GATE_ADDRESS:
-        print("ERROR: Set RPCURL and GATE_ADDRESS (in env or .env).", file=sys.stderr)
+    gates_file = os.getenv("GATES_FILE", GATES_FILE)
+    if not RPCURL or not (GATE_ADDRESS or os.path.exists(gates_file)):
+        print(f"ERROR: Set RPCURL and GATE_ADDRESS (in env or .env), or list gates in {gates_file}.", file=sys.stderr)
         sys.exit(2)
 
-    w3 = Web3(Web3.HTTPProvider(RPCURL, request_kwargs={"timeout": 30}))
-    if not w3.is_connected():
-        print("ERROR: Web3 not connected to RPCURL.", file=sys.stderr); sys.exit(2)
+    loaded = boot.background("web3", connect, RPCURL)  # the hardware below comes up meanwhile
+    oled = OLED()
+    boot.mark("first_frame")
+    oled.prerender(BOOT_FRAMES)
 
-    gate_addr = Web3.to_checksum_address(GATE_ADDRESS)
-    gate = w3.eth.contract(address=gate_addr, abi=GATE_ABI)
+    # one gate from .env, or many from gates.json; all share one log stream
+    single = GateConfig("", GATE_ADDRESS, SERVO_PIN, LED_RED_PIN, LED_GREEN_PIN, GPIO_CHIP) if GATE_ADDRESS else None
+    gates = load_gates(gates_file, default=single)
+    router = GateRouter(gates)
+    gate_addrs = router.addresses
+    print(f"[Gates] {len(gates)}: " + ", ".join(f"{g.name or 'gate'}={g.address}" for g in gates))
 
+    # Setup hardware
+    chips, lines, servos = {}, [], []
+    def line(g, offset):
+        path = g.chip or GPIO_CHIP
+        if path not in chips:
+            chips[path] = gpiod.Chip(path)
+        ln = open_line(chips[path], offset); lines.append(ln)
+        return ln
+
+    # Queued processing: one durable queue, a lane + scheduler + worker per gate
+    q = DurableQueue(os.getenv("QUEUE_FILE", QUEUE_FILE))
+    if q.replayed:
+        print(f"[Queue] replaying {q.replayed} unacknowledged pulse(s)")
+    stop_flag = threading.Event()
+    workers = {}
+    for g in gates:
+        servo = ServoPWM(line(g, g.servo)).start(); servos.append(servo)
+        w = GateWorker(g, q.lane(g.name),
+                       Scheduler(make_policy(args.sched, MERGE_MAX_OPEN_S, FAIR_QUANTUM_S), SKIP_CENTER,
+                                 dropped=q.retracted),
+                       servo, line(g, g.led_red), line(g, g.led_green), oled=oled if g.display else None,
+                       center_us=CENTER_US, max_us=MAX_US, title=g.name or "TokenGate")
+        watch_worker(w, g.name or "gate")
+        # Idle state at launch
+        w.center(0.6); servo.release()
+        w.led_r.set_value(1); w.led_g.set_value(0)
+        workers[g.address] = w
+    boot.mark("gpio")
+    if not loaded.done():
+        oled.text(["TokenGate", "Connecting…"])
+    w3 = loaded.result()
     topic0_hexbytes = w3.keccak(text=EVENT_SIG)
     topic0_str = topic0_hexbytes.hex()
     print(f"[EventSig] {EVENT_SIG} -> {topic0_str}")
-
-    # Setup hardware
-    oled = OLED(); oled.text(["TokenGate", "Starting…"])
-    chip = gpiod.Chip(GPIO_CHIP)
-    led_r = open_line(chip, LED_RED_PIN)
-    led_g = open_line(chip, LED_GREEN_PIN)
-    servo = open_line(chip, SERVO_PIN)
-
-    # Idle state at launch
-    center(servo, 0.6)
-    led_r.set_value(1); led_g.set_value(0)
     oled.text(["TokenGate", "Waiting for events…", "Q:0"])
+    for w in workers.values():
+        w.start(stop_flag)
 
-    # Queued processing
-    q = Queue(maxsize=256)
-    stop_flag = threading.Event()
-    t_worker = threading.Thread(target=worker_loop, args=(stop_flag, q, oled, servo, led_r, led_g), daemon=True)
-    t_worker.start()
+    # de-dup: (blockNumber, logIndex) watermark + bounded unfinalized window
+    dedup = DedupIndex(window=DEDUP_WINDOW, finality_depth=FINALITY_DEPTH)
+
+    latency = LatencyStats()
+    mode = "poll"
+
+    # HexBytes topics are safest; some RPCs insist on string "0x..." topics
+    topics = [topic0_hexbytes]
+
+    def fetch_logs(lo, hi):
+        nonlocal topics
+        params = {"fromBlock": lo, "toBlock": hi, "address": gate_addrs, "topics": topics}
+        try:
+            logs = w3.eth.get_logs(params)
+        except Web3RPCError as e:
+            if is_range_error(e) or isinstance(topics[0], str):
+                raise
+            t0 = topic0_str if topic0_str.startswith("0x") else ("0x" + topic0_str)
+            params["topics"] = topics = [t0]
+            logs = w3.eth.get_logs(params)
+        GETLOGS_BLOCKS.observe(hi - lo + 1); GETLOGS_RESULTS.observe(len(logs))
+        return logs
+
+    batching = os.getenv("BATCH_RPC", "1") != "0"  # 0: separate blockNumber / getLogs requests
+    batch = Batcher(w3)
+    def head_and_logs(lo):
+        # eth_blockNumber + eth_getLogs(lo..latest) in one round trip; logs past the tip are dropped and
+        # re-read next poll. Assumes the batch is answered by one node, in order (tip <= its latest).
+        if not batch.batching():
+            return w3.eth.block_number, None
+        tip, logs = batch.run(lambda: w3.eth.block_number,
+                              lambda: w3.eth.get_logs({"fromBlock": lo, "toBlock": "latest", "address": gate_addrs, "topics": topics}),
+                              return_exceptions=True)
+        if isinstance(tip, Exception):
+            raise tip
+        if tip < lo:
+            return tip, []
+        if isinstance(logs, Exception):
+            return tip, None
+        GETLOGS_BLOCKS.observe(tip - lo + 1); GETLOGS_RESULTS.observe(len(logs))
+        return tip, logs
+
+    ingest_lock = threading.RLock()  # handle_logs runs on engine and confirmation threads
+    def handle_logs(logs):
+        with ingest_lock:
+            batch = decode_batch(logs)  # fixed-layout fast path; odd/partial logs are skipped
+            for i, why in batch.errors:
+                print(f"[Decode] skip log: {why}", file=sys.stderr)
+            now = time.time()
+            for ev in batch:
+                value  = ev.value
+                sender = ev.sender
+                lat    = now - ev.timestamp
+                blk    = ev.block
+                txh    = ev.tx_hash.hex()
+                lidx   = ev.log_index
+
+                if not dedup.add(blk, lidx):
+                    continue
+                confirmer.add((ev.block_hash, lidx), blk, ev.block_hash, value,
+                              (value, sender, blk, txh, lidx, lat, ev.address))
+            q.flush()  # released pulses are on disk before the checkpoint passes these logs;
+                       # unreleased ones hold the checkpoint back (unreleased() below)
+
+    def on_release(ev, tag):
+        # ENQUEUE — worker thread will run them sequentially
+        value, sender, blk, txh, lidx, lat, address = ev.payload
+        g = router.route(address)
+        if g is None:
+            print(f"[Enqueue] no gate configured for {address} — skipping", file=sys.stderr); return
+        w = workers[g.address]
+        w.q.put(f"{ev.block_hash.hex()}:{lidx}", (value, sender, blk, txh, lidx))
+        latency.add(mode, lat)
+        INGEST_SECONDS.labels(mode).observe(lat)
+        gate = f" gate={g.name}" if len(gates) > 1 else ""
+        print(f"[Enqueue]{gate} value={value} from={sender} blk={blk} idx={lidx} {tag} via={mode} lat={lat:.1f}s "
+              f"(queue={w.backlog()})")
 
-    # IMPORTANT: start AFTER launch — ignore any history
-    last_block = w3.eth.block_number
+    def on_retract(ev):
+        value, sender, blk, txh, lidx, _, _ = ev.payload
+        gone = q.discard(f"{ev.block_hash.hex()}:{lidx}")
+        print(f"[Reorg] retract value={value} from={sender} blk={blk} tx={txh} idx={lidx}"
+              f"{'' if gone else ' (already handled)'}", file=sys.stderr)
 
-    # de-dup set: "txhash:logIndex"
-    seen = set()
+    def on_reorg(fork):
+        # re-ingest the new canonical blocks above the fork point
+        print(f"[Reorg] fork at block {fork}, rescanning to {confirmer.tip}", file=sys.stderr)
+        dedup.rewind(fork)
+        reorg_scanner.scan(fork + 1, confirmer.tip, handle_logs)
+
+    confirmer = Confirmer(lambda n: w3.eth.get_block(n), on_release, on_retract, on_reorg,
+                          policy=DepthPolicy(CONFIRM_RULES, default=CONFIRM_DEFAULT),
+                          safe_depth=SAFE_DEPTH, final_depth=FINALITY_DEPTH)
+    reorg_scanner = LogScanner(fetch_logs, None, workers=1)
+
+    def unreleased():
+        # under ingest_lock: a pulse the confirm thread released is flushed to the queue before
+        # the checkpoint may pass its block
+        with ingest_lock:
+            return confirmer.pending_block()
+
+    def confirm_loop():
+        while not stop_flag.is_set():
+            if confirmer.busy:
+                try:
+                    with ingest_lock:
+                        confirmer.tick()
+                        q.flush()
+                    ckpt.flush()  # catch up past pulses released by this tick
+                except Exception as e:
+                    print(f"[Confirm] head poll failed: {e}", file=sys.stderr)
+            stop_flag.wait(CONFIRM_POLL_S)
+
+    # Resume point: --from-block backfill > checkpoint > start AFTER launch (ignore history).
+    # The saved block stays below pulses still waiting for confirmations, so they are rescanned after a restart.
+    ckpt = Checkpoint(os.getenv("CHECKPOINT_FILE", CHECKPOINT_FILE), key=",".join(gate_addrs), hold=unreleased)
+    scanner = LogScanner(fetch_logs, ckpt, chunk=SCAN_CHUNK, workers=SCAN_WORKERS)
+    if args.from_block is not None:
+        last_block = args.from_block - 1
+        print(f"[Scan] backfill from block {args.from_block}")
+    elif ckpt.load() is not None:
+        last_block = ckpt.block
+        print(f"[Scan] resuming after checkpoint block {last_block}")
+    else:
+        last_block = w3.eth.block_number
+        ckpt.save(last_block, force=True)
+    threading.Thread(target=confirm_loop, name="confirm", daemon=True).start()
 
     # graceful signals
     def _sig(*_): stop_flag.set()
     signal.signal(signal.SIGINT, _sig)
     signal.signal(signal.SIGTERM, _sig)
 
+    engine = args.mode if args.mode != "auto" else ("ws" if WSURL else "poll")
+    if engine == "ws" and not WSURL:
+        print("ERROR: --mode ws needs WSURL.", file=sys.stderr); sys.exit(2)
+    boot.mark("ready")
+    boot.report()
+
     try:
         while not stop_flag.is_set():
-            tip = w3.eth.block_number
-            if tip > last_block:
-                params = {
-                    "fromBlock": last_block + 1,  # strictly after launch
-                    "toBlock": tip,
-                    "address": gate_addr,
-                    "topics": [topic0_hexbytes],  # HexBytes safest
-                }
-                try:
-                    logs = w3.eth.get_logs(params)
-                except Web3RPCError:
-                    # Some RPCs insist on string "0x..." topics
-                    t0 = topic0_str if topic0_str.startswith("0x") else ("0x" + topic0_str)
-                    params["topics"] = [t0]
-                    logs = w3.eth.get_logs(params)
-
-                # Ensure deterministic ordering: by (blockNumber, logIndex)
-                logs.sort(key=lambda lg: (lg["blockNumber"], lg["logIndex"]))
-
-                for lg in logs:
-                    # Guard against any odd/partial log
-                    try:
-                        ev = gate.events.GatePulse().process_log(lg)
-                    except Exception as e:
-                        print(f"[Decode] skip log: {e}", file=sys.stderr)
-                        continue
-
-                    value  = int(ev["args"]["value"])
-                    sender = ev["args"]["from"]
-                    blk    = lg["blockNumber"]
-                    txh    = lg["transactionHash"].hex()
-                    lidx   = lg["logIndex"]
-
-                    uid = f"{txh}:{lidx}"
-                    if uid in seen:
-                        continue
-                    seen.add(uid)
-
-                    # ENQUEUE — worker thread will run them sequentially
-                    try:
-                        q.put_nowait((value, sender, blk, txh, lidx))
-                        print(f"[Enqueue] value={value} from={sender} blk={blk} idx={lidx} (queue={q.qsize()})")
-                    except:
-                        print("[Enqueue] queue full — dropping event", file=sys.stderr)
-
-                last_block = tip
-                # occasionally trim the seen set
-                if len(seen) > 2048:
-                    seen = set(list(seen)[-1024:])
-            time.sleep(POLL_INTERVAL)
-
-        # drain queue before exit
-        q.join()
+            if engine != "poll":
+                # push / filter engine; returns on stop or after repeated failures
+                mode = engine
+                if engine == "ws":
+                    follower = LogSubscriber(WSURL, gate_addrs, topic0_hexbytes, scanner, handle_logs, stop_flag,
+                                             heartbeat_s=WS_HEARTBEAT_S)
+                else:
+                    follower = FilterFollower(w3, gate_addrs, topic0_hexbytes, scanner, handle_logs, stop_flag,
+                                              interval=AdaptiveInterval(min_s=FILTER_MIN_POLL_S, max_s=FILTER_MAX_POLL_S,
+                                                                        hot_s=FILTER_HOT_S))
+                last_block = follower.run(last_block)
+                if stop_flag.is_set():
+                    break
+                print(f"[{engine}] unavailable — polling for {WS_RETRY_S:.0f}s", file=sys.stderr)
+            mode = "poll"
+            until = time.monotonic() + WS_RETRY_S if engine != "poll" else None
+            last_block = scanner.follow(lambda: w3.eth.block_number, last_block, handle_logs,
+                                        stop_flag, POLL_INTERVAL, until=until, prefetch=head_and_logs if batching else None)
+
+        # let the current pulses finish; anything still queued is replayed on next start
+        for w in workers.values():
+            w.thread.join(timeout=5.0)
     finally:
+        scanner.close(); reorg_scanner.close()
+        print(f"[Confirm] reorgs={confirmer.reorgs} retractions={confirmer.retractions} header_calls={confirmer.header_calls}")
+        print(f"[Latency] {latency.summary()}")
+        print(f"[Batch] {batch.stats()}")
+        q.close(); print(f"[Queue] {q.stats()}")
+        for w in workers.values():
+            print(f"[Sched] {w.cfg.name or 'gate'} {args.sched}: {w.sched.stats.summary()}")
+            try:
+                w.center(0.4); w.led_r.set_value(0); w.led_g.set_value(0)
+            except Exception:
+                pass
         try:
-            center(servo, 0.4); led_r.set_value(0); led_g.set_value(0)
-        except Exception:
-            pass
-        try:
-            servo.set_value(0); servo.release()
-            led_r.set_value(0); led_r.release()
-            led_g.set_value(0); led_g.release()
-            chip.close()
+            for servo in servos:
+                servo.stop(); print(f"[PWM] {servo.stats()}")
+            for ln in lines:
+                ln.set_value(0); ln.release()
+            for chip in chips.values():
+                chip.close()
         except Exception:
             pass
         try:
-            oled.text(["TokenGate", "Stopped"])
+            oled.text(["TokenGate", "Stopped"]); oled.close()
         except Exception:
             pass
+        exporter.stop()
 
 if __name__ == "__main__":
     main()
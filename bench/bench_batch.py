@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# JSON-RPC batching (pi_common.rpcbatch) on a high-RTT link: HTTP round trips and wall time for the
+# hot request sequences, separate requests vs. one batch, against a local stub JSON-RPC server
+# (bench/stubrpc.py) with the round-trip time injected; no chain needed.
+#   gate poll   TokenGate polling: eth_blockNumber, then eth_getLogs for the new range
+#               (LogScanner.follow with and without the batched prefetch)
+#   startup     toggle app: log filter + blockNumber + readState() seed, plus the pending nonce
+#               (StateFollower.seed + TxPipeline nonce, the nonce piggybacked when batching)
+#   resync      long press: blockNumber + readState() (StateFollower.reconcile), sync and async
+# Each is run again against a stub that refuses batches, to check the per-call fallback.
+# Non-zero exit if batching does not save the expected round trips or any result differs.
+#   python3 bench/bench_batch.py --rtt 0.15 --polls 20
+import os, sys, time, asyncio, argparse, threading
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, os.path.join(HERE, "..", "TokenGate", "pi"))
+sys.path.insert(0, os.path.join(HERE, "..", "ButtonToContract", "pi"))
+from web3 import Web3, AsyncWeb3
+from pi_common.rpc import PooledHTTPProvider, AsyncPooledHTTPProvider
+from pi_common.rpcbatch import Batcher, AsyncBatcher
+from logscan import LogScanner
+from statefollow import EVENT_ABI, StateCache, StateFollower, AsyncStateFollower
+from txpipe import NonceManager
+from stubrpc import StubRPC
+
+ADDR = "0x" + "11" * 20
+ABI = [{"inputs": [], "name": "readState", "outputs": [{"internalType": "string", "name": "", "type": "string"}],
+        "stateMutability": "view", "type": "function"}, EVENT_ABI]
+
+def read_state(contract, block_identifier="latest"):
+    return contract.functions.readState().call(block_identifier=block_identifier).upper()
+
+def gate_poll(w3, batch, polls):
+    """LogScanner.follow for `polls` polls; (last block, wall s)."""
+    stop = threading.Event()
+    n = [0]
+    params = {"address": [ADDR], "topics": ["0x" + "ab" * 32]}
+
+    def counted(f):
+        def g(*a):
+            n[0] += 1
+            if n[0] >= polls:
+                stop.set()
+            return f(*a)
+        return g
+
+    def head_and_logs(lo):  # as in tokengate_pi.main
+        if not batch.batching():
+            return w3.eth.block_number, None
+        tip, logs = batch.run(lambda: w3.eth.block_number,
+                              lambda: w3.eth.get_logs({**params, "fromBlock": lo, "toBlock": "latest"}),
+                              return_exceptions=True)
+        if isinstance(tip, Exception):
+            raise tip
+        return tip, [] if tip < lo else (None if isinstance(logs, Exception) else logs)
+
+    scanner = LogScanner(lambda lo, hi: w3.eth.get_logs({**params, "fromBlock": lo, "toBlock": hi}), None, workers=1)
+    t0 = time.perf_counter()
+    last = scanner.follow(counted(lambda: w3.eth.block_number), w3.eth.block_number - 1, lambda logs: None, stop, 0.0,
+                          prefetch=counted(head_and_logs) if batch is not None else None)
+    scanner.close()
+    return last, time.perf_counter() - t0
+
+def startup(w3, batch):
+    contract = w3.eth.contract(address=ADDR, abi=ABI)
+    nonces = NonceManager(w3, ADDR)
+    if batch is not None:
+        batch.piggyback(lambda: w3.eth.get_transaction_count(ADDR, "pending"), nonces.prime)
+    follower = StateFollower(w3, contract, StateCache(), read_state, batcher=batch)
+    t0 = time.perf_counter()
+    state = follower.seed()
+    nonce = nonces.next()
+    return (state, nonce), time.perf_counter() - t0
+
+def resync(w3, batch, n):
+    follower = StateFollower(w3, w3.eth.contract(address=ADDR, abi=ABI), StateCache(), read_state, batcher=batch)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        follower.reconcile()
+    return follower.cache.state, time.perf_counter() - t0
+
+async def resync_async(url, batched, n):
+    w3 = AsyncWeb3(AsyncPooledHTTPProvider(url))
+    follower = AsyncStateFollower(w3, w3.eth.contract(address=ADDR, abi=ABI), StateCache(),
+                                  batcher=AsyncBatcher(w3) if batched else None)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        await follower.reconcile()
+    return follower.cache.state, time.perf_counter() - t0
+
+def main():
+    ap = argparse.ArgumentParser(description="JSON-RPC batching: round trips and wall time per hot sequence, separate vs. batched.")
+    ap.add_argument("--rtt", type=float, default=0.15, help="injected round-trip time, seconds (cellular ~0.1-0.3)")
+    ap.add_argument("--polls", type=int, default=20, help="gate polls / resyncs per run")
+    args = ap.parse_args()
+    n, fails = args.polls, 0
+
+    print(f"RTT {args.rtt * 1000:.0f} ms\n")
+    print(f"{'sequence':>14s} {'server':>9s} {'mode':>9s} {'round trips':>12s} {'per op':>8s} {'wall/op':>9s}  result")
+    for label, batch_ok in (("batching", True), ("no batch", False)):
+        stub = StubRPC(args.rtt, 0.0, batch=batch_ok, block_s=args.rtt * 1.5).start()
+        stub.state = True
+        rows = {}
+        for name, ops in (("gate poll", n), ("startup", 1), ("resync", n), ("resync async", n)):
+            for mode in ("separate", "batched"):
+                w3 = Web3(PooledHTTPProvider(stub.url))
+                batch = Batcher(w3) if mode == "batched" else None
+                before = stub.requests
+                if name == "gate poll":
+                    res, wall = gate_poll(w3, batch, ops)
+                    res = "ok" if res > 0 else res
+                elif name == "startup":
+                    res, wall = startup(w3, batch)
+                elif name == "resync":
+                    res, wall = resync(w3, batch, ops)
+                else:
+                    res, wall = asyncio.run(resync_async(stub.url, mode == "batched", ops))
+                trips = stub.requests - before
+                rows[name, mode] = (trips, res)
+                print(f"{name:>14s} {label:>9s} {mode:>9s} {trips:12d} {trips / ops:8.1f} {wall / ops * 1000:7.0f}ms  {res}")
+        stub.stop()
+        for name in ("gate poll", "startup", "resync", "resync async"):
+            sep, bat = rows[name, "separate"], rows[name, "batched"]
+            if sep[1] != bat[1]:
+                print(f"  FAIL {name} ({label}): results differ {sep[1]} vs {bat[1]}"); fails += 1
+            if batch_ok and bat[0] > sep[0] * 0.6:
+                print(f"  FAIL {name}: batching saved too few round trips ({sep[0]} -> {bat[0]})"); fails += 1
+            if not batch_ok and bat[0] > sep[0] + 1:
+                print(f"  FAIL {name}: fallback costs extra round trips ({sep[0]} -> {bat[0]})"); fails += 1
+        print()
+    print("PASS" if not fails else "FAIL")
+    sys.exit(1 if fails else 0)
+
+if __name__ == "__main__":
+    main()
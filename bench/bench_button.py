@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# Button input: wakeups/hour and press-detection latency, the old 5 ms polling loop vs. the
+# gpiod edge-event backend (button.PollButton / button.EdgeButton), on a scripted fake line
+# with contact bounce driven on virtual time (no Pi needed). The script mixes short presses,
+# long presses, double presses and 2 ms glitches; latency is from the physical completion of
+# the gesture (release edge, or long_s held) to wait_gesture() returning. Non-zero exit if the
+# edge backend misses or invents a gesture.
+#   python3 bench/bench_button.py --hours 1 --presses 120
+import os, sys, random, argparse, threading
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ButtonToContract", "pi"))
+from fakes import FakeButtonLine
+from button import PollButton, EdgeButton
+
+DEBOUNCE_S, LONG_S, DOUBLE_S = 0.06, 1.5, 0.4
+
+def pct(xs, f):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(f * len(xs)))] if xs else float("nan")
+
+def script(n, hours, seed):
+    """[(t_down, hold_s)] and the expected (gesture, t_complete) per backend kind."""
+    rng = random.Random(seed)
+    span = hours * 3600.0
+    slot = span / n  # one gesture per slot, at least 4 s apart
+    starts = [i * slot + rng.uniform(0.5, max(0.5, slot - 4.0)) for i in range(n)]
+    presses, poll, gestures = [], [], []
+    for t in starts:
+        kind = rng.choices(["short", "long", "double", "glitch"], [0.6, 0.15, 0.15, 0.1])[0]
+        if kind == "short":
+            hold = rng.uniform(0.08, 0.4)
+            presses.append((t, hold)); poll.append(("press", t + hold)); gestures.append(("press", t + hold))
+        elif kind == "long":
+            hold = rng.uniform(2.0, 3.0)
+            presses.append((t, hold)); poll.append(("press", t + hold)); gestures.append(("long", t + LONG_S))
+        elif kind == "double":
+            h1, gap, h2 = rng.uniform(0.08, 0.15), rng.uniform(0.1, 0.25), rng.uniform(0.08, 0.15)
+            t2 = t + h1 + gap
+            presses += [(t, h1), (t2, h2)]
+            poll += [("press", t + h1), ("press", t2 + h2)]
+            gestures.append(("double", t2 + h2))
+        else:
+            presses.append((t, 0.002))  # EMI spike / brushed contact: must not count
+    return presses, span, poll, gestures
+
+def run(kind, presses, span, seed, **kw):
+    stop = threading.Event()
+    line = FakeButtonLine(presses, span, stop, seed=seed)
+    if kind == "poll":
+        btn = PollButton(line, stop, DEBOUNCE_S, clock=line.clock, sleep=line.sleep)
+    else:
+        btn = EdgeButton(line, stop, DEBOUNCE_S, clock=line.clock, **kw)
+    got = []
+    while True:
+        g = btn.wait_gesture()
+        if g is None:
+            break
+        got.append((g, line.clock()))
+    return got, btn.wakeups
+
+def compare(got, want):
+    """(latencies for matched gestures, missed, extra), matching in order by gesture and time."""
+    lat, i, extra = [], 0, 0
+    for g, t in got:
+        while i < len(want) and want[i][1] < t - 5.0:
+            i += 1  # skipped (missed) expected gestures
+        if i < len(want) and want[i][0] == g and want[i][1] <= t + 1e-9:
+            lat.append(t - want[i][1]); i += 1
+        else:
+            extra += 1
+    return lat, len(want) - len(lat), extra
+
+def main():
+    ap = argparse.ArgumentParser(description="Button wakeups/hour and detection latency: 5 ms polling vs. edge events.")
+    ap.add_argument("--hours", type=float, default=1.0, help="simulated time")
+    ap.add_argument("--presses", type=int, default=120, help="gestures in the script")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    presses, span, want_poll, want_gest = script(args.presses, args.hours, args.seed)
+    runs = [
+        ("poll 5ms", "poll", {}, want_poll),
+        ("edge", "edge", {}, want_poll),  # no gestures: every press reported on release, like polling
+        ("edge+gest", "edge", {"long_s": LONG_S, "double_s": DOUBLE_S}, want_gest),
+    ]
+    print(f"{len(presses)} scripted presses over {span / 3600:.1f}h ({sum(1 for p in presses if p[1] < 0.01)} glitches)\n")
+    print(f"{'backend':>10s} {'wakeups/h':>10s} {'found':>9s} {'missed':>6s} {'extra':>5s} "
+          f"{'p50':>8s} {'p95':>8s} {'max':>8s}")
+    fails = 0
+    for label, kind, kw, want in runs:
+        got, wakeups = run(kind, presses, span, args.seed, **kw)
+        lat, missed, extra = compare(got, want)
+        if kind == "edge":
+            fails += missed + extra
+        print(f"{label:>10s} {wakeups / (span / 3600):10.0f} {len(lat):4d}/{len(want):<4d} {missed:6d} {extra:5d} "
+              f"{pct(lat, .5) * 1000:6.1f}ms {pct(lat, .95) * 1000:6.1f}ms {max(lat, default=0.0) * 1000:6.1f}ms")
+    print("PASS" if not fails else "FAIL")
+    sys.exit(1 if fails else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# Confirmation-pipeline harness: random deposit traffic on a FakeChain with frequent reorgs,
+# ingested like the polling loop (scan -> dedup -> Confirmer). Checks that after finality the
+# released-minus-retracted set equals the canonical GatePulse set exactly, and reports
+# retractions, release depth per policy tier and header RPCs per block.
+# Exit status 1 on a mismatch.
+#   python3 bench/bench_confirm.py --blocks 5000 --reorg-rate 0.05
+import os, sys, argparse
+from collections import Counter
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "TokenGate", "pi"))
+from fakes import FakeChain
+from dedup import DedupIndex
+from confirm import Confirmer, DepthPolicy
+
+def main():
+    ap = argparse.ArgumentParser(description="Confirmer reorg harness")
+    ap.add_argument("--blocks", type=int, default=5000)
+    ap.add_argument("--reorg-rate", type=float, default=0.05)
+    ap.add_argument("--max-depth", type=int, default=6)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    chain = FakeChain(args.seed)
+    rng = chain.rng
+    released, retracted = Counter(), Counter()
+    depth_by_tier = {}
+    dedup = DedupIndex(finality_depth=64)
+    state = {"last": chain.tip}
+
+    def on_release(ev, tag):
+        released[ev.key] += 1
+        depth_by_tier.setdefault(ev.required, []).append(max(0, (conf.tip or 0) - ev.blk))
+
+    def on_retract(ev):
+        retracted[ev.key] += 1
+
+    def on_reorg(fork):
+        dedup.rewind(fork)
+        state["last"] = min(state["last"], fork)
+
+    conf = Confirmer(chain.get_header, on_release, on_retract, on_reorg,
+                     policy=DepthPolicy(((5, 0), (50, 3)), default=12), safe_depth=3, final_depth=64)
+
+    def ingest():
+        tip = chain.tip
+        for lg in chain.get_logs(state["last"] + 1, tip):
+            if dedup.add(lg["blockNumber"], lg["logIndex"]):
+                conf.add((lg["blockHash"], lg["logIndex"]), lg["blockNumber"], lg["blockHash"], lg["value"], lg)
+        state["last"] = tip
+
+    values = lambda: [rng.choice((1, 3, 9, 20, 80)) for _ in range(rng.choice((0, 0, 0, 1, 2)))]
+    for _ in range(args.blocks):
+        if rng.random() < args.reorg_rate and chain.tip > args.max_depth:
+            d = rng.randint(1, args.max_depth)
+            chain.reorg(d, [values() for _ in range(rng.randint(d, d + 1))])
+        else:
+            chain.mine(values())
+        ingest()
+        conf.on_head(chain.get_header("latest"))
+        ingest()  # re-ingest anything the reorg handler rewound
+    for _ in range(80):  # run everything to finality
+        chain.mine(); ingest(); conf.on_head(chain.get_header("latest")); ingest()
+
+    net = {k for k in released if released[k] - retracted[k] == 1}
+    bad = {k for k in released if released[k] - retracted[k] not in (0, 1)}
+    canon = chain.canonical_logs()
+    missing, extra = canon - net, net - canon
+    print(f"blocks={chain.tip}  reorgs={conf.reorgs}  releases={sum(released.values())}  "
+          f"retractions={sum(retracted.values())}  header_rpc/block={conf.header_calls / chain.tip:.2f}")
+    for req, depths in sorted(depth_by_tier.items()):
+        print(f"  policy depth {req:>2}: {len(depths):5d} released, mean release depth {sum(depths) / len(depths):.2f}")
+    print(f"canonical={len(canon)}  missing={len(missing)}  extra={len(extra)}  double={len(bad)}")
+    ok = not (missing or extra or bad)
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
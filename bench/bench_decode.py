@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# GatePulse decode throughput: web3's process_log (as the listener used it, one event
+# object per log) vs. gatepulse.decode / decode_batch on the same synthetic logs. Every
+# log is cross-checked field for field against web3, including edge values (0, 2**256-1)
+# and malformed logs that both must reject. No chain needed; exit status 1 on mismatch.
+#   python3 bench/bench_decode.py --logs 20000
+import os, sys, time, random, argparse
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "TokenGate", "pi"))
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.datastructures import AttributeDict
+from gatepulse import GATE_ABI, TOPIC0, decode, decode_batch
+
+GATE = "0x5FbDB2315678afecb367f032d93F642f64180aa3"
+UINT_MAX = 2**256 - 1
+
+def make_logs(n, senders=50, bad_every=500, seed=1):
+    """web3-formatted logs (AttributeDict + HexBytes), as get_logs returns them."""
+    rng = random.Random(seed)
+    addrs = [bytes(rng.getrandbits(8) for _ in range(20)) for _ in range(senders)]
+    edge = [0, 1, UINT_MAX, 2**255, 2**64 - 1]
+    logs = []
+    for i in range(n):
+        blk, lidx = 1000 + i // 3, i % 3
+        value = rng.choice(edge) if i % 97 == 0 else rng.randint(0, 200)
+        amount = rng.choice(edge) if i % 89 == 0 else min(UINT_MAX, value * 10**20 + rng.randint(0, 10**20 - 1))
+        ts = 1_700_000_000 + i
+        data = value.to_bytes(32, "big") + amount.to_bytes(32, "big") + ts.to_bytes(32, "big")
+        topics = [HexBytes(TOPIC0), HexBytes(b"\0" * 12 + rng.choice(addrs))]
+        if bad_every and i % bad_every == bad_every - 1:
+            data = data[:64]  # truncated/partial log
+        logs.append(AttributeDict({
+            "address": GATE, "topics": topics, "data": HexBytes(data),
+            "blockNumber": blk, "logIndex": lidx, "transactionIndex": lidx, "removed": False,
+            "transactionHash": HexBytes(rng.getrandbits(256).to_bytes(32, "big")),
+            "blockHash": HexBytes(blk.to_bytes(32, "big")),
+        }))
+    return logs
+
+def as_json_rpc(lg):
+    """Same log as raw JSON-RPC (hex strings), e.g. from a raw provider or WS payload."""
+    d = dict(lg)
+    d["topics"] = ["0x" + bytes(t).hex() for t in lg["topics"]]
+    d["data"] = "0x" + bytes(lg["data"]).hex()
+    return d
+
+def timed(fn, logs, reps):
+    best = float("inf")
+    for _ in range(reps):
+        t0 = time.perf_counter(); fn(logs); best = min(best, time.perf_counter() - t0)
+    return len(logs) / best
+
+def main():
+    ap = argparse.ArgumentParser(description="GatePulse decode: web3 process_log vs. gatepulse fast path.")
+    ap.add_argument("--logs", type=int, default=20_000)
+    ap.add_argument("--reps", type=int, default=3)
+    args = ap.parse_args()
+
+    logs = make_logs(args.logs)
+    gate = Web3().eth.contract(address=GATE, abi=GATE_ABI)
+
+    def web3_each(ls):   # what handle_logs did: new event object per log
+        out = []
+        for lg in ls:
+            try: out.append(gate.events.GatePulse().process_log(lg))
+            except Exception: pass
+        return out
+    def web3_reused(ls):
+        ev, out = gate.events.GatePulse(), []
+        for lg in ls:
+            try: out.append(ev.process_log(lg))
+            except Exception: pass
+        return out
+    def fast_each(ls):
+        out = []
+        for lg in ls:
+            try: out.append(decode(lg))
+            except ValueError: pass
+        return out
+
+    # ---- cross-check every log against web3 ----
+    ref = {}
+    for lg in logs:
+        try:
+            e = gate.events.GatePulse().process_log(lg)
+            a = e["args"]
+            ref[(lg["blockNumber"], lg["logIndex"])] = (a["value"], a["from"], a["amount"], a["timestamp"],
+                                                        e["transactionHash"], e["blockHash"], e["address"])
+        except Exception:
+            pass
+    bad = 0
+    for name, batch in (("decode_batch", decode_batch(logs)),
+                        ("decode_batch(json-rpc)", decode_batch([as_json_rpc(lg) for lg in logs]))):
+        got = {(r.block, r.log_index): (r.value, r.sender, r.amount, r.timestamp, r.tx_hash, r.block_hash, r.address)
+               for r in batch}
+        diff = sum(1 for k in ref.keys() | got.keys() if ref.get(k) != got.get(k))
+        print(f"{name:24s} decoded={len(batch)} rejected={len(batch.errors)} mismatches={diff}")
+        bad += diff + (len(batch) != len(ref))
+    one = {(r.block, r.log_index): (r.value, r.sender, r.amount, r.timestamp, r.tx_hash, r.block_hash, r.address)
+           for r in fast_each(logs)}
+    bad += one != ref
+    print(f"web3 reference: decoded={len(ref)} rejected={len(logs) - len(ref)}")
+
+    # ---- throughput ----
+    print(f"\n{'decoder':28s} {'logs/s':>12s} {'speedup':>8s}")
+    base = None
+    rows = [("web3 process_log (per log)", web3_each, logs), ("web3 process_log (reused)", web3_reused, logs),
+            ("gatepulse.decode", fast_each, logs), ("gatepulse.decode_batch", decode_batch, logs),
+            ("decode_batch (json-rpc hex)", decode_batch, [as_json_rpc(lg) for lg in logs])]
+    for name, fn, ls in rows:
+        rate = timed(fn, ls, args.reps)
+        base = base or rate
+        print(f"{name:28s} {rate:12,.0f} {rate / base:7.1f}x")
+
+    print("PASS" if not bad else "FAIL")
+    sys.exit(1 if bad else 0)
+
+if __name__ == "__main__":
+    main()
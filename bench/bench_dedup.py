@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# Dedup stress: streams millions of synthetic GatePulse positions through DedupIndex with
+# the re-deliveries the ingest engines produce (gap-fill overlaps, WS re-pushes), checking
+# zero false replays, zero false drops and flat memory; the old trimmed set is run on the
+# same stream for comparison. Exit status 1 on any failure.
+#   python3 bench/bench_dedup.py --logs 3000000
+import os, sys, time, random, argparse, tracemalloc
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "TokenGate", "pi"))
+from dedup import DedupIndex
+
+def stream(n_logs, seed=1, overlap_blocks=20):
+    """Yield (blk, lidx, is_new). Fresh logs arrive in order; re-deliveries repeat recent blocks."""
+    rng = random.Random(seed)
+    recent, blk, emitted = [], 0, 0
+    while emitted < n_logs:
+        blk += 1
+        logs = [(blk, i) for i in range(rng.choice((0, 0, 1, 1, 2, 5)))]
+        for b, i in logs:
+            yield b, i, True
+        emitted += len(logs)
+        recent.append(logs)
+        if len(recent) > overlap_blocks:
+            recent.pop(0)
+        r = rng.random()
+        if r < 0.05:    # gap-fill overlap: re-scan the last few blocks
+            for old in recent[-rng.randint(1, overlap_blocks):]:
+                for b, i in old:
+                    yield b, i, False
+        elif r < 0.10 and logs:  # WS re-push of the latest log
+            yield logs[-1][0], logs[-1][1], False
+
+class LegacySet:
+    """The previous approach: set of ids, trimmed to an arbitrary half past 2048."""
+    def __init__(self):
+        self.seen = set()
+    def add(self, blk, lidx):
+        uid = f"{blk}:{lidx}"
+        if uid in self.seen:
+            return False
+        self.seen.add(uid)
+        if len(self.seen) > 2048:
+            self.seen = set(list(self.seen)[-1024:])
+        return True
+
+def run(name, idx, n_logs, track_mem):
+    replays = drops = total = 0
+    mem = []
+    if track_mem:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    for blk, lidx, is_new in stream(n_logs):
+        admitted = idx.add(blk, lidx)
+        total += 1
+        if admitted and not is_new: replays += 1
+        if is_new and not admitted: drops += 1
+        if track_mem and total % 250_000 == 0:
+            mem.append(tracemalloc.get_traced_memory()[0])
+    dt = time.perf_counter() - t0
+    if track_mem:
+        tracemalloc.stop()
+    line = f"{name:>8}: {total:,} deliveries  {total / dt:,.0f}/s  false replays={replays}  false drops={drops}"
+    if mem:
+        line += f"  traced mem {min(mem) / 1024:.0f}..{max(mem) / 1024:.0f} KiB"
+    print(line)
+    return replays, drops, mem
+
+def main():
+    ap = argparse.ArgumentParser(description="DedupIndex stress test")
+    ap.add_argument("--logs", type=int, default=3_000_000)
+    ap.add_argument("--legacy-logs", type=int, default=300_000)
+    ap.add_argument("--mem-slack-kib", type=float, default=256.0)
+    args = ap.parse_args()
+
+    run("legacy", LegacySet(), args.legacy_logs, track_mem=False)
+    run("dedup", DedupIndex(), args.logs, track_mem=False)  # throughput, untraced
+    replays, drops, mem = run("dedup+mem", DedupIndex(), args.logs, track_mem=True)
+    growth = (max(mem[1:]) - min(mem[1:])) / 1024 if len(mem) > 2 else 0.0
+    ok = replays == 0 and drops == 0 and growth <= args.mem_slack_kib
+    print(f"memory spread after warm-up: {growth:.0f} KiB (limit {args.mem_slack_kib:.0f})")
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+# End-to-end latency of both Pi apps, unmodified, on a local chain with simulated hardware: fake gpiod
+# chips and luma SSD1306 devices (fakes.FakeHardware) stand in for the Pi, the contracts are deployed
+# fresh, and the apps' own main() runs in this process against the chain over HTTP.
+#   toggle   Switch + state_button_oled.py (--toggle-modes sequential,pipelined,async): scripted
+#            presses on a bouncing button line; stages press -> gesture -> submit -> sent -> block ->
+#            receipt -> LED -> OLED frame drawn
+#   deposit  TokenGate/TokenGateToken + tokengate_pi.py: a deposit storm from several accounts; stages
+#            sent -> block -> logs decoded -> enqueued -> worker job -> servo PWM at the open position
+# Per run: throughput and p50/p95/p99/max per stage, written as JSON (--out) together with the commit,
+# so runs can be compared; --baseline compares with an earlier JSON and fails on p95 regressions.
+# Non-zero exit if a press or deposit is lost, or on a regression.
+#   python3 bench/bench_e2e.py --chain inproc                       # eth-tester in this process
+#   cd ButtonToContract/chain && npm run node                        # or a Hardhat node (compile both
+#   python3 bench/bench_e2e.py --chain hardhat --out e2e.json        # chain/ folders first)
+import os, sys, json, time, random, signal, argparse, tempfile, threading, contextlib
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "TokenGate", "pi"))
+sys.path.insert(0, os.path.join(ROOT, "ButtonToContract", "pi"))
+from fakes import FakeHardware, LiveButtonLine
+HW = FakeHardware().install()  # before the apps import gpiod / luma
+import devchain
+from devchain import DEV_KEY, commit
+from web3 import Web3
+
+TOKEN = 10**18
+
+class Rec:
+    """What the instrumented app classes saw during one run (time.monotonic())."""
+    def __init__(self):
+        self.gestures = []   # (t_gesture, t_reported)
+        self.txs = []        # (t_submit, InFlight)
+        self.ui = []         # final state shown (LED set, OLED frame posted)
+        self.frames = []     # ON/OFF frame drawn by the display thread
+        self.ingested = {}   # tx hash -> logs decoded
+        self.enqueued = {}   # tx hash -> durable queue put
+        self.jobs = {}       # tx hash -> (worker job start, opens the gate)
+
+REC = Rec()
+
+def _h(txh):
+    return (txh.hex() if isinstance(txh, (bytes, bytearray)) else str(txh)).lower().removeprefix("0x")
+
+def pct(xs, f):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(f * len(xs)))] if xs else None
+
+def summary(xs):
+    ms = lambda v: None if v is None else round(v * 1000, 1)
+    return {"n": len(xs), "p50_ms": ms(pct(xs, .5)), "p95_ms": ms(pct(xs, .95)), "p99_ms": ms(pct(xs, .99)),
+            "max_ms": ms(max(xs, default=None))}
+
+def first_after(ts, t):
+    return next((x for x in ts if x >= t), None)
+
+class BlockClock:
+    """When each block was first seen at the RPC (polled every poll_s): the 'mined' time in the split."""
+    def __init__(self, url, poll_s=0.02):
+        self.w3 = Web3(Web3.HTTPProvider(url))
+        self.poll_s = poll_s
+        self.seen = {}
+        self._stop = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, name="block-clock", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        last = self.w3.eth.block_number
+        while not self._stop.wait(self.poll_s):
+            try:
+                n = self.w3.eth.block_number
+            except Exception:
+                continue
+            now = time.monotonic()
+            for b in range(last + 1, n + 1):
+                self.seen[b] = now
+            last = max(last, n)
+
+# ---------- instrumented app classes (the apps look these names up at call time; web3-based ones are
+# imported on the apps' boot thread, so those are replaced in their own modules) ----------
+def instrument_toggle(app):
+    import txpipe, async_engine
+
+    class TimedButton(app.EdgeButton):
+        def wait_gesture(self):
+            g = super().wait_gesture()
+            if g is not None:
+                REC.gestures.append((self.t_gesture, time.monotonic()))
+            return g
+
+    class TimedPipeline(txpipe.TxPipeline):
+        def submit(self, *a, **kw):
+            t = time.monotonic()
+            tx = super().submit(*a, **kw)
+            REC.txs.append((t, tx))
+            return tx
+
+    class TimedAsyncPipeline(txpipe.AsyncTxPipeline):
+        async def submit(self, *a, **kw):
+            t = time.monotonic()
+            tx = await super().submit(*a, **kw)
+            REC.txs.append((t, tx))
+            return tx
+
+    class TimedEngine(async_engine.ToggleEngine):
+        def show(self, state):
+            REC.ui.append(time.monotonic())  # before: the display thread may draw the frame first
+            super().show(state)
+
+    class DrawnOled:
+        def __init__(self, oled):
+            self._oled = oled
+        def center(self, text, note=None):
+            self._oled.center(text, note)
+            if text in ("ON", "OFF"):
+                REC.frames.append(time.monotonic())
+        def __getattr__(self, name):
+            return getattr(self._oled, name)
+
+    class TimedDisplay(app.DisplayService):
+        def __init__(self, oled, *a, **kw):
+            super().__init__(DrawnOled(oled), *a, **kw)
+
+    set_ui = app.set_ui_from_state
+    def timed_set_ui(gpio, oled, state):
+        REC.ui.append(time.monotonic())
+        set_ui(gpio, oled, state)
+
+    app.EdgeButton, app.DisplayService = TimedButton, TimedDisplay
+    app.set_ui_from_state = timed_set_ui
+    txpipe.TxPipeline, txpipe.AsyncTxPipeline, async_engine.ToggleEngine = TimedPipeline, TimedAsyncPipeline, TimedEngine
+
+def instrument_gate(app):
+    import gatepulse
+    class TimedLane:
+        def __init__(self, lane):
+            self._lane = lane
+        def put(self, key, item):
+            self._lane.put(key, item)
+            REC.enqueued.setdefault(_h(item[3]), time.monotonic())
+        def __getattr__(self, name):
+            return getattr(self._lane, name)
+
+    class TimedWorker(app.GateWorker):
+        def __init__(self, cfg, queue, *a, **kw):
+            super().__init__(cfg, TimedLane(queue), *a, **kw)
+            self.on_job = self._job
+        def _job(self, job, t):
+            for _, item, _ in job.entries:
+                REC.jobs.setdefault(_h(item[3]), (t, job.value > 0))
+
+    decode = gatepulse.decode_batch
+    def timed_decode(logs):
+        b = decode(logs)
+        now = time.monotonic()
+        for txh in b.tx_hash:
+            REC.ingested.setdefault(_h(txh), now)
+        return b
+
+    app.GateWorker, gatepulse.decode_batch = TimedWorker, timed_decode
+
+# ---------- running an app ----------
+def run_app(main, driver, log):
+    """main() on this thread (the apps install SIGINT handlers), driver on another; the driver ends
+    the run with SIGINT, like Ctrl+C. Waits for the app's threads to wind down afterwards."""
+    before = set(threading.enumerate())
+    err = []
+    def drive():
+        try:
+            driver()
+        except Exception as e:
+            err.append(e)
+        finally:
+            time.sleep(0.2)
+            os.kill(os.getpid(), signal.SIGINT)
+    threading.Thread(target=drive, name="driver", daemon=True).start()
+    try:
+        with open(log, "a") as f, contextlib.redirect_stdout(f), contextlib.redirect_stderr(f):
+            main()
+    finally:
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    end = time.monotonic() + 5.0
+    for t in set(threading.enumerate()) - before:
+        if "process_request" not in t.name and t.name not in ("driver", "block-clock"):
+            t.join(timeout=max(0.0, end - time.monotonic()))
+    if err:
+        raise err[0]
+
+def wait_for(cond, timeout, poll_s=0.05):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if cond():
+            return True
+        time.sleep(poll_s)
+    return False
+
+# ---------- toggle: Switch + state_button_oled ----------
+def run_toggle(app, mode, args, clock):
+    global REC
+    REC = Rec()
+    button = LiveButtonLine(seed=args.seed)
+    HW.reset({app.BUTTON: button})
+    app.PIPELINE, app.ENGINE = mode == "pipelined", "async" if mode == "async" else "sync"
+    app.stop_ev.clear(); app.flicker_ev.clear()
+    rng = random.Random(args.seed)
+    presses = []
+
+    def driver():
+        if not wait_for(lambda: REC.ui, 60):
+            raise RuntimeError("toggle app did not show the initial state")
+        time.sleep(0.5)
+        settled = lambda: (len(REC.txs) >= len(presses) and all(tx.receipt_at is not None for _, tx in REC.txs)
+                           and REC.ui[-1] >= max((tx.receipt_at for _, tx in REC.txs), default=0))
+        for _ in range(args.presses):
+            presses.append(button.press(args.hold_s))
+            if mode == "sequential":
+                # the threaded loop reads the button only between toggles: press again once the LED settled
+                time.sleep(args.hold_s)
+                wait_for(settled, args.timeout)
+            time.sleep(args.hold_s + rng.expovariate(1 / args.press_gap_s))
+        wait_for(settled, args.timeout)
+
+    run_app(app.main, driver, args.log)
+    st = {k: [] for k in ("detect", "queue", "send", "mine", "receipt", "led", "oled", "press_to_led", "press_to_oled")}
+    done, last = 0, None
+    for i, t_rel in enumerate(presses):
+        if i >= len(REC.gestures) or i >= len(REC.txs):
+            break
+        (_, t_det), (t_sub, tx) = REC.gestures[i], REC.txs[i]
+        if tx.receipt is None or tx.receipt["status"] != 1:
+            continue
+        t_led = first_after(REC.ui, tx.receipt_at)
+        t_blk = clock.seen.get(tx.receipt["blockNumber"])
+        if t_led is None:
+            continue
+        done += 1
+        last = max(last or t_led, t_led)
+        st["detect"].append(t_det - t_rel); st["queue"].append(t_sub - t_det); st["send"].append(tx.first_sent - t_sub)
+        if t_blk is not None:
+            st["mine"].append(t_blk - tx.first_sent); st["receipt"].append(tx.receipt_at - t_blk)
+        st["led"].append(t_led - tx.receipt_at); st["press_to_led"].append(t_led - t_rel)
+        # the state frame drawn (sent to the panel), before the next UI update
+        t_oled = first_after(REC.frames, t_led)
+        if t_oled is not None and t_oled >= next((u for u in REC.ui if u > t_led), float("inf")):
+            t_oled = None
+        if t_oled is not None:
+            st["oled"].append(t_oled - t_led); st["press_to_oled"].append(t_oled - t_rel)
+    return {"count": len(presses), "done": done, "gestures": len(REC.gestures),
+            "throughput_per_s": round(done / (last - presses[0]), 3) if done and last > presses[0] else 0.0,
+            "stages": {k: summary(v) for k, v in st.items()}}
+
+# ---------- deposit: TokenGate + tokengate_pi ----------
+def run_deposits(app, args, url, w3, token, gate, clock):
+    global REC
+    REC = Rec()
+    HW.reset()
+    tmp = tempfile.mkdtemp(prefix="bench_e2e_")
+    os.environ.update(RPCURL=url, GATE_ADDRESS=gate.address, GATES_FILE=os.path.join(tmp, "none.json"),
+                      QUEUE_FILE=os.path.join(tmp, "q.sqlite"), CHECKPOINT_FILE=os.path.join(tmp, "ckpt.json"))
+    sys.argv = ["tokengate_pi.py", "--mode", args.gate_mode]
+    rng = random.Random(args.seed)
+    senders = w3.eth.accounts[1:1 + args.senders]
+    for s in senders:
+        w3.eth.wait_for_transaction_receipt(token.functions.transfer(s, 10**6 * TOKEN).transact(), poll_latency=0.05)
+        w3.eth.wait_for_transaction_receipt(token.functions.approve(gate.address, 2**255).transact({"from": s}),
+                                            poll_latency=0.05)
+    sent = {}  # tx hash -> (t_sent, opens)
+
+    def driver():
+        if not wait_for(lambda: os.path.exists(os.environ["CHECKPOINT_FILE"]), 60):
+            raise RuntimeError("tokengate app did not start following")
+        time.sleep(0.5)
+        for i in range(args.deposits):
+            opens = rng.random() < args.open_share
+            amount = (100 if opens else 50) * TOKEN  # GatePulse value 1 (1 s open) or 0 (centre)
+            txh = gate.functions.deposit(amount).transact({"from": senders[i % len(senders)], "gas": 150000})
+            sent[_h(txh)] = (time.monotonic(), opens)
+            if (i + 1) % args.burst == 0:
+                time.sleep(args.burst_gap_s)
+        wait_for(lambda: all(h in REC.jobs for h in sent), args.timeout)
+
+    run_app(app.main, driver, args.log)
+    servo = HW.line(app.SERVO_PIN).pulses() if HW.chips else []
+    open_w = (app.MAX_US - 100) / 1e6
+    st = {k: [] for k in ("mine", "ingest", "enqueue", "queue", "servo", "deposit_to_job", "deposit_to_servo")}
+    done, last = 0, None
+    for h, (t_sent, opens) in sent.items():
+        if h not in REC.jobs:
+            continue
+        done += 1
+        t_job, _ = REC.jobs[h]
+        last = max(last or t_job, t_job)
+        st["deposit_to_job"].append(t_job - t_sent)
+        t_blk = clock.seen.get(w3.eth.get_transaction_receipt("0x" + h)["blockNumber"])
+        t_in, t_put = REC.ingested.get(h), REC.enqueued.get(h)
+        if t_blk is not None:
+            st["mine"].append(t_blk - t_sent)
+            if t_in is not None:
+                st["ingest"].append(t_in - t_blk)
+        if t_in is not None and t_put is not None:
+            st["enqueue"].append(t_put - t_in)
+        if t_put is not None:
+            st["queue"].append(t_job - t_put)
+        if opens:
+            t_servo = next((r for r, w in servo if r >= t_job and w >= open_w), None)
+            if t_servo is not None:
+                st["servo"].append(t_servo - t_job); st["deposit_to_servo"].append(t_servo - t_sent)
+    t0 = min((t for t, _ in sent.values()), default=0)
+    return {"count": len(sent), "done": done, "opens": sum(o for _, o in sent.values()),
+            "throughput_per_s": round(done / (last - t0), 3) if done and last > t0 else 0.0,
+            "stages": {k: summary(v) for k, v in st.items()}}
+
+# ---------- chain ----------
+def start_chain(args):
+    """(url, w3, owner key, stop) for a fresh local chain with interval mining every --block-s."""
+    if args.chain == "inproc":
+        from inprocchain import InprocChain
+        chain = InprocChain(args.block_s).start()
+        return chain.url, devchain.connect(chain.url), chain.keys[0], chain.stop
+    w3 = devchain.connect(devchain.RPCURL)
+    w3.provider.make_request("evm_setAutomine", [False])
+    w3.provider.make_request("evm_setIntervalMining", [int(args.block_s * 1000)])
+    def stop():
+        w3.provider.make_request("evm_setIntervalMining", [0])
+        w3.provider.make_request("evm_setAutomine", [True])
+    return devchain.RPCURL, w3, DEV_KEY, stop
+
+def compare(runs, baseline, tolerance):
+    """Stages whose p95 got worse than the baseline by more than `tolerance` (and 5 ms)."""
+    worse = []
+    for name, run in runs.items():
+        for stage, cur in run["stages"].items():
+            old = baseline.get("runs", {}).get(name, {}).get("stages", {}).get(stage, {})
+            a, b = old.get("p95_ms"), cur["p95_ms"]
+            if a is not None and b is not None:
+                flag = b > a * (1 + tolerance) and b - a > 5
+                print(f"  {name:>20s} {stage:>16s} p95 {a:9.1f} -> {b:9.1f} ms{'  REGRESSION' if flag else ''}")
+                if flag:
+                    worse.append((name, stage))
+    return worse
+
+def main():
+    ap = argparse.ArgumentParser(description="End-to-end press->LED and deposit->servo latency per stage, both Pi apps on a local chain with fake hardware.")
+    ap.add_argument("--chain", choices=("inproc", "hardhat"), default="inproc",
+                    help="inproc: eth-tester in this process; hardhat: node at RPCURL (npm run node)")
+    ap.add_argument("--block-s", type=float, default=2.0, help="block interval (interval mining)")
+    ap.add_argument("--toggle-modes", default="sequential,pipelined,async", help="toggle app runs ('' = none)")
+    ap.add_argument("--presses", type=int, default=20, help="button presses per toggle run")
+    ap.add_argument("--press-gap-s", type=float, default=3.0, help="mean time between presses (exponential)")
+    ap.add_argument("--hold-s", type=float, default=0.1, help="how long each press is held")
+    ap.add_argument("--deposits", type=int, default=100, help="deposits in the storm (0 = no deposit run)")
+    ap.add_argument("--senders", type=int, default=5, help="depositing accounts")
+    ap.add_argument("--burst", type=int, default=20, help="deposits sent back to back")
+    ap.add_argument("--burst-gap-s", type=float, default=2.0, help="pause between bursts")
+    ap.add_argument("--open-share", type=float, default=0.1, help="share of deposits that open the gate (1 s); the rest centre it")
+    ap.add_argument("--gate-mode", choices=("poll", "filter"), default="poll", help="tokengate_pi --mode")
+    ap.add_argument("--timeout", type=float, default=180.0, help="wait for the last press/deposit to settle")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", default="bench_e2e.json", help="JSON results file")
+    ap.add_argument("--baseline", help="earlier --out JSON to compare p95s with")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 growth vs. the baseline")
+    ap.add_argument("--log", default=os.path.join(tempfile.gettempdir(), "bench_e2e.log"), help="the apps' own output")
+    args = ap.parse_args()
+    open(args.log, "w").close()
+
+    url, w3, key, stop_chain = start_chain(args)
+    clock = BlockClock(url).start()
+    runs, fails = {}, 0
+    try:
+        switch = devchain.deploy(w3, "ButtonToContract", "Switch", False)
+        os.environ.update(RPC_URL=url, CHAIN_ID=str(w3.eth.chain_id), CONTRACT_ADDRESS=switch.address, PRIVATE_KEY=key,
+                          MAX_FEE_GWEI="50", MAX_PRIORITY_FEE_GWEI="1")
+        import state_button_oled, tokengate_pi  # after the env they read at import
+        instrument_toggle(state_button_oled); instrument_gate(tokengate_pi)
+        for mode in filter(None, args.toggle_modes.split(",")):
+            runs[f"toggle/{mode}"] = run_toggle(state_button_oled, mode, args, clock)
+        if args.deposits:
+            token, gate = devchain.deploy_tokengate(w3)
+            runs[f"deposit/{args.gate_mode}"] = run_deposits(tokengate_pi, args, url, w3, token, gate, clock)
+    finally:
+        clock.stop(); stop_chain()
+
+    for name, run in runs.items():
+        print(f"{name}: {run['done']}/{run['count']} settled, {run['throughput_per_s']}/s")
+        print(f"  {'stage':>16s} {'n':>4s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'max':>9s}  (ms)")
+        for stage, s in run["stages"].items():
+            if s["n"]:
+                print(f"  {stage:>16s} {s['n']:4d} {s['p50_ms']:9.1f} {s['p95_ms']:9.1f} {s['p99_ms']:9.1f} {s['max_ms']:9.1f}")
+        if run["done"] < run["count"]:
+            print(f"  FAIL {run['count'] - run['done']} lost or unsettled (app output: {args.log})"); fails += 1
+        if name.startswith("toggle/") and run["gestures"] != run["count"]:
+            print(f"  FAIL {run['gestures']} gestures for {run['count']} presses"); fails += 1
+    result = {"bench": "e2e", "commit": commit(), "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+              "chain": {"kind": args.chain, "block_s": args.block_s}, "args": vars(args), "runs": runs}
+    with open(args.out, "w") as f:
+        json.dump(result, f, indent=1)
+    print(f"\nresults: {args.out}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            base = json.load(f)
+        print(f"vs. {args.baseline} (commit {base.get('commit')})")
+        worse = compare(runs, base, args.tolerance)
+        fails += len(worse)
+    print("PASS" if not fails else "FAIL")
+    sys.exit(1 if fails else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# Toggle fees: fixed MAX_FEE_GWEI / MAX_PRIORITY_FEE_GWEI caps vs. feeoracle.FeeOracle, on a simulated
+# EIP-1559 chain in virtual time (no node needed). Each block the base fee follows demand (+-12.5%),
+# competing txs bid tips, and a full block only takes tips above its clearing tip; the oracle is fed
+# synthetic eth_feeHistory from the last blocks and the measured inclusion times, exactly as the
+# pipeline does (a tx unmined after --stuck s is re-sent with txpipe.bumped_fees).
+#   calm    quiet chain, blocks rarely full
+#   spike   demand surges: base fee x60, tip competition on the way up, then a stretch above the cap
+# Per strategy: press -> inclusion p50/p95/max, effective gas price paid, stuck (bumped) and
+# timed-out txs. Non-zero exit if the oracle is slower than its target, pays more than the caps
+# or times out more often.
+#   python3 bench/bench_fees.py --minutes 60 --target 6
+import os, sys, io, math, random, argparse, contextlib
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "ButtonToContract", "pi"))
+from feeoracle import FeeOracle, PERCENTILES
+from txpipe import bumped_fees
+
+GWEI = 10**9
+BLOCK_S = 2.0
+BASE0 = 0.01 * GWEI
+CAPS = {"maxFeePerGas": int(1.5 * GWEI), "maxPriorityFeePerGas": int(0.2 * GWEI)}  # .env.example defaults
+
+# (fraction of the run, demand); demand 1 keeps blocks ~half full at BASE0
+SCENARIOS = {
+    "calm":  [(1.0, 1.0)],
+    "spike": [(0.15, 1.0), (0.30, 8.0), (0.15, 1.0), (0.15, 15.0), (0.25, 1.0)],
+}
+
+def pct(xs, f):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(f * len(xs)))] if xs else float("nan")
+
+class Chain:
+    """Base fee, fullness and competing tips per block; demand falls as the base fee rises."""
+    def __init__(self, phases, blocks, rng):
+        self.rng = rng
+        self.demand = []
+        for frac, d in phases:
+            self.demand += [d] * int(frac * blocks)
+        self.base = BASE0
+        self.blocks = []  # (base, gasUsedRatio, clearing tip, included competitor tips)
+
+    def mine(self, n):
+        d = self.demand[min(n, len(self.demand) - 1)]
+        want = 0.5 * d * math.sqrt(BASE0 / self.base) * self.rng.lognormvariate(0, 0.3)
+        used = min(1.0, want)
+        median = 0.002 * GWEI * max(1.0, want) ** 2
+        bids = sorted(self.rng.lognormvariate(math.log(median), 1.0) for _ in range(40))
+        clearing = bids[int((1 - 1 / want) * len(bids))] if want > 1 else 0
+        blk = (self.base, used, clearing, [b for b in bids if b >= clearing])
+        self.blocks.append(blk)
+        self.base = max(0.001 * GWEI, self.base * (1 + 0.125 * (used - 0.5) / 0.5))
+        return blk
+
+    def fee_history(self, count=20):
+        last = self.blocks[-count:]
+        return {"baseFeePerGas": [b[0] for b in last] + [self.base], "gasUsedRatio": [b[1] for b in last],
+                "reward": [[int(pct(b[3], p / 100)) for p in PERCENTILES] if b[3] else [] for b in last]}
+
+def includes(blk, fees):
+    base, _, clearing, _ = blk
+    return fees["maxFeePerGas"] >= base and min(fees["maxPriorityFeePerGas"], fees["maxFeePerGas"] - base) >= max(1, clearing)
+
+def run(strategy, scenario, args):
+    rng = random.Random(args.seed)
+    blocks = int(args.minutes * 60 / BLOCK_S)
+    chain = Chain(SCENARIOS[scenario], blocks, rng)
+    now = [0.0]
+    oracle = None
+    if strategy == "oracle":
+        oracle = FeeOracle(None, CAPS, args.target, BLOCK_S, refresh_s=15.0, clock=lambda: now[0])
+    presses = sorted(rng.uniform(60, blocks * BLOCK_S - 240) for _ in range(int(args.minutes * 60 / args.every)))
+    pending, lat, paid, stuck, timeouts = [], [], [], 0, 0
+    next_refresh = 0.0
+    log = io.StringIO()
+    with contextlib.redirect_stderr(log):
+        for _ in range(20):  # history before the first press
+            chain.mine(0)
+        for n in range(blocks):
+            t = n * BLOCK_S
+            now[0] = t
+            if oracle is not None and t >= next_refresh:
+                oracle.update(chain.fee_history())
+                next_refresh = t + oracle.refresh_s
+            while presses and presses[0] <= t:
+                tier, fees = oracle.fees() if oracle is not None else (None, dict(CAPS))
+                pending.append({"at": presses.pop(0), "sent": t, "fees": fees, "tier": tier, "bumps": 0})
+            blk = chain.mine(n)
+            t_mined = t + BLOCK_S
+            for tx in list(pending):
+                if includes(blk, tx["fees"]):
+                    pending.remove(tx)
+                    lat.append(t_mined - tx["at"])
+                    paid.append(blk[0] + min(tx["fees"]["maxPriorityFeePerGas"], tx["fees"]["maxFeePerGas"] - blk[0]))
+                    stuck += tx["bumps"] > 0
+                    if oracle is not None:
+                        oracle.observe(tx["tier"], t_mined - tx["at"], tx["bumps"])
+                elif t_mined - tx["at"] > 180:
+                    pending.remove(tx); timeouts += 1  # the old RECEIPT_TIMEOUT_S
+                elif t_mined - tx["sent"] >= args.stuck and tx["bumps"] < 5 and not tx.get("capped"):
+                    fees = bumped_fees(tx["fees"], 1.125, CAPS, oracle)
+                    if fees is None:
+                        tx["capped"] = True  # at the caps: the pipeline does not re-send it
+                        continue
+                    tx["fees"] = fees
+                    tx["sent"], tx["bumps"] = t_mined, tx["bumps"] + 1
+    timeouts += len(pending)
+    moves = log.getvalue().count("-> p")
+    return {"lat": lat, "paid": paid, "stuck": stuck, "timeouts": timeouts, "moves": moves,
+            "tier": oracle.stats()["tier"] if oracle is not None else "-", "max_base": max(b[0] for b in chain.blocks)}
+
+def main():
+    ap = argparse.ArgumentParser(description="Toggle fees on a simulated EIP-1559 chain: fixed caps vs. fee-history oracle.")
+    ap.add_argument("--minutes", type=float, default=60, help="simulated minutes per scenario")
+    ap.add_argument("--every", type=float, default=15, help="mean seconds between presses")
+    ap.add_argument("--target", type=float, default=6.0, help="oracle inclusion target, seconds (FEE_TARGET_S)")
+    ap.add_argument("--stuck", type=float, default=30.0, help="re-send with bumped fees after, seconds (STUCK_AFTER_S)")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+    fails = 0
+
+    print(f"caps {CAPS['maxFeePerGas'] / GWEI} / {CAPS['maxPriorityFeePerGas'] / GWEI} gwei, target {args.target:.0f}s\n")
+    print(f"{'scenario':>8s} {'strategy':>8s} {'txs':>5s} {'p50':>6s} {'p95':>6s} {'max':>6s} {'paid gwei':>10s} "
+          f"{'stuck':>6s} {'timeout':>8s}  tier (raised)")
+    for scenario in SCENARIOS:
+        rows = {}
+        for strategy in ("fixed", "oracle"):
+            r = rows[strategy] = run(strategy, scenario, args)
+            mean_paid = sum(r["paid"]) / max(1, len(r["paid"])) / GWEI
+            r["mean_paid"] = mean_paid
+            print(f"{scenario:>8s} {strategy:>8s} {len(r['lat']):5d} {pct(r['lat'], .5):5.1f}s {pct(r['lat'], .95):5.1f}s "
+                  f"{max(r['lat'], default=0):5.0f}s {mean_paid:10.4f} {r['stuck']:6d} {r['timeouts']:8d}  "
+                  f"{r['tier']} ({r['moves']})")
+        fx, orc = rows["fixed"], rows["oracle"]
+        print(f"  peak base fee {fx['max_base'] / GWEI:.3f} gwei; oracle pays {orc['mean_paid'] / fx['mean_paid']:.0%} of the fixed caps' price")
+        if orc["mean_paid"] >= fx["mean_paid"]:
+            print(f"  FAIL {scenario}: oracle does not pay less than the fixed caps"); fails += 1
+        if pct(orc["lat"], .5) > args.target:
+            print(f"  FAIL {scenario}: oracle median inclusion above the {args.target:.0f}s target"); fails += 1
+        if orc["timeouts"] > fx["timeouts"]:
+            print(f"  FAIL {scenario}: oracle times out more txs than the fixed caps"); fails += 1
+        if scenario == "calm" and pct(orc["lat"], .95) > args.target + 2 * BLOCK_S:
+            print(f"  FAIL calm: oracle p95 inclusion {pct(orc['lat'], .95):.1f}s"); fails += 1
+        print()
+    print("PASS" if not fails else "FAIL")
+    sys.exit(1 if fails else 0)
+
+if __name__ == "__main__":
+    main()
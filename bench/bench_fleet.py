@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# Fleet toggle controller (ButtonToContract/pi/fleet.py) on a local dev chain with interval mining:
+# --contracts Switch contracts deployed from --accounts fresh funded accounts (each account owns its
+# shard, so each is one nonce lane), then
+#   legacy  the serialized one-account flow of state_button_oled.py for --legacy toggles: pending-nonce
+#           lookup, sign, send, wait for the receipt, readState
+#   fleet   --rounds rounds of toggling every contract: local nonces per lane, signing in a process pool
+#           (--signers), lanes sent concurrently (one JSON-RPC batch each), receipts found by block scans
+# toggles/s, time to inclusion p50/p95/p99 and HTTP round trips per toggle, written as JSON with the
+# commit (--out); --baseline fails if toggles/s or inclusion p95 got worse by more than --tolerance.
+# Checks: one contract is listed under an account that does not own it (its toggles must come back
+# reverted), and a tx sent out of band from a lane's key takes the nonce the controller holds next (the
+# collided toggle must be re-sent or reported failed, not lost). Non-zero exit if a toggle is unsettled
+# or any contract's final readState differs from what the toggles reported mined imply.
+#   python3 bench/bench_fleet.py --contracts 200 --accounts 8       # eth-tester chain in this process
+#   cd ButtonToContract/chain && npm run compile && npm run node     # or a Hardhat node
+#   python3 bench/bench_fleet.py --chain hardhat
+import os, sys, json, time, argparse, tempfile
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "ButtonToContract", "pi"))
+import devchain
+from devchain import DEV_KEY, commit, pct
+from web3 import Web3
+from eth_account import Account
+from pi_common.rpcbatch import Batcher
+from feeoracle import estimate_gas
+from fleet import FleetController, load_fleet
+
+class CountingProvider(Web3.HTTPProvider):
+    round_trips = 0
+    def make_request(self, method, params):
+        CountingProvider.round_trips += 1
+        return super().make_request(method, params)
+
+    def make_batch_request(self, requests):
+        CountingProvider.round_trips += 1
+        return super().make_batch_request(requests)
+
+def caps(w3):
+    return {"maxFeePerGas": w3.to_wei(50, "gwei"), "maxPriorityFeePerGas": w3.to_wei(1, "gwei")}
+
+def send_all(w3, acct, txs):
+    """Sign and send txs (dicts without nonce) from acct at consecutive nonces; their hashes."""
+    nonce = w3.eth.get_transaction_count(acct.address, "pending")
+    cid = w3.eth.chain_id
+    return [w3.eth.send_raw_transaction(acct.sign_transaction({"chainId": cid, "type": 2, "nonce": nonce + i,
+                                                               **caps(w3), **tx}).raw_transaction)
+            for i, tx in enumerate(txs)]
+
+def setup(w3, funder_key, n_accounts, n_contracts, wave):
+    """Fresh funded accounts and Switch(false) contracts deployed round robin from them: (accts, [(addr, idx)])."""
+    accts = [Account.create() for _ in range(n_accounts)]
+    hs = send_all(w3, Account.from_key(funder_key), [{"to": a.address, "value": 10**19, "gas": 21000} for a in accts])
+    for h in hs:
+        w3.eth.wait_for_transaction_receipt(h, timeout=120, poll_latency=0.1)
+    abi, bytecode = devchain.artifact("ButtonToContract", "Switch")
+    data = w3.eth.contract(abi=abi, bytecode=bytecode).constructor(False).data_in_transaction
+    contracts = []
+    for start in range(0, n_contracts, wave):  # a block's gas limit takes ~100 deployments
+        idxs = [i % n_accounts for i in range(start, min(n_contracts, start + wave))]
+        sent = []
+        for idx in sorted(set(idxs)):
+            deploys = [{"data": data, "value": 0, "gas": 400000}] * idxs.count(idx)
+            sent += [(idx, h) for h in send_all(w3, accts[idx], deploys)]
+        for idx, h in sent:
+            contracts.append((w3.eth.wait_for_transaction_receipt(h, timeout=120, poll_latency=0.1).contractAddress, idx))
+    return accts, contracts
+
+def run_legacy(w3, acct, con, n):
+    """state_button_oled.py before txpipe: one toggle at a time, receipt polled, state read back."""
+    cid, lat = w3.eth.chain_id, []
+    t0 = time.monotonic()
+    for _ in range(n):
+        t = time.monotonic()
+        nonce = w3.eth.get_transaction_count(acct.address, "pending")
+        tx = con.functions.changeState().build_transaction({"from": acct.address, "chainId": cid, "nonce": nonce,
+                                                           "type": 2, "gas": 120000, **caps(w3)})
+        h = w3.eth.send_raw_transaction(acct.sign_transaction(tx).raw_transaction)
+        assert w3.eth.wait_for_transaction_receipt(h, timeout=120, poll_latency=0.1).status == 1
+        con.functions.readState().call()
+        lat.append(time.monotonic() - t)
+    return n / (time.monotonic() - t0), lat
+
+def final_states(w3, batch, abi, addrs):
+    calls = [lambda a=a: w3.eth.contract(address=a, abi=abi).functions.readState().call() for a in addrs]
+    out = []
+    for i in range(0, len(calls), 100):
+        out += batch.run(*calls[i:i + 100])
+    return dict(zip(addrs, out))
+
+def start_chain(args):
+    if args.chain == "inproc":
+        from inprocchain import InprocChain
+        chain = InprocChain(args.block_s).start()
+        return chain.url, chain.keys[0], chain.stop
+    w3 = devchain.connect(devchain.RPCURL)
+    w3.provider.make_request("evm_setAutomine", [False])
+    w3.provider.make_request("evm_setIntervalMining", [int(args.block_s * 1000)])
+    def stop():
+        w3.provider.make_request("evm_setIntervalMining", [0])
+        w3.provider.make_request("evm_setAutomine", [True])
+    return devchain.RPCURL, DEV_KEY, stop
+
+def main():
+    ap = argparse.ArgumentParser(description="Fleet toggle controller vs. the serialized one-account flow: toggles/s, inclusion percentiles, RPC round trips.")
+    ap.add_argument("--chain", choices=("inproc", "hardhat"), default="inproc",
+                    help="inproc: eth-tester in this process; hardhat: node at RPCURL (npm run node)")
+    ap.add_argument("--block-s", type=float, default=1.0, help="block interval (interval mining)")
+    ap.add_argument("--contracts", type=int, default=200, help="Switch contracts in the fleet")
+    ap.add_argument("--accounts", type=int, default=8, help="owning accounts (nonce lanes)")
+    ap.add_argument("--rounds", type=int, default=3, help="fleet rounds, sent back to back")
+    ap.add_argument("--legacy", type=int, default=10, help="toggles through the serialized flow")
+    ap.add_argument("--signers", type=int, help="signing processes (default one per CPU; 0 = in process)")
+    ap.add_argument("--receipts", choices=("auto", "logs"), default="auto",
+                    help="auto: eth_getBlockReceipts where the node has it; logs: blocks + eth_getLogs")
+    ap.add_argument("--poll-s", type=float, default=0.25, help="block scan interval")
+    ap.add_argument("--stuck-after-s", type=float, default=15.0, help="lane re-send / nonce check after this long unmined")
+    ap.add_argument("--wave", type=int, default=60, help="deployments per block during setup")
+    ap.add_argument("--timeout", type=float, default=180.0, help="wait for a round to settle")
+    ap.add_argument("--out", default="bench_fleet.json", help="JSON results file")
+    ap.add_argument("--baseline", help="earlier --out JSON to compare with")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed toggles/s drop / inclusion p95 growth")
+    args = ap.parse_args()
+    fails = 0
+
+    url, funder_key, stop_chain = start_chain(args)
+    w3 = Web3(CountingProvider(url, request_kwargs={"timeout": 60}))
+    batch = Batcher(w3)
+    fleet = None
+    try:
+        t0 = time.monotonic()
+        accts, deployed = setup(w3, funder_key, args.accounts, args.contracts, args.wave)
+        abi, _ = devchain.artifact("ButtonToContract", "Switch")
+        print(f"setup: {len(deployed)} Switch contracts on {len(accts)} accounts in {time.monotonic() - t0:.1f}s")
+        mined = {addr: 0 for addr, _ in deployed}  # toggles that took effect, per contract
+
+        con = w3.eth.contract(address=deployed[0][0], abi=abi)
+        rt0 = CountingProvider.round_trips
+        tps, lat = run_legacy(w3, accts[deployed[0][1]], con, args.legacy)
+        mined[con.address] += args.legacy
+        legacy = {"toggles": args.legacy, "toggles_per_s": round(tps, 2),
+                  "latency_p50_s": round(pct(lat, 0.5), 3), "latency_p95_s": round(pct(lat, 0.95), 3),
+                  "round_trips_per_toggle": round((CountingProvider.round_trips - rt0) / args.legacy, 1)}
+        print(f"legacy: {tps:.2f} toggles/s, toggle -> state read back p50 {legacy['latency_p50_s']}s "
+              f"p95 {legacy['latency_p95_s']}s, {legacy['round_trips_per_toggle']} HTTP round trips/toggle")
+
+        # fleet file as an operator would write it: keys by env var name, one contract under the wrong account
+        env = {f"BENCH_FLEET_KEY_{i}": a.key.to_0x_hex() if hasattr(a.key, "to_0x_hex") else "0x" + a.key.hex()
+               for i, a in enumerate(accts)}
+        spec = {"accounts": {f"ops{i}": f"BENCH_FLEET_KEY_{i}" for i in range(len(accts))},
+                "contracts": [{"address": addr, "account": f"ops{idx}"} for addr, idx in deployed]}
+        misowned = None
+        if len(accts) > 1:
+            misowned = deployed[-1][0]
+            spec["contracts"][-1]["account"] = f"ops{(deployed[-1][1] + 1) % len(accts)}"
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+            json.dump(spec, f)
+        accounts, contracts = load_fleet(f.name, env)
+        os.unlink(f.name)
+
+        gas = estimate_gas(con.functions.changeState(), accts[deployed[0][1]].address)
+        t0 = time.monotonic()
+        fleet = FleetController(w3, accounts, contracts, w3.eth.chain_id, caps(w3), gas=gas, signers=args.signers,
+                                batcher=batch, poll_s=args.poll_s, stuck_after_s=args.stuck_after_s,
+                                receipts=args.receipts).start()
+        print(f"fleet: {len(fleet.lanes)} lanes, signing pool up in {time.monotonic() - t0:.2f}s, gas {gas}")
+        rt0 = CountingProvider.round_trips
+        t0 = time.monotonic()
+        txs = []
+        for _ in range(args.rounds):
+            t = time.monotonic()
+            txs += fleet.toggle()
+            print(f"  round: {len(contracts)} toggles signed and sent in {time.monotonic() - t:.2f}s")
+        t_sent = time.monotonic() - t0
+        fleet.wait(txs, args.timeout)
+        st = fleet.stats()
+        round_trips = CountingProvider.round_trips - rt0
+        for tx in txs:
+            if tx.error is None and tx.block is not None:
+                mined[tx.contract] += 1
+        unsettled = sum(not tx.done.is_set() for tx in txs)
+        bad = [tx for tx in txs if tx.error is not None and tx.contract != misowned]
+        st.update(toggles=len(txs), send_s=round(t_sent, 2), round_trips=round_trips,
+                  round_trips_per_toggle=round(round_trips / max(1, len(txs)), 3))
+        print(f"fleet: {st['mined']}/{len(txs)} mined, {st['toggles_per_s']} toggles/s (x{(st['toggles_per_s'] or 0) / tps:.0f} "
+              f"legacy), inclusion p50 {st['inclusion_p50_s']}s p95 {st['inclusion_p95_s']}s p99 {st['inclusion_p99_s']}s")
+        print(f"  {round_trips} HTTP round trips = {st['round_trips_per_toggle']}/toggle; receipts via "
+              f"{st['receipts']}, {st['blocks_scanned']} blocks scanned in {st['scan_calls']} calls")
+        if unsettled:
+            print(f"  FAIL {unsettled} toggles unsettled after {args.timeout:.0f}s"); fails += 1
+        if bad:
+            print(f"  FAIL {len(bad)} toggles failed, e.g. {bad[0].contract}: {bad[0].error}"); fails += 1
+        if misowned is not None:
+            rev = sum(tx.contract == misowned and tx.error is not None and tx.block is not None for tx in txs)
+            print(f"  misowned contract: {rev}/{args.rounds} toggles reported reverted")
+            if rev != args.rounds:
+                print("  FAIL reverted toggles not detected by the block scan"); fails += 1
+
+        # out-of-band tx at the nonce the first lane hands out next
+        lane = next(iter(fleet.lanes.values()))
+        owner = next(a for a in accts if a.address == lane.address)
+        send_all(w3, owner, [{"to": owner.address, "value": 0, "gas": 21000}])
+        f0, r0 = fleet.failed, fleet.resyncs
+        ftxs = fleet.toggle(lane.contracts[:5])
+        fleet.wait(ftxs, args.timeout + args.stuck_after_s)
+        for tx in ftxs:
+            if tx.error is None and tx.block is not None:
+                mined[tx.contract] += 1
+        lost = sum(not tx.done.is_set() for tx in ftxs)
+        fault = {"toggles": len(ftxs), "mined": sum(tx.error is None for tx in ftxs if tx.done.is_set()),
+                 "failed": fleet.failed - f0, "resyncs": fleet.resyncs - r0, "unsettled": lost}
+        print(f"nonce taken out of band: {fault['mined']}/{len(ftxs)} mined, {fault['failed']} reported failed, "
+              f"{fault['resyncs']} resyncs")
+        if lost or fault["resyncs"] < 1:
+            print("  FAIL collided toggle not re-sent or reported"); fails += 1
+
+        states = final_states(w3, batch, abi, list(mined))
+        wrong = [a for a, n in mined.items() if states[a] != ("ON" if n % 2 else "OFF")]
+        print(f"final readState: {len(mined) - len(wrong)}/{len(mined)} contracts match the toggles reported mined")
+        if wrong:
+            print(f"  FAIL e.g. {wrong[0]}: {states[wrong[0]]} after {mined[wrong[0]]} toggles"); fails += 1
+    finally:
+        if fleet is not None:
+            fleet.close()
+        stop_chain()
+
+    result = {"bench": "fleet", "commit": commit(), "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+              "chain": {"kind": args.chain, "block_s": args.block_s}, "args": vars(args),
+              "legacy": legacy, "fleet": st, "fault": fault}
+    with open(args.out, "w") as f:
+        json.dump(result, f, indent=1)
+    print(f"results: {args.out}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            base = json.load(f).get("fleet", {})
+        print(f"vs. {args.baseline}")
+        a, b = base.get("toggles_per_s"), st["toggles_per_s"]
+        if a and b:
+            worse = b < a * (1 - args.tolerance)
+            print(f"  toggles/s       {a:8.2f} -> {b:8.2f}{'  REGRESSION' if worse else ''}")
+            fails += worse
+        a, b = base.get("inclusion_p95_s"), st["inclusion_p95_s"]
+        if a is not None and b is not None:
+            worse = b > a * (1 + args.tolerance) and b - a > 0.05
+            print(f"  inclusion p95   {a:8.3f} -> {b:8.3f}s{'  REGRESSION' if worse else ''}")
+            fails += worse
+    print("PASS" if not fails else "FAIL")
+    sys.exit(1 if fails else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# Multi-gate fan-out: RPC calls/sec and deposit -> worker latency as the gate count grows,
+# one scanner per gate (what N separate listeners do) vs. one scanner with an address list
+# whose logs are decoded once and routed to per-gate durable-queue lanes and GateWorkers on
+# simulated gpiod lines. The chain is simulated in-process (FakeChain, --block-s per block,
+# --rpc-ms per call), so it runs anywhere; deposits are spread over random gates.
+#   python3 bench/bench_gates.py --gates 1,10,50,100 --seconds 20
+import os, io, sys, time, random, threading, argparse, tempfile, contextlib
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "TokenGate", "pi"))
+from fakes import FakeChain, FakeLine
+from gatepulse import TOPIC0, decode_batch
+from gates import GateConfig, GateRouter, GateWorker
+from logscan import LogScanner
+from durable_queue import DurableQueue
+from scheduler import Scheduler, make_policy
+from servo_pwm import ServoPWM, percentile
+
+POLL_INTERVAL = 1.0
+
+class Rpc:
+    """Counts calls and adds a fixed round-trip time, like an HTTP provider."""
+    def __init__(self, chain, rtt_s):
+        self.chain, self.rtt_s = chain, rtt_s
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _call(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.rtt_s)
+
+    def block_number(self):
+        self._call(); return self.chain.tip
+
+    def get_logs(self, lo, hi, address):
+        self._call(); return self.chain.get_logs(lo, hi, address)
+
+def miner(chain, addrs, rate, block_s, stop, rng):
+    """Mine a block every block_s with Poisson(rate * block_s) zero-value deposits on random gates."""
+    while not stop.wait(block_s):
+        k, t = 0, rng.expovariate(rate)
+        while t < block_s:
+            k += 1; t += rng.expovariate(rate)
+        chain.mine([(0, rng.choice(addrs)) for _ in range(k)])
+
+def run(n, mode, seconds, rate, block_s, rtt_s, seed=1):
+    rng = random.Random(seed)
+    chain = FakeChain(seed=seed, topic0=TOPIC0)
+    addrs = ["0x%040x" % (0x1000 + i) for i in range(n)]
+    rpc = Rpc(chain, rtt_s)
+    stop = threading.Event()
+    seen = {}  # txhash -> monotonic time at the gate (worker job start / delivery)
+    threads, scanners, extra = [], [], []
+    start = chain.tip
+
+    if mode == "per-gate":
+        # N independent listeners, each polling its own address
+        def deliver(logs):
+            now = time.monotonic()
+            for lg in logs:
+                seen.setdefault(lg["transactionHash"], now)
+        for a in addrs:
+            sc = LogScanner(lambda lo, hi, a=a: rpc.get_logs(lo, hi, a), workers=1); scanners.append(sc)
+            threads.append(threading.Thread(target=sc.follow, args=(rpc.block_number, start, deliver, stop,
+                                                                      POLL_INTERVAL), daemon=True))
+    else:
+        # one scanner, one get_logs for all gates, routed to per-gate lanes and workers
+        gates = [GateConfig(f"g{i}", a, servo=3 * i, led_red=3 * i + 1, led_green=3 * i + 2) for i, a in enumerate(addrs)]
+        router = GateRouter(gates)
+        q = DurableQueue(os.path.join(tempfile.mkdtemp(prefix="tggates-"), "queue.sqlite")); extra.append(q)
+        workers = {}
+        def on_job(job, t):
+            for e in job.entries:
+                seen.setdefault(e[1][3], t)
+        for g in gates:
+            servo = ServoPWM(FakeLine(), spin_s=0.0, switch_interval_s=0).start(); extra.append(servo)
+            sched = Scheduler(make_policy("merge"), True, dropped=q.retracted); sched.centered()
+            workers[g.address] = GateWorker(g, q.lane(g.name), sched, servo, FakeLine(), FakeLine(),
+                                            on_job=on_job).start(stop)
+        def deliver(logs):
+            for ev in decode_batch(logs):
+                g = router.route(ev.address)
+                workers[g.address].q.put(f"{ev.block_hash}:{ev.log_index}",
+                                         (ev.value, ev.sender, ev.block, ev.tx_hash, ev.log_index))
+            q.flush()
+        sc = LogScanner(lambda lo, hi: rpc.get_logs(lo, hi, router.addresses), workers=1); scanners.append(sc)
+        threads.append(threading.Thread(target=sc.follow, args=(rpc.block_number, start, deliver, stop,
+                                                                  POLL_INTERVAL), daemon=True))
+
+    for t in threads:
+        t.start()
+    m = threading.Thread(target=miner, args=(chain, addrs, rate, block_s, stop, rng), daemon=True); m.start()
+    time.sleep(1.0)
+    c0, t0 = rpc.calls, time.monotonic()
+    time.sleep(seconds)
+    calls_s = (rpc.calls - c0) / (time.monotonic() - t0)
+    time.sleep(POLL_INTERVAL + block_s + 0.5)  # let the last deposits arrive
+    stop.set()
+    for t in threads:
+        t.join(timeout=5.0)
+    for sc in scanners:
+        sc.close()
+    for x in extra:
+        x.stop() if isinstance(x, ServoPWM) else x.close()
+
+    lat = [(seen[h] - t) * 1000 for h, t in chain.mined_at.items() if h in seen]
+    return calls_s, len(lat), len(chain.mined_at), lat
+
+def main():
+    ap = argparse.ArgumentParser(description="Multi-gate fan-out: RPC calls/sec and latency vs. gate count.")
+    ap.add_argument("--gates", default="1,10,50,100")
+    ap.add_argument("--seconds", type=float, default=20.0, help="measurement window per run")
+    ap.add_argument("--rate", type=float, default=2.0, help="deposits/sec across all gates")
+    ap.add_argument("--block-s", type=float, default=2.0)
+    ap.add_argument("--rpc-ms", type=float, default=20.0)
+    ap.add_argument("--modes", default="per-gate,fan-out")
+    args = ap.parse_args()
+
+    print(f"{'gates':>5s} {'mode':>8s} {'rpc/s':>7s} {'events':>11s} {'p50':>8s} {'p95':>8s} {'max':>8s}")
+    for n in [int(x) for x in args.gates.split(",")]:
+        for mode in args.modes.split(","):
+            with contextlib.redirect_stdout(io.StringIO()):  # per-pulse [Worker] lines
+                calls_s, got, mined, lat = run(n, mode, args.seconds, args.rate, args.block_s, args.rpc_ms / 1000)
+            print(f"{n:5d} {mode:>8s} {calls_s:7.1f} {got:5d}/{mined:<5d} {percentile(lat, .5):6.0f}ms "
+                  f"{percentile(lat, .95):6.0f}ms {max(lat, default=0.0):6.0f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# Benchmark: GatePulse mined -> enqueue latency and RPC calls/hour (busy + idle),
+# polling vs. WebSocket push vs. server-side filter, on a local dev chain.
+#   cd TokenGate/chain && npm run compile && npm run node      # terminal 1
+#   python3 bench/bench_ingest.py --events 30 --idle 60        # terminal 2
+import os, sys, time, random, threading, argparse
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "TokenGate", "pi"))
+import devchain
+from logscan import LogScanner
+from subscribe import LogSubscriber
+from logfilter import FilterFollower
+
+POLL_INTERVAL = 1.0
+
+def run_mode(mode, w3, gate, topic0, n_events, idle_s):
+    arrived, calls = {}, {"rpc": 0}
+    stop = threading.Event()
+
+    def get_logs(lo, hi):
+        calls["rpc"] += 1
+        return w3.eth.get_logs({"fromBlock": lo, "toBlock": hi, "address": gate.address, "topics": [topic0]})
+
+    def get_tip():
+        calls["rpc"] += 1
+        return w3.eth.block_number
+
+    def on_logs(logs):
+        now = time.perf_counter()
+        for lg in logs:
+            arrived.setdefault(lg["transactionHash"], now)
+
+    scanner = LogScanner(get_logs, workers=1)
+    start = w3.eth.block_number
+    if mode == "ws":
+        sub = LogSubscriber(devchain.WSURL, gate.address, topic0, scanner, on_logs, stop, heartbeat_s=30.0)
+        t = threading.Thread(target=sub.run, args=(start,), daemon=True)
+    elif mode == "filter":
+        sub = FilterFollower(w3, gate.address, topic0, scanner, on_logs, stop)
+        t = threading.Thread(target=sub.run, args=(start,), daemon=True)
+    else:
+        t = threading.Thread(target=scanner.follow, args=(get_tip, start, on_logs, stop, POLL_INTERVAL), daemon=True)
+    t.start(); time.sleep(2.0)
+
+    count = lambda: calls["rpc"] + (sub.calls if mode == "filter" else 0)
+
+    # busy phase: deposits at random gaps, latency per event
+    mined = {}
+    t0, c0 = time.perf_counter(), count()
+    for _ in range(n_events):
+        rcpt = devchain.deposit(w3, gate, random.choice([100, 300, 900]))
+        mined[rcpt.transactionHash] = time.perf_counter()
+        time.sleep(random.uniform(0.3, 1.5))
+    time.sleep(POLL_INTERVAL + 1.0)
+    busy = (count() - c0) / (time.perf_counter() - t0) * 3600
+
+    # idle phase: RPC cost of watching a quiet gate (mine empty blocks like a live chain)
+    t0, c0 = time.perf_counter(), count()
+    while time.perf_counter() - t0 < idle_s:
+        w3.provider.make_request("evm_mine", []); time.sleep(2.0)
+    idle = (count() - c0) / (time.perf_counter() - t0) * 3600
+    stop.set(); t.join(timeout=5); scanner.close()
+
+    lat = [(arrived[h] - m) * 1000 for h, m in mined.items() if h in arrived]
+    print(f"{mode:>6}: {len(lat)}/{n_events} events  p50={devchain.pct(lat, .5):7.1f}ms  "
+          f"p95={devchain.pct(lat, .95):7.1f}ms  max={max(lat, default=float('nan')):7.1f}ms  "
+          f"rpc/h busy={busy:6.0f} idle={idle:6.0f}")
+
+def main():
+    ap = argparse.ArgumentParser(description="GatePulse ingest latency and RPC cost: poll vs ws vs filter")
+    ap.add_argument("--events", type=int, default=30)
+    ap.add_argument("--idle", type=float, default=60.0, help="idle phase length in seconds")
+    ap.add_argument("--modes", default="poll,ws,filter")
+    args = ap.parse_args()
+
+    w3 = devchain.connect()
+    _, gate = devchain.deploy_tokengate(w3)
+    topic0 = w3.keccak(text="GatePulse(uint256,address,uint256,uint256)")
+    for mode in args.modes.split(","):
+        run_mode(mode, w3, gate, topic0, args.events, args.idle)
+
+if __name__ == "__main__":
+    main()
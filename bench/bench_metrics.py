@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# Cost of the pi_common.metrics instruments on the hot paths: ns per Histogram.observe /
+# Counter.inc / labels() lookup, single-threaded and with 4 threads updating the same instrument,
+# the OLED frame path (render + diff transfer on a fake SSD1306) with its metrics vs. with no-op
+# instruments, and a /metrics scrape over HTTP with a registry the size of both apps' (render time,
+# payload). Non-zero exit if an update costs more than --max-observe-us, the OLED path's updates per
+# frame x cost per update exceed --max-oled-pct of a frame, or a scrape renders slower than --max-render-ms.
+#   python3 bench/bench_metrics.py
+import os, sys, time, threading, argparse, urllib.request
+from http.server import ThreadingHTTPServer
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+from fakes import FakeSSD1306
+from pi_common import metrics, oled as oled_mod
+from pi_common.oled import Oled, load_font
+from bench_oled import tokengate_frames, button_frames
+
+class NoOp:
+    def __init__(self):
+        self.calls = 0
+    def observe(self, v):
+        self.calls += 1
+    def inc(self, n=1):
+        self.calls += 1
+
+def per_op(fn, n):
+    t0 = time.perf_counter()
+    fn(n)
+    return (time.perf_counter() - t0) / n * 1e9
+
+def updates(n):
+    reg = metrics.Registry()
+    h = reg.histogram("h_seconds", "h")
+    c = reg.counter("c_total", "c")
+    fam = reg.histogram("l_seconds", "l", labels=("method",))
+    fam.labels("eth_call")
+    def observe(k):
+        for i in range(k):
+            h.observe(0.0007 * (i & 1023))
+    def inc(k):
+        for _ in range(k):
+            c.inc()
+    def labelled(k):
+        for _ in range(k):
+            fam.labels("eth_call").observe(0.01)
+    def loop(k):
+        for _ in range(k):
+            pass
+    base = per_op(loop, n)
+    rows = {"observe": per_op(observe, n) - base, "inc": per_op(inc, n) - base,
+            "labels+observe": per_op(labelled, n) - base}
+    threads = [threading.Thread(target=observe, args=(n // 4,)) for _ in range(4)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    rows["observe x4 threads"] = (time.perf_counter() - t0) / (4 * (n // 4)) * 1e9 - base
+    assert sum(h.snapshot()[0]) == n + 4 * (n // 4), "lost histogram updates"
+    return rows
+
+def oled_path(frames, rounds):
+    """Seconds per frame with the real instruments and with no-ops (best of `rounds`, alternating
+    which goes first), and the instrument calls per frame."""
+    real = (oled_mod.RENDER_SECONDS, oled_mod.TRANSFER_SECONDS, oled_mod.TRANSFER_BYTES)
+    font = load_font()
+    def once(instruments):
+        oled_mod.RENDER_SECONDS, oled_mod.TRANSFER_SECONDS, oled_mod.TRANSFER_BYTES = instruments
+        o = Oled(FakeSSD1306(), font=font, cache_size=4)  # small cache: renders on most frames
+        t0 = time.perf_counter()
+        for key in frames:
+            o.lines(key[1:]) if key[0] == "lines" else o.center(key[1], key[2])
+        return (time.perf_counter() - t0) / len(frames)
+    best = {"metrics": float("inf"), "no-op": float("inf")}
+    noop = NoOp()
+    try:
+        for r in range(rounds):
+            for label in (("metrics", "no-op") if r % 2 else ("no-op", "metrics")):
+                t = once(real if label == "metrics" else (noop, noop, noop))
+                best[label] = min(best[label], t)
+    finally:
+        oled_mod.RENDER_SECONDS, oled_mod.TRANSFER_SECONDS, oled_mod.TRANSFER_BYTES = real
+    return best, noop.calls / (rounds * len(frames))
+
+def app_sized_registry():
+    """Roughly what both apps register, with every series populated."""
+    reg = metrics.Registry()
+    rpc = reg.histogram("rpc_request_seconds", "rpc", labels=("method",))
+    errs = reg.counter("rpc_errors_total", "rpc errors", labels=("method",))
+    for m in ("eth_blockNumber", "eth_getLogs", "eth_call", "eth_sendTransaction", "eth_getTransactionReceipt",
+              "eth_getTransactionCount", "eth_feeHistory", "eth_getBlockByNumber", "batch"):
+        for i in range(100):
+            rpc.labels(m).observe(0.001 * i)
+        errs.labels(m).inc()
+    for name in ("oled_render_seconds", "oled_transfer_seconds", "toggle_inclusion_seconds",
+                 "getlogs_range_blocks", "getlogs_result_logs"):
+        h = reg.histogram(name, name)
+        for i in range(100):
+            h.observe(0.01 * i)
+    wait = reg.histogram("gate_queue_wait_seconds", "wait", labels=("gate",))
+    depth = reg.gauge("gate_queue_depth", "depth", labels=("gate",))
+    servo = reg.histogram("gate_servo_action_seconds", "servo", labels=("gate", "action"))
+    for g in range(10):
+        wait.labels(f"gate{g}").observe(0.5); depth.labels(f"gate{g}").set_function(lambda: 3)
+        servo.labels(f"gate{g}", "open").observe(10); servo.labels(f"gate{g}", "center").observe(0.3)
+    reg.counter("toggle_txs_total", "txs", labels=("result",)).labels("mined").inc(5)
+    reg.counter("oled_transfer_bytes_total", "bytes").inc(12345)
+    return reg
+
+def scrape(reg, n):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        text = reg.render()
+    t_render = (time.perf_counter() - t0) / n
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), metrics._Handler)  # the Exporter's handler, ephemeral port
+    srv.registry = reg
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{srv.server_address[1]}/metrics"
+    t0 = time.perf_counter()
+    for _ in range(n):
+        body = urllib.request.urlopen(url, timeout=5).read()
+    t_http = (time.perf_counter() - t0) / n
+    srv.shutdown(); srv.server_close()
+    assert body.decode() == reg.render(), "scraped text differs from render()"
+    return t_render, t_http, len(text), text.count("\n")
+
+def main():
+    ap = argparse.ArgumentParser(description="Hot-path cost of pi_common.metrics and a /metrics scrape.")
+    ap.add_argument("--n", type=int, default=200000, help="updates per measurement")
+    ap.add_argument("--rounds", type=int, default=6, help="OLED runs per variant (best of)")
+    ap.add_argument("--max-observe-us", type=float, default=5.0)
+    ap.add_argument("--max-oled-pct", type=float, default=5.0)
+    ap.add_argument("--max-render-ms", type=float, default=20.0)
+    args = ap.parse_args()
+    fails = 0
+
+    print("Instrument updates (loop overhead subtracted):")
+    ops = updates(args.n)
+    for name, ns in ops.items():
+        print(f"  {name:>20s}: {ns:7.0f} ns/op")
+        if ns / 1e3 > args.max_observe_us:
+            print(f"  FAIL {name} above {args.max_observe_us} us"); fails += 1
+
+    # the A/B difference is within run-to-run noise, so the check uses calls per frame x cost per call
+    print("OLED frame path (render on cache miss + diff transfer, fake SSD1306):")
+    for label, frames in (("TokenGate countdown", list(tokengate_frames())),
+                          ("ButtonToContract toggles", list(button_frames()))):
+        best, calls = oled_path(frames, args.rounds)
+        over = calls * max(ops["observe"], ops["inc"]) * 1e-9 / best["no-op"] * 100
+        print(f"  {label:>24s}: {best['no-op'] * 1e6:7.1f} us/frame no-op, {best['metrics'] * 1e6:7.1f} us/frame "
+              f"with metrics; {calls:.1f} updates/frame = {over:.2f}%")
+        if over > args.max_oled_pct:
+            print(f"  FAIL {label}: metrics add more than {args.max_oled_pct}%"); fails += 1
+
+    t_render, t_http, size, lines = scrape(app_sized_registry(), 50)
+    print(f"/metrics: {lines} lines, {size} bytes; render {t_render * 1e3:.2f} ms, HTTP scrape {t_http * 1e3:.2f} ms")
+    if t_render * 1e3 > args.max_render_ms:
+        print(f"  FAIL render above {args.max_render_ms} ms"); fails += 1
+
+    print("PASS" if not fails else "FAIL")
+    sys.exit(1 if fails else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# OLED benchmark: I2C bytes and render time per frame, legacy full-frame redraw vs. the
+# cached diff renderer (pi_common.oled), on a fake SSD1306 that emulates GDDRAM.
+# Replays the TokenGate countdown and the ButtonToContract toggle screens, then measures
+# how long the caller is blocked per frame inline vs. through the display thread
+# (pi_common.display) on a bus simulated at 400kHz I2C.
+#   python3 bench/bench_oled.py
+import os, sys, time
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+from PIL import Image, ImageDraw, ImageFont
+from fakes import FakeSSD1306
+from pi_common.oled import Oled, load_font
+from pi_common.display import DisplayService
+
+I2C_S_PER_BYTE = 25e-6  # ~400kHz I2C incl. framing
+
+FONT = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+
+def tokengate_frames(value=30, queue=2):
+    yield ("lines", "TokenGate", "Waiting for events…", "Q:0")
+    for _ in range(3):
+        for remaining in range(value, 0, -1):
+            yield ("lines", f"Pulse: {value}s", f"Remaining: {remaining}s", f"Q:{queue}")
+        yield ("lines", "TokenGate", "CENTER", f"Q:{queue}")
+
+def button_frames(presses=30):
+    state = "OFF"
+    for i in range(presses):
+        yield ("center", "Toggle", None)
+        yield ("center", "Pending…", f"{i:08x}"[:8] + "…")
+        state = "ON" if state == "OFF" else "OFF"
+        yield ("center", state, "Press to toggle")
+
+def legacy_show(dev, key, font):
+    # what the apps did before: new image + metrics on every call, full-frame display()
+    img = Image.new("1", dev.size, 0)
+    d = ImageDraw.Draw(img)
+    if key[0] == "lines":
+        box = font.getbbox("A"); lh = box[3] - box[1] + 2
+        for i, ln in enumerate(key[1:]):
+            d.text((0, i * lh), ln, 255, font=font)
+    else:
+        f = ImageFont.load_default()
+        w, h = d.textbbox((0, 0), key[1], font=f)[2:]
+        d.text(((dev.width - w) // 2, (dev.height - h) // 2), key[1], 255, font=f)
+        if key[2]:
+            w2, h2 = d.textbbox((0, 0), key[2], font=f)[2:]
+            d.text(((dev.width - w2) // 2, dev.height - h2 - 2), key[2], 255, font=f)
+    dev.display(img)
+
+def run(name, frames, font):
+    frames = list(frames)
+    dev = FakeSSD1306()
+    t0 = time.perf_counter()
+    for key in frames:
+        legacy_show(dev, key, font if key[0] == "lines" else None)
+    t_legacy = time.perf_counter() - t0
+    legacy_bytes = dev.bytes
+
+    dev = FakeSSD1306()
+    oled = Oled(dev, font=font if frames[0][0] == "lines" else load_font())
+    t0 = time.perf_counter()
+    for key in frames:
+        if key[0] == "lines":
+            oled.lines(key[1:])
+        else:
+            oled.center(key[1], key[2])
+        assert bytes(dev.ram) == oled._shown, "GDDRAM diverged from frame"
+    t_new = time.perf_counter() - t0
+
+    n = len(frames)
+    print(f"{name}: {n} frames")
+    print(f"  legacy : {legacy_bytes / n:7.1f} bytes/frame  {t_legacy / n * 1e3:6.2f} ms/frame")
+    print(f"  cached : {dev.bytes / n:7.1f} bytes/frame  {t_new / n * 1e3:6.2f} ms/frame  "
+          f"(skipped {oled.skipped}, cache hits {oled.cache_hits}) -> {legacy_bytes / max(1, dev.bytes):.1f}x less I2C")
+
+def blocking(frames, font):
+    frames = [k for k in frames if k[0] == "lines"]
+    for label in ("inline", "display thread"):
+        dev = FakeSSD1306(i2c_delay_s=I2C_S_PER_BYTE)
+        oled = Oled(dev, font=font)
+        target = DisplayService(oled, fps=10.0) if label != "inline" else oled
+        worst = total = 0.0
+        for key in frames:
+            t0 = time.perf_counter()
+            target.lines(key[1:])
+            dt = time.perf_counter() - t0
+            worst, total = max(worst, dt), total + dt
+            time.sleep(0.02)  # the caller's own work between frames
+        extra = ""
+        if label != "inline":
+            target.stop(); extra = f"  {target.stats()}"
+        print(f"  {label:>14}: caller blocked avg {total / len(frames) * 1e3:6.2f} ms  "
+              f"max {worst * 1e3:6.2f} ms{extra}")
+
+def main():
+    run("TokenGate countdown", tokengate_frames(), load_font(FONT, 12))
+    run("ButtonToContract toggles", button_frames(), None)
+    print("Caller blocking per frame (simulated 400kHz bus):")
+    blocking(tokengate_frames(), load_font(FONT, 12))
+
+if __name__ == "__main__":
+    main()
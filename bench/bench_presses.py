@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# Benchmark: sustained button presses/minute (changeState txs mined) on a local dev chain with
+# interval mining (--block-s, like an L2), pressing as fast as the sender allows:
+#   legacy      per press: readState, pending-nonce RPC, build, sign, send, wait for the receipt,
+#               readState at the inclusion block and at latest (the old send_toggle + verify flow)
+#   sequential  txpipe.TxPipeline with one tx in flight (local nonces, background receipt tracking),
+#               new state decoded from the receipt's StateChanged log (statefollow)
+#   pipelined   the same with --inflight txs in flight, receipts tracked concurrently
+# rpc/press is every JSON-RPC request the press caused, receipt polling included.
+# Then two fault checks on the pipeline: a tx dropped from the node's mempool (stuck nonce,
+# must be replaced with a fee bump at the same nonce) and a tx sent by another process from
+# the same key (local nonce goes stale, must resync on "nonce too low"). Non-zero exit on failure.
+#   cd ButtonToContract/chain && npm run compile && npm run node   # terminal 1
+#   python3 bench/bench_presses.py --seconds 60                     # terminal 2
+import os, sys, time, argparse
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ButtonToContract", "pi"))
+import devchain
+from web3 import Web3
+from txpipe import TxPipeline
+from statefollow import state_from_receipt
+
+# Hardhat node account #0 (well-known dev key); it deploys the Switch, so it is the owner
+DEV_KEY = os.getenv("DEV_KEY", "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80")
+
+class CountingProvider(Web3.HTTPProvider):
+    calls = 0
+    def make_request(self, method, params):
+        CountingProvider.calls += 1
+        return super().make_request(method, params)
+
+def caps(w3):
+    return {"maxFeePerGas": w3.to_wei(50, "gwei"), "maxPriorityFeePerGas": w3.to_wei(1, "gwei")}
+
+def run_legacy(w3, acct, con, seconds):
+    cid, lat, t_end = w3.eth.chain_id, [], time.monotonic() + seconds
+    while time.monotonic() < t_end:
+        t0 = time.monotonic()
+        con.functions.readState().call()
+        nonce = w3.eth.get_transaction_count(acct.address, "pending")
+        tx = con.functions.changeState().build_transaction({"from": acct.address, "chainId": cid,
+                                                           "nonce": nonce, "type": 2, "gas": 120000, **caps(w3)})
+        txh = w3.eth.send_raw_transaction(acct.sign_transaction(tx).raw_transaction)
+        rcpt = w3.eth.wait_for_transaction_receipt(txh, timeout=120)
+        con.functions.readState().call(block_identifier=rcpt.blockNumber)
+        con.functions.readState().call()
+        lat.append(time.monotonic() - t0)
+    return len(lat), lat
+
+def make_pipe(w3, acct, con, inflight, **kw):
+    return TxPipeline(w3, acct, con.address, con.encode_abi("changeState"), w3.eth.chain_id, caps(w3),
+                      max_inflight=inflight, **kw)
+
+def run_pipe(w3, acct, con, seconds, inflight):
+    pipe = make_pipe(w3, acct, con, inflight)
+    txs, t_end = [], time.monotonic() + seconds
+    while time.monotonic() < t_end:
+        txs.append(pipe.submit(timeout=120))
+    pipe.wait_idle(timeout=120)
+    pipe.close()
+    ok = [tx for tx in txs if tx.receipt is not None and tx.receipt.status == 1
+          and state_from_receipt(tx.receipt, con.address)[0] is not None]
+    return len(ok), [tx.receipt_at - tx.first_sent for tx in ok]
+
+def check_stuck(w3, acct, con, block_s):
+    """Drop the first of three txs from the mempool; the pipeline must bump it and land all three."""
+    pipe = make_pipe(w3, acct, con, 8, stuck_after_s=3 * block_s, poll_s=0.1)
+    first = pipe.submit()
+    w3.provider.make_request("hardhat_dropTransaction", [first.tx_hash])
+    rest = [pipe.submit() for _ in range(2)]
+    ok = pipe.wait_idle(timeout=30 * block_s)
+    pipe.close()
+    good = ok and all(tx.receipt is not None and tx.receipt.status == 1 for tx in [first] + rest)
+    return good and first.bumps >= 1, pipe
+
+def check_resync(w3, acct, con):
+    """Another sender uses the next nonce behind the pipeline's back; the next press must still land."""
+    pipe = make_pipe(w3, acct, con, 8)
+    pipe.submit().wait(120)
+    w3.eth.wait_for_transaction_receipt(w3.eth.send_transaction({"from": acct.address, "to": acct.address, "value": 0}),
+                                        timeout=120)
+    tx = pipe.submit()
+    rcpt = tx.wait(120)
+    pipe.close()
+    return rcpt.status == 1 and pipe.resyncs == 1, pipe
+
+def main():
+    ap = argparse.ArgumentParser(description="Sustained presses/minute: legacy vs. sequential vs. pipelined toggles.")
+    ap.add_argument("--seconds", type=float, default=60.0, help="measurement window per mode")
+    ap.add_argument("--block-s", type=float, default=2.0, help="dev chain block interval")
+    ap.add_argument("--inflight", type=int, default=8)
+    ap.add_argument("--modes", default="legacy,sequential,pipelined")
+    args = ap.parse_args()
+
+    setup = devchain.connect()
+    con = devchain.deploy(setup, "ButtonToContract", "Switch", False)
+    w3 = Web3(CountingProvider(devchain.RPCURL, request_kwargs={"timeout": 60}))
+    acct = w3.eth.account.from_key(DEV_KEY)
+    con = w3.eth.contract(address=con.address, abi=con.abi)
+    w3.provider.make_request("evm_setAutomine", [False])
+    w3.provider.make_request("evm_setIntervalMining", [int(args.block_s * 1000)])
+    fails = 0
+    try:
+        print(f"{'mode':>10s} {'mined':>6s} {'presses/min':>12s} {'p50':>7s} {'p95':>7s} {'rpc/press':>10s}")
+        for mode in args.modes.split(","):
+            c0, t0 = CountingProvider.calls, time.monotonic()
+            if mode == "legacy":
+                n, lat = run_legacy(w3, acct, con, args.seconds)
+            else:
+                n, lat = run_pipe(w3, acct, con, args.seconds, 1 if mode == "sequential" else args.inflight)
+            el = time.monotonic() - t0
+            rpc = (CountingProvider.calls - c0) / max(1, n)
+            print(f"{mode:>10s} {n:6d} {n * 60 / el:12.1f} {devchain.pct(lat, .5):6.2f}s {devchain.pct(lat, .95):6.2f}s "
+                  f"{rpc:10.1f}")
+
+        ok, pipe = check_stuck(w3, acct, con, args.block_s)
+        fails += not ok
+        print(f"\nstuck tx replaced with fee bump: {'PASS' if ok else 'FAIL'} {pipe.stats()}")
+        ok, pipe = check_resync(w3, acct, con)
+        fails += not ok
+        print(f"nonce resync after foreign tx:   {'PASS' if ok else 'FAIL'} {pipe.stats()}")
+    finally:
+        w3.provider.make_request("evm_setIntervalMining", [0])
+        w3.provider.make_request("evm_setAutomine", [True])
+    sys.exit(1 if fails else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# Durable queue: enqueue throughput with group commit on vs. off (one fsync per event), for
+# deposit bursts delivered the way the listener does it (a batch of puts, then flush()).
+# Point --dir at the SD card to measure the real thing; the raw fsync latency of that
+# directory is printed first. Then a crash test: a child process enqueues, flushes and is
+# killed with os._exit mid-stream; the reopened queue must replay exactly the flushed,
+# unacked entries in order. Exit status 1 on any failure.
+#   python3 bench/bench_queue.py --dir /home/pi --events 2000
+import os, sys, time, argparse, tempfile, subprocess
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "TokenGate", "pi"))
+from durable_queue import DurableQueue
+from servo_pwm import percentile as pct
+
+def fsync_latency(d, n=50):
+    path = os.path.join(d, "fsync.probe")
+    xs = []
+    with open(path, "wb") as f:
+        for _ in range(n):
+            f.write(b"x" * 128); f.flush()
+            t0 = time.perf_counter(); os.fsync(f.fileno()); xs.append(time.perf_counter() - t0)
+    os.remove(path)
+    return xs
+
+def run(d, events, burst, group):
+    path = os.path.join(d, f"bench-{'group' if group else 'single'}.sqlite")
+    for ext in ("", "-wal", "-shm"):
+        if os.path.exists(path + ext):
+            os.remove(path + ext)
+    q = DurableQueue(path, group_commit=group)
+    lat = []
+    t0 = time.perf_counter()
+    for i in range(0, events, burst):
+        tb = time.perf_counter()
+        for j in range(i, min(events, i + burst)):
+            q.put(f"0x{j:064x}:0", (j % 50, "0x" + "ab" * 20, 1000 + j, f"0x{j:064x}", 0))
+        q.flush()
+        lat.append(time.perf_counter() - tb)
+    dt = time.perf_counter() - t0
+    commits, stored = q.commits, q.enqueued
+    q.close()
+    return events / dt, commits, stored, lat
+
+def crash_child(path, n, acked):
+    q = DurableQueue(path)
+    for j in range(n):
+        q.put(f"k{j}", (j, "s", j, f"t{j}", 0))
+        if j % 7 == 6:
+            q.flush()
+    q.flush()
+    for _ in range(acked):
+        qid, _ = q.get(timeout=1.0); q.ack(qid)
+    q.put("lost", (-1, "s", 0, "t", 0))  # buffered, never flushed
+    os._exit(0)                          # no close(), no atexit: like a power cut after the last flush
+
+def crash_test(d, n=500, acked=120):
+    path = os.path.join(d, "crash.sqlite")
+    for ext in ("", "-wal", "-shm"):
+        if os.path.exists(path + ext):
+            os.remove(path + ext)
+    subprocess.run([sys.executable, __file__, "--child", path, str(n), str(acked)], check=True)
+    q = DurableQueue(path)
+    got = []
+    while True:
+        try:
+            got.append(q.get(timeout=0.05)[1][0])
+        except Exception:
+            break
+    # re-putting already stored keys must be ignored (backfill / rescan after restart)
+    for j in range(n):
+        q.put(f"k{j}", (j, "s", j, f"t{j}", 0))
+    q.flush()
+    dups = q.duplicates
+    q.close()
+    want = list(range(acked, n))
+    ok = got == want and dups == n
+    print(f"crash test: replayed={len(got)} expected={len(want)} in_order={got == want} "
+          f"re-put ignored={dups}/{n} -> {'ok' if ok else 'FAILED'}")
+    return ok
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        crash_child(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+    ap = argparse.ArgumentParser(description="Durable queue enqueue throughput, group commit on/off, plus crash replay.")
+    ap.add_argument("--dir", default=None, help="directory on the storage to test (default: a temp dir)")
+    ap.add_argument("--events", type=int, default=2000)
+    ap.add_argument("--bursts", default="1,10,100", help="events per get_logs batch (comma list)")
+    args = ap.parse_args()
+
+    d = args.dir or tempfile.mkdtemp(prefix="tgqueue-")
+    fs = fsync_latency(d)
+    print(f"storage {d}: fsync p50={pct(fs, .5) * 1e3:.2f}ms p99={pct(fs, .99) * 1e3:.2f}ms")
+
+    print(f"\n{'burst':>6s} {'mode':>8s} {'events/s':>10s} {'commits':>8s} {'flush p50':>10s} {'flush p99':>10s}")
+    bad = 0
+    for burst in [int(x) for x in args.bursts.split(",")]:
+        for group in (False, True):
+            rate, commits, stored, lat = run(d, args.events, burst, group)
+            bad += stored != args.events
+            print(f"{burst:6d} {'group' if group else 'single':>8s} {rate:10,.0f} {commits:8d} "
+                  f"{pct(lat, .5) * 1e3:9.2f}ms {pct(lat, .99) * 1e3:9.2f}ms")
+
+    print()
+    bad += not crash_test(d)
+    print("PASS" if not bad else "FAIL")
+    sys.exit(1 if bad else 0)
+
+if __name__ == "__main__":
+    main()
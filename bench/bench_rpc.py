@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# Pooled multi-endpoint RPC (pi_common.rpc) against local stub JSON-RPC servers (bench/stubrpc.py)
+# with injected latency and faults; no chain needed. Scenarios:
+#   routing    three endpoints at 10/40/80 ms: share of reads on the fastest
+#   hedging    two endpoints with rare 500 ms spikes: read p50/p99 without and with hedging
+#   faults     the preferred endpoint starts failing (HTTP 500, dropped connections, rate limits,
+#              hangs) mid-run: caller-visible errors, requests still sent to it after ejection
+#   recovery   the failed endpoint comes back: half-open probe, breaker closed, traffic returns
+#   keepalive  TCP connections opened vs. requests served
+# Non-zero exit if any check fails.
+#   python3 bench/bench_rpc.py --reads 400
+import os, sys, time, argparse
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from web3 import Web3
+from pi_common.rpc import PooledHTTPProvider, RpcPool
+from stubrpc import StubRPC
+
+def pct(xs, f):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(f * len(xs)))] if xs else float("nan")
+
+def reads(w3, n):
+    """Latencies (s) and caller-visible errors for n eth_blockNumber reads."""
+    lat, errors = [], 0
+    for _ in range(n):
+        t0 = time.perf_counter()
+        try:
+            w3.eth.block_number
+        except Exception:
+            errors += 1
+        lat.append(time.perf_counter() - t0)
+    return lat, errors
+
+def pool_w3(stubs, **kw):
+    pool = RpcPool([s.url for s in stubs], **kw)
+    return Web3(PooledHTTPProvider(pool)), pool
+
+def check(ok, label, fails):
+    print(f"  {'ok  ' if ok else 'FAIL'} {label}")
+    return fails + (not ok)
+
+def main():
+    ap = argparse.ArgumentParser(description="Pooled RPC: routing, hedging, failover and keep-alive against stub servers.")
+    ap.add_argument("--reads", type=int, default=400, help="reads per scenario")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+    n, fails = args.reads, 0
+
+    print("routing: endpoints at 10 / 40 / 80 ms")
+    stubs = [StubRPC(lat, 0.004, seed=args.seed + i).start() for i, lat in enumerate((0.04, 0.01, 0.08))]
+    w3, pool = pool_w3(stubs, hedge=False)
+    lat, errors = reads(w3, n)
+    share = stubs[1].requests / max(1, sum(s.requests for s in stubs))
+    print(f"  requests per endpoint {[s.requests for s in stubs]}, fastest share {share:.0%}, "
+          f"p50 {pct(lat, .5) * 1000:.1f}ms")
+    fails = check(share >= 0.9 and not errors, "fastest endpoint takes >= 90% of reads", fails)
+    pool.close(); [s.stop() for s in stubs]
+
+    print("hedging: two endpoints at 20 ms, 3% of requests +500 ms")
+    rows = {}
+    for hedge in (False, True):
+        stubs = [StubRPC(0.02, 0.004, spike_p=0.03, spike_s=0.5, seed=args.seed + 10 + i).start() for i in range(2)]
+        w3, pool = pool_w3(stubs, hedge=hedge, hedge_min_s=0.03)
+        lat, errors = reads(w3, n)
+        rows[hedge] = (pct(lat, .99), errors)
+        print(f"  hedge={'on ' if hedge else 'off'} p50 {pct(lat, .5) * 1000:6.1f}ms p99 {pct(lat, .99) * 1000:6.1f}ms "
+              f"max {max(lat) * 1000:6.1f}ms hedges {pool.hedges} (won {pool.hedge_wins}) "
+              f"extra requests {sum(s.requests for s in stubs) - n}")
+        pool.close(); [s.stop() for s in stubs]
+    fails = check(rows[True][0] < rows[False][0] / 2 and not rows[True][1], "hedged p99 < half of unhedged p99", fails)
+
+    for fault in ("500", "drop", "ratelimit", "hang"):
+        print(f"faults: preferred endpoint goes '{fault}' after {n // 4} reads")
+        stubs = [StubRPC(0.01, 0.002, hang_s=5.0).start(), StubRPC(0.03, 0.002).start(), StubRPC(0.05, 0.002).start()]
+        w3, pool = pool_w3(stubs, timeout=1.0, hedge_min_s=0.03, breaker_failures=3, cooldown_s=0.5, max_cooldown_s=2.0,
+                          err_halflife_s=0.5)
+        lat, errors = reads(w3, n // 4)
+        stubs[0].mode = fault
+        before = stubs[0].requests
+        lat2, errors2 = reads(w3, n // 2)
+        sent_bad = stubs[0].requests - before
+        ep0 = pool.endpoints[0]
+        print(f"  caller errors {errors + errors2}, requests to the failed endpoint {sent_bad} "
+              f"(ejections {ep0.ejections}), failovers {pool.failovers}, hedges {pool.hedges}, "
+              f"p99 during fault {pct(lat2, .99) * 1000:.0f}ms")
+        fails = check(errors + errors2 == 0, "no caller-visible errors", fails)
+        fails = check(sent_bad <= 3 + 8, "failed endpoint demoted/ejected, only probes afterwards", fails)
+
+        if fault == "500":
+            print("recovery: endpoint healthy again")
+            stubs[0].mode = "ok"
+            time.sleep(pool.max_cooldown_s + 1.0)
+            before = stubs[0].requests
+            reads(w3, n // 4)
+            back = stubs[0].requests - before
+            print(f"  state {ep0.state}, requests to it after recovery {back}/{n // 4}")
+            fails = check(ep0.state == "closed" and back >= n // 8, "breaker closed and traffic returned", fails)
+        pool.close(); [s.stop() for s in stubs]
+
+    print("keepalive: one endpoint, sequential reads")
+    stub = StubRPC(0.002, 0.0).start()
+    w3, pool = pool_w3([stub])
+    reads(w3, n)
+    print(f"  {stub.requests} requests over {stub.connections} TCP connection(s)")
+    fails = check(stub.connections <= 2, "connections reused", fails)
+    pool.close(); stub.stop()
+
+    print("PASS" if not fails else "FAIL")
+    sys.exit(1 if fails else 0)
+
+if __name__ == "__main__":
+    main()
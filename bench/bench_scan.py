@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# Benchmark: blocks/sec scanned by TokenGate's LogScanner against a local dev chain.
+#   cd TokenGate/chain && npx hardhat node            # terminal 1
+#   python3 bench/bench_scan.py --blocks 20000        # terminal 2
+# Env: RPCURL (default http://127.0.0.1:8545), GATE_ADDRESS (optional; any address works)
+import os, sys, time, argparse
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "TokenGate", "pi"))
+from web3 import Web3
+from logscan import LogScanner
+
+CONFIGS = [
+    # (label, chunk, workers, max_chunk)
+    ("single-range",     10**9, 1, 10**9),
+    ("fixed-500 x1",       500, 1,   500),
+    ("adaptive x1",        500, 1, 10_000),
+    ("adaptive x4",        500, 4, 10_000),
+    ("adaptive x8",        500, 8, 10_000),
+]
+
+def main():
+    ap = argparse.ArgumentParser(description="LogScanner blocks/sec benchmark")
+    ap.add_argument("--blocks", type=int, default=20_000, help="scan the last N blocks (mined if missing)")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    w3 = Web3(Web3.HTTPProvider(os.getenv("RPCURL", "http://127.0.0.1:8545"), request_kwargs={"timeout": 60}))
+    if not w3.is_connected():
+        print("ERROR: no dev chain at RPCURL (start `npx hardhat node`)", file=sys.stderr); sys.exit(2)
+    addr = Web3.to_checksum_address(os.getenv("GATE_ADDRESS", "0x" + "00" * 19 + "01"))
+
+    tip = w3.eth.block_number
+    if tip + 1 < args.blocks:
+        w3.provider.make_request("hardhat_mine", [hex(args.blocks - tip)])
+        tip = w3.eth.block_number
+    start = tip - args.blocks + 1
+
+    def get_logs(lo, hi):
+        return w3.eth.get_logs({"fromBlock": lo, "toBlock": hi, "address": addr})
+
+    print(f"range {start}..{tip} ({args.blocks} blocks), best of {args.repeat}")
+    for label, chunk, workers, max_chunk in CONFIGS:
+        best, reqs, nlogs = None, 0, 0
+        for _ in range(args.repeat):
+            found = []
+            sc = LogScanner(get_logs, chunk=chunk, max_chunk=max_chunk, workers=workers)
+            t0 = time.perf_counter()
+            sc.scan(start, tip, found.extend)
+            dt = time.perf_counter() - t0
+            sc.close()
+            if best is None or dt < best:
+                best, reqs, nlogs = dt, sc.requests, len(found)
+        print(f"{label:>14}: {args.blocks / best:12.0f} blocks/s  {reqs:5d} requests  {nlogs} logs")
+
+if __name__ == "__main__":
+    main()
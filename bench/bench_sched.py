@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# Pulse scheduling policies under a synthetic deposit storm. The worker loop's decisions
+# (scheduler.Scheduler + policy, skip_center) are replayed on a virtual clock with the
+# worker's servo timings (open for `value` s, 0.6s centring, 0.5s for a zero pulse), so
+# hours of storm run in a second. Reports gate-busy utilisation, the share of busy time the
+# gate is actually open, open/close cycles and queue waits (overall, small senders, whale).
+#   python3 bench/bench_sched.py --deposits 600 --load 1.5
+import os, sys, random, argparse
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "TokenGate", "pi"))
+from scheduler import Scheduler, make_policy, POLICY_NAMES
+from servo_pwm import percentile
+
+CENTER_AFTER_S, CENTER_ZERO_S = 0.6, 0.5  # tokengate_pi worker timings
+
+def storm(n, load, whale_share=0.2, small_senders=40, seed=1):
+    """(t_arrival, entry) list; mean offered gate time per second of storm = `load`."""
+    rng = random.Random(seed)
+    items = []
+    for i in range(n):
+        if rng.random() < whale_share:
+            sender, value = "whale", rng.randint(15, 40)
+        else:
+            sender, value = f"s{rng.randrange(small_senders):02d}", (0 if rng.random() < 0.05 else rng.randint(1, 5))
+        items.append((sender, value))
+    mean_cost = sum(max(v, 0) + CENTER_AFTER_S for _, v in items) / n
+    rate = load / mean_cost
+    t, out = 0.0, []
+    for i, (sender, value) in enumerate(items):
+        t += rng.expovariate(rate)
+        out.append((t, (i, (value, sender, 1000 + i, f"0x{i:064x}", 0), t)))
+    return out
+
+def simulate(arrivals, policy, skip_center):
+    now = [0.0]
+    sched = Scheduler(policy, skip_center, clock=lambda: now[0])
+    waits = {}
+    i = 0
+
+    def offer():
+        nonlocal i
+        batch = []
+        while i < len(arrivals) and arrivals[i][0] <= now[0]:
+            batch.append(arrivals[i][1]); i += 1
+        sched.offer(batch)
+
+    while True:
+        offer()
+        job = sched.next_job(now[0])
+        if job is None:
+            if sched.is_open:
+                now[0] += CENTER_AFTER_S; sched.account(CENTER_AFTER_S); sched.centered()
+                continue
+            if i < len(arrivals):
+                now[0] = arrivals[i][0]; continue
+            break
+        for _, item, t_ready in job.entries:
+            waits.setdefault(item[1], []).append(now[0] - t_ready)
+        t0, open_s, skipped = now[0], 0.0, False
+        if job.value <= 0:
+            if sched.needs_center(job):
+                now[0] += CENTER_ZERO_S
+            else:
+                skipped = True
+            sched.centered()
+        else:
+            sched.opened()
+            now[0] += job.value; open_s = job.value
+            offer()
+            if sched.close_after(job):
+                now[0] += CENTER_AFTER_S; sched.centered()
+            else:
+                skipped = True
+        sched.account(now[0] - t0, open_s, skipped)
+    return sched.stats.summary(now[0]), waits
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare pulse scheduling policies under a deposit storm.")
+    ap.add_argument("--deposits", type=int, default=600)
+    ap.add_argument("--load", type=float, default=1.5, help="offered gate time per second (>1 = backlog grows)")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    arrivals = storm(args.deposits, args.load, seed=args.seed)
+    span = arrivals[-1][0]
+    print(f"storm: {args.deposits} deposits over {span:.0f}s, offered load {args.load:.2f}\n")
+    print(f"{'policy':6s} {'skip':>4s} {'makespan':>9s} {'busy':>6s} {'open%':>6s} {'cycles':>7s} {'skipped':>8s} "
+          f"{'wait p50':>9s} {'p95':>7s} {'small p95':>10s} {'whale p95':>10s}")
+    for name in POLICY_NAMES:
+        for skip in (False, True):
+            st, waits = simulate(arrivals, make_policy(name), skip)
+            small = [w for s, ws in waits.items() if s != "whale" for w in ws]
+            print(f"{name:6s} {('on' if skip else 'off'):>4s} {st['elapsed_s']:8.0f}s {st['busy_util']:6.2f} "
+                  f"{st['open_share'] * 100:5.1f}% {st['cycles']:7d} {st['centers_skipped']:8d} "
+                  f"{st['wait_p50_s']:8.1f}s {st['wait_p95_s']:6.1f}s {percentile(small, .95):9.1f}s "
+                  f"{percentile(waits.get('whale', []), .95):9.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# Servo PWM jitter harness: drives ServoPWM (and the old sleep-based loop for comparison)
+# into a fake gpiod line that timestamps every edge, optionally under CPU load, and
+# checks period / pulse-width jitter percentiles. Exit status 1 if a limit is exceeded.
+# p99 limits are off by default: tails mostly measure the host (VMs, 1-CPU boxes).
+#   python3 bench/bench_servo_pwm.py --seconds 5 --load 2
+import os, sys, time, threading, argparse
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "TokenGate", "pi"))
+from fakes import FakeLine
+from servo_pwm import ServoPWM, PERIOD_S, percentile
+
+POSITIONS_US = (1500, 2400, 600)
+
+def legacy_drive(line, high_us, duration_s):
+    """The pre-engine drive_servo_us: sleep-based, one call per position."""
+    high_s = high_us / 1e6
+    for _ in range(max(1, int(duration_s / PERIOD_S))):
+        line.set_value(1); time.sleep(high_s)
+        line.set_value(0); time.sleep(PERIOD_S - high_s)
+
+def load_thread(stop):
+    x = 0
+    while not stop.is_set():
+        x = (x * 31 + 7) % 1_000_003  # pure-Python busy loop competing for the GIL/CPU
+
+def analyse(line, requested_us):
+    pulses = line.pulses()
+    widths = [abs(w - requested_us[min(range(len(requested_us)), key=lambda i: abs(requested_us[i] / 1e6 - w))] / 1e6)
+              for _, w in pulses]
+    periods = [abs((b[0] - a[0]) - PERIOD_S) for a, b in zip(pulses, pulses[1:])]
+    us = lambda s: s * 1e6
+    return {
+        "pulses": len(pulses),
+        "period_p50_us": us(percentile(periods, .5)), "period_p99_us": us(percentile(periods, .99)),
+        "width_p50_us": us(percentile(widths, .5)), "width_p99_us": us(percentile(widths, .99)),
+    }
+
+def run(kind, seconds, n_load):
+    line, stop = FakeLine(), threading.Event()
+    loads = [threading.Thread(target=load_thread, args=(stop,), daemon=True) for _ in range(n_load)]
+    for t in loads: t.start()
+    step = seconds / len(POSITIONS_US)
+    if kind == "engine":
+        pwm = ServoPWM(line).start()
+        for us in POSITIONS_US:
+            pwm.set_position(us); time.sleep(step)
+        pwm.stop()
+    else:
+        for us in POSITIONS_US:
+            legacy_drive(line, us, step)
+    stop.set()
+    return analyse(line, POSITIONS_US)
+
+def main():
+    ap = argparse.ArgumentParser(description="ServoPWM jitter harness")
+    ap.add_argument("--seconds", type=float, default=6.0)
+    ap.add_argument("--load", type=int, default=1, help="number of CPU-burning threads")
+    ap.add_argument("--max-width-p50-us", type=float, default=100.0)
+    ap.add_argument("--max-period-p50-us", type=float, default=200.0)
+    ap.add_argument("--max-width-p99-us", type=float, default=None)
+    ap.add_argument("--max-period-p99-us", type=float, default=None)
+    args = ap.parse_args()
+
+    ok = True
+    for kind in ("legacy", "engine"):
+        r = run(kind, args.seconds, args.load)
+        print(f"{kind:>6}: " + "  ".join(f"{k}={v:.0f}" for k, v in r.items()))
+        if kind == "engine":
+            for key in ("width_p50_us", "period_p50_us", "width_p99_us", "period_p99_us"):
+                limit = getattr(args, "max_" + key)
+                if limit is not None and r[key] > limit:
+                    print(f"  {key}={r[key]:.0f} exceeds {limit:.0f}"); ok = False
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# Cold start of both Pi apps: each start is a fresh interpreter (python -X importtime) with simulated
+# hardware (fakes.FakeHardware, OLED bytes at 400kHz I2C timing) against a local chain, stopped with
+# SIGINT once the app prints its [Boot] report (pi_common/boot.py). Per app: median time-to-first-frame,
+# time-to-ready and the other boot stages over --runs starts (seconds since exec), and the packages with
+# the most import time. Written as JSON (--out) with the commit; --baseline fails if the first frame or
+# ready got slower by more than --tolerance. Non-zero exit also if the first frame waits for web3 or an
+# app never gets ready.
+#   python3 bench/bench_startup.py --runs 5                   # eth-tester chain in this process
+#   python3 bench/bench_startup.py --baseline startup.json    # compare with an earlier run
+import os, sys, json, time, signal, argparse, tempfile, subprocess, statistics, threading
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, ".."))
+sys.path.insert(0, HERE)
+import devchain
+from devchain import DEV_KEY, commit
+
+I2C_S_PER_BYTE = 25e-6
+APPS = {
+    "state_button_oled": os.path.join(ROOT, "ButtonToContract", "pi", "state_button_oled.py"),
+    "tokengate_pi": os.path.join(ROOT, "TokenGate", "pi", "tokengate_pi.py"),
+}
+# fresh interpreter: fake gpiod/luma, then the app as __main__ (its own dir on sys.path, like `python3 app.py`)
+RUNNER = ("import sys, runpy; sys.path[:0] = [{here!r}, {appdir!r}]; from fakes import FakeHardware, LiveButtonLine; "
+          "FakeHardware({{17: LiveButtonLine()}}, i2c_delay_s={delay!r}).install(); sys.argv = [{app!r}]; "
+          "runpy.run_path({app!r}, run_name='__main__')")
+
+def start_once(app, env, timeout):
+    """One cold start: ([Boot] report or None, -X importtime lines, wall seconds to the report)."""
+    path = APPS[app]
+    code = RUNNER.format(here=HERE, appdir=os.path.dirname(path), app=path, delay=I2C_S_PER_BYTE)
+    t0 = time.monotonic()
+    proc = subprocess.Popen([sys.executable, "-X", "importtime", "-c", code], cwd=env["BENCH_TMP"], env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    err = []
+    threading.Thread(target=lambda: err.extend(proc.stderr), daemon=True).start()
+    killer = threading.Timer(timeout, proc.kill); killer.start()
+    report = None
+    for line in proc.stdout:
+        if line.startswith("[Boot] "):
+            report = json.loads(line[7:])
+            break
+    wall = time.monotonic() - t0
+    killer.cancel()
+    if proc.poll() is None:
+        proc.send_signal(signal.SIGINT)
+    try:
+        proc.communicate(timeout=20)
+    except subprocess.TimeoutExpired:
+        proc.kill(); proc.communicate()
+    if report is None:
+        print("".join(err[-20:]), file=sys.stderr)
+    return report, [ln for ln in err if ln.startswith("import time:")], wall
+
+def import_costs(lines):
+    """Self import time per top-level package, ms (threads import concurrently, so nesting is
+    unreliable; self times are still per module)."""
+    out = {}
+    for ln in lines[1:] if lines and "self [us]" in lines[0] else lines:
+        try:
+            self_us, _, name = ln.split(":", 1)[1].split("|")
+            root = name.strip().split(".")[0]
+            out[root] = out.get(root, 0.0) + int(self_us) / 1000
+        except ValueError:
+            continue
+    return out
+
+def app_env(app, url, switch, gate, key, tmp):
+    env = dict(os.environ, METRICS_LOG_S="0", BENCH_TMP=tmp)
+    if app == "state_button_oled":
+        env.update(RPC_URL=url, CHAIN_ID=str(switch.w3.eth.chain_id), CONTRACT_ADDRESS=switch.address,
+                   PRIVATE_KEY=key, MAX_FEE_GWEI="50", MAX_PRIORITY_FEE_GWEI="1")
+    else:
+        env.update(RPCURL=url, GATE_ADDRESS=gate.address, GATES_FILE=os.path.join(tmp, "none.json"),
+                   QUEUE_FILE=os.path.join(tmp, "q.sqlite"), CHECKPOINT_FILE=os.path.join(tmp, "ckpt.json"))
+    return env
+
+def interpreter_s(runs):
+    """Bare `python -c pass` for reference: the part of every stage no app change can remove."""
+    xs = []
+    for _ in range(runs):
+        t0 = time.monotonic()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        xs.append(time.monotonic() - t0)
+    return statistics.median(xs)
+
+def main():
+    ap = argparse.ArgumentParser(description="Cold-start time-to-first-frame / time-to-ready of both Pi apps, with import costs.")
+    ap.add_argument("--chain", choices=("inproc", "hardhat"), default="inproc",
+                    help="inproc: eth-tester in this process; hardhat: node at RPCURL (npm run node)")
+    ap.add_argument("--apps", default=",".join(APPS), help="apps to start")
+    ap.add_argument("--runs", type=int, default=3, help="cold starts per app (medians reported)")
+    ap.add_argument("--top", type=int, default=8, help="packages listed by import time")
+    ap.add_argument("--timeout", type=float, default=120.0, help="per start, until the [Boot] report")
+    ap.add_argument("--out", default="bench_startup.json", help="JSON results file")
+    ap.add_argument("--baseline", help="earlier --out JSON to compare with")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed growth of first frame / ready vs. the baseline")
+    args = ap.parse_args()
+    fails = 0
+
+    if args.chain == "inproc":
+        from inprocchain import InprocChain
+        chain = InprocChain(1.0).start()
+        url, key, stop_chain = chain.url, chain.keys[0], chain.stop
+    else:
+        url, key, stop_chain = devchain.RPCURL, DEV_KEY, lambda: None
+    results = {}
+    try:
+        w3 = devchain.connect(url)
+        switch = devchain.deploy(w3, "ButtonToContract", "Switch", False)
+        _, gate = devchain.deploy_tokengate(w3)
+        base_s = interpreter_s(args.runs)
+        print(f"interpreter startup (python -c pass): {base_s:.3f}s\n")
+        for app in filter(None, args.apps.split(",")):
+            reports, imports = [], {}
+            for i in range(args.runs):
+                with tempfile.TemporaryDirectory(prefix="bench_startup_") as tmp:
+                    report, lines, wall = start_once(app, app_env(app, url, switch, gate, key, tmp), args.timeout)
+                if report is None:
+                    print(f"  FAIL {app}: no [Boot] report within {args.timeout:.0f}s"); fails += 1
+                    break
+                reports.append(report)
+                for pkg, ms in import_costs(lines).items():
+                    imports.setdefault(pkg, []).append(ms)
+            if not reports:
+                continue
+            names = sorted({s for r in reports for s in r["stages"]}, key=lambda s: reports[0]["stages"].get(s, 1e9))
+            stages = {s: round(statistics.median(r["stages"][s] for r in reports if s in r["stages"]), 3) for s in names}
+            top = sorted(((pkg, statistics.median(v)) for pkg, v in imports.items()), key=lambda kv: -kv[1])
+            results[app] = {"runs": len(reports), "first_frame_s": stages.get("first_frame"),
+                            "ready_s": stages.get("ready"), "stages": stages,
+                            "imports_ms": {pkg: round(ms, 1) for pkg, ms in top[:args.top]}}
+            print(f"{app}: median of {len(reports)} cold starts (s since exec)")
+            for s, t in stages.items():
+                print(f"  {s:>12s} {t:7.3f}")
+            print("  import time by package (self, ms): " + ", ".join(f"{p} {ms:.0f}" for p, ms in top[:args.top]))
+            ff, web3 = stages.get("first_frame"), stages.get("web3")
+            if ff is None or stages.get("ready") is None:
+                print(f"  FAIL {app}: no first_frame/ready stage"); fails += 1
+            elif web3 is not None and ff >= web3:
+                print(f"  FAIL {app}: first frame ({ff:.3f}s) not before web3 loaded ({web3:.3f}s)"); fails += 1
+            print()
+    finally:
+        stop_chain()
+
+    result = {"bench": "startup", "commit": commit(), "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+              "interpreter_s": round(base_s, 3) if results else None, "args": vars(args), "apps": results}
+    with open(args.out, "w") as f:
+        json.dump(result, f, indent=1)
+    print(f"results: {args.out}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            base = json.load(f)
+        print(f"vs. {args.baseline} (commit {base.get('commit')})")
+        for app, cur in results.items():
+            for k in ("first_frame_s", "ready_s"):
+                a, b = base.get("apps", {}).get(app, {}).get(k), cur[k]
+                if a is None or b is None:
+                    continue
+                worse = b > a * (1 + args.tolerance) and b - a > 0.05
+                print(f"  {app:>18s} {k:>14s} {a:7.3f} -> {b:7.3f}s{'  REGRESSION' if worse else ''}")
+                fails += worse
+    print("PASS" if not fails else "FAIL")
+    sys.exit(1 if fails else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# Local dev-chain helpers shared by the benchmarks.
+# Needs a running Hardhat node (`npm run node` in TokenGate/chain or ButtonToContract/chain)
+# and compiled artifacts (`npm run compile` in the project whose contracts are deployed).
+import os, sys, json, subprocess
+from web3 import Web3
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+RPCURL = os.getenv("RPCURL", "http://127.0.0.1:8545")
+WSURL  = os.getenv("WSURL",  "ws://127.0.0.1:8545")
+# Hardhat node account #0 (well-known dev key); whoever deploys the Switch with it is the owner
+DEV_KEY = os.getenv("DEV_KEY", "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80")
+
+def connect(url=RPCURL) -> Web3:
+    w3 = Web3(Web3.HTTPProvider(url, request_kwargs={"timeout": 60}))
+    if not w3.is_connected():
+        print(f"ERROR: no dev chain at {url} (start `npm run node` in a chain/ folder)", file=sys.stderr)
+        sys.exit(2)
+    w3.eth.default_account = w3.eth.accounts[0]  # Hardhat node accounts are unlocked
+    return w3
+
+def artifact(project, name):
+    path = os.path.join(ROOT, project, "chain", "artifacts", "contracts", f"{name}.sol", f"{name}.json")
+    try:
+        with open(path) as f:
+            art = json.load(f)
+    except OSError:
+        print(f"ERROR: missing {path} (run `npm run compile` in {project}/chain)", file=sys.stderr)
+        sys.exit(2)
+    return art["abi"], art["bytecode"]
+
+def deploy(w3, project, name, *args):
+    abi, bytecode = artifact(project, name)
+    txh = w3.eth.contract(abi=abi, bytecode=bytecode).constructor(*args).transact()
+    rcpt = w3.eth.wait_for_transaction_receipt(txh)
+    return w3.eth.contract(address=rcpt.contractAddress, abi=abi)
+
+def deploy_tokengate(w3):
+    """Deploy TokenGateToken + TokenGate and pre-approve the gate for the deployer."""
+    token = deploy(w3, "TokenGate", "TokenGateToken")
+    gate  = deploy(w3, "TokenGate", "TokenGate", token.address)
+    w3.eth.wait_for_transaction_receipt(token.functions.approve(gate.address, 2**255).transact())
+    return token, gate
+
+def deposit(w3, gate, tokens):
+    """Deposit `tokens` whole tokens (GatePulse value = tokens // 100); returns the receipt."""
+    txh = gate.functions.deposit(Web3.to_wei(tokens, "ether")).transact()
+    return w3.eth.wait_for_transaction_receipt(txh)
+
+def pct(xs, f):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(f * len(xs)))] if xs else float("nan")
+
+def commit():
+    """Short hash of the checked-out commit, to tag benchmark results."""
+    try:
+        return subprocess.run(["git", "-C", ROOT, "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
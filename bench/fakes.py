@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# Simulated hardware for the benchmarks: stand-ins for gpiod v1 lines/chips.
+import sys, time, types, threading
+
+class FakeLine:
+    """gpiod v1 output line that records (time.monotonic(), value) for every set_value()."""
+    def __init__(self, offset=0):
+        self.offset = offset
+        self.value = 0
+        self.edges = []
+        self._lock = threading.Lock()
+
+    def request(self, consumer="", type=None, default_val=0, flags=0):
+        self.value = default_val
+
+    def set_value(self, v):
+        t = time.monotonic()
+        with self._lock:
+            if v != self.value:
+                self.edges.append((t, v))
+            self.value = v
+
+    def get_value(self):
+        return self.value
+
+    def release(self):
+        pass
+
+    def pulses(self):
+        """[(rise_t, width_s)] for every complete high pulse."""
+        out, rise = [], None
+        with self._lock:
+            edges = list(self.edges)
+        for t, v in edges:
+            if v == 1:
+                rise = t
+            elif rise is not None:
+                out.append((rise, t - rise)); rise = None
+        return out
+
+class FakeChip:
+    def __init__(self, path=""):
+        self.lines = {}
+
+    def get_line(self, offset):
+        return self.lines.setdefault(offset, FakeLine(offset))
+
+    def close(self):
+        pass
+
+class FakeSSD1306:
+    """luma ssd1306 stand-in: emulates GDDRAM addressing (horizontal mode) and counts I2C bytes.
+
+    `display(image)` behaves like luma's full-frame update; `command`/`data`
+    honour COLUMNADDR/PAGEADDR windows so partial updates can be verified
+    against `ram`.
+    """
+    mode = "1"
+
+    def __init__(self, width=128, height=64, i2c_delay_s=0.0):
+        self.width, self.height = width, height
+        self.size = (width, height)
+        self._colstart = 0
+        self.ram = bytearray(width * height // 8)
+        self.i2c_delay_s = i2c_delay_s  # simulated bus time per byte (400kHz I2C ~ 25µs)
+        self.bytes = self.transfers = 0
+        self._win = (0, width - 1, 0, height // 8 - 1)
+        self._ptr = (0, 0)
+
+    def _bus(self, n):
+        self.bytes += n; self.transfers += 1
+        if self.i2c_delay_s:
+            time.sleep(n * self.i2c_delay_s)
+
+    def command(self, *cmd):
+        self._bus(len(cmd))
+        if len(cmd) == 6 and cmd[0] == 0x21 and cmd[3] == 0x22:
+            self._win = (cmd[1], cmd[2], cmd[4], cmd[5])
+            self._ptr = (cmd[1], cmd[4])
+
+    def data(self, data):
+        self._bus(len(data))
+        c0, c1, p0, p1 = self._win
+        c, p = self._ptr
+        for b in data:
+            self.ram[p * self.width + c] = b
+            c += 1
+            if c > c1:
+                c, p = c0, (p + 1 if p < p1 else p0)
+        self._ptr = (c, p)
+
+    def display(self, image):
+        from PIL import Image
+        img = image.convert("1")
+        raw = img.transpose(Image.Transpose.TRANSPOSE).tobytes()
+        rev = bytes(int(f"{i:08b}"[::-1], 2) for i in range(256))
+        raw = raw.translate(rev)
+        pages = self.height // 8
+        self.command(0x21, 0, self.width - 1, 0x22, 0, pages - 1)
+        self.data(list(b"".join(raw[p::pages] for p in range(pages))))
+
+    def clear(self):
+        self.ram = bytearray(len(self.ram))
+
+class FakeChain:
+    """In-memory chain stand-in with reorgs, for the ingest/confirmation harnesses.
+
+    Blocks carry GatePulse-shaped logs ({blockNumber, blockHash, logIndex,
+    transactionHash, value}); get_header/get_logs mimic the RPC views. With
+    `topic0` set, mine() also takes (value, address) pairs and logs get the
+    real address/topics/data encoding, so gatepulse.decode_batch can read them.
+    """
+    def __init__(self, seed=0, topic0=None):
+        import random
+        self.rng = random.Random(seed)
+        self.topic0 = topic0
+        self.mined_at = {}  # transactionHash -> time.monotonic() when mined
+        self.blocks = []
+        self._tx = 0
+        self.mine()  # genesis
+
+    def _hash(self):
+        return "0x%064x" % self.rng.getrandbits(256)
+
+    def mine(self, values=()):
+        n = len(self.blocks)
+        h = self._hash()
+        logs = []
+        now, ts = time.monotonic(), int(time.time())
+        for i, v in enumerate(values):
+            self._tx += 1
+            lg = {"blockNumber": n, "blockHash": h, "logIndex": i,
+                  "transactionHash": "0x%064x" % self._tx, "value": v}
+            if self.topic0 is not None:
+                v, addr = v if isinstance(v, tuple) else (v, "0x" + "00" * 20)
+                lg.update(value=v, address=addr, topics=[self.topic0, b"\0" * 12 + bytes([self._tx % 250 + 1]) * 20],
+                          data=v.to_bytes(32, "big") + (v * 10**20).to_bytes(32, "big") + ts.to_bytes(32, "big"))
+            self.mined_at[lg["transactionHash"]] = now
+            logs.append(lg)
+        parent = self.blocks[-1]["hash"] if self.blocks else "0x" + "00" * 32
+        self.blocks.append({"number": n, "hash": h, "parentHash": parent, "logs": logs})
+        return self.blocks[-1]
+
+    def reorg(self, depth, new_blocks):
+        """Drop the last `depth` blocks and mine `new_blocks` (list of value lists) instead."""
+        del self.blocks[len(self.blocks) - depth:]
+        for values in new_blocks:
+            self.mine(values)
+
+    @property
+    def tip(self):
+        return len(self.blocks) - 1
+
+    def get_header(self, n):
+        b = self.blocks[-1] if n == "latest" else self.blocks[n]
+        return {"number": b["number"], "hash": b["hash"], "parentHash": b["parentHash"]}
+
+    def get_logs(self, lo, hi, address=None):
+        logs = [lg for b in self.blocks[lo:hi + 1] for lg in b["logs"]]
+        if address is None:
+            return logs
+        want = {a.lower() for a in ([address] if isinstance(address, str) else address)}
+        return [lg for lg in logs if lg.get("address", "").lower() in want]
+
+    def canonical_logs(self):
+        return {(lg["blockHash"], lg["logIndex"]) for b in self.blocks for lg in b["logs"]}
+
+class FakeEvent:
+    __slots__ = ("type", "sec", "nsec")
+    def __init__(self, type, t):
+        self.type, self.sec, self.nsec = type, int(t), int((t % 1.0) * 1e9)
+
+class FakeButtonLine:
+    """Scripted active-low push button as a gpiod v1 input line, on virtual time.
+
+    `presses` is [(t_down, hold_s)]; each press and release edge comes with a
+    burst of contact bounce (up to `bounce_edges` extra edges within
+    `bounce_s`). Supports edge events (event_wait / event_read_multiple) and
+    get_value(); clock() and sleep() drive the virtual time, so a polling loop
+    and an event loop can be compared over hours of simulated use. Sets
+    `stop_ev` once the virtual time passes `end_t`.
+    """
+    RISING_EDGE, FALLING_EDGE = 1, 2
+
+    def __init__(self, presses, end_t, stop_ev, bounce_edges=4, bounce_s=0.003, seed=1):
+        import random
+        rng = random.Random(seed)
+        self.edges = []  # (t, level), level 0 = pressed
+        for t_down, hold in presses:
+            for t, level in ((t_down, 0), (t_down + hold, 1)):
+                k = rng.randint(0, bounce_edges // 2) * 2  # even: the burst ends on `level`
+                ts = sorted(rng.uniform(0, min(bounce_s, hold / 2)) for _ in range(k))
+                self.edges.append((t, level))
+                for j, dt in enumerate(ts):
+                    self.edges.append((t + dt, level if j % 2 else 1 - level))
+        self.edges.sort()
+        self.end_t, self.stop_ev = end_t, stop_ev
+        self.now = 0.0
+        self._i = 0  # next undelivered edge
+
+    def request(self, consumer="", type=None, flags=0, default_val=0):
+        pass
+
+    def release(self):
+        pass
+
+    def clock(self):
+        return self.now
+
+    def _advance(self, t):
+        self.now = max(self.now, t)
+        if self.now >= self.end_t:
+            self.stop_ev.set()
+
+    def sleep(self, dt):
+        self._advance(self.now + dt)
+
+    def get_value(self):
+        import bisect
+        i = bisect.bisect_right(self.edges, (self.now, 2))
+        return self.edges[i - 1][1] if i else 1
+
+    def event_wait(self, sec=0, nsec=0):
+        timeout = sec + nsec / 1e9
+        if self._i < len(self.edges) and self.edges[self._i][0] <= self.now + timeout:
+            self._advance(self.edges[self._i][0])
+            return True
+        self._advance(self.now + timeout)
+        return False
+
+    def event_read_multiple(self):
+        out = []
+        while self._i < len(self.edges) and self.edges[self._i][0] <= self.now:
+            t, level = self.edges[self._i]
+            out.append(FakeEvent(self.FALLING_EDGE if level == 0 else self.RISING_EDGE, t))
+            self._i += 1
+        return out
+
+class LiveButtonLine:
+    """Active-low push button as a gpiod v1 edge-event input line on the real monotonic clock.
+
+    press(hold_s) is called from a driver thread and queues the press and
+    release edges (each with a burst of contact bounce) at their real times;
+    event_wait() sleeps until the next edge is due, like the kernel would.
+    Returns the release time, which is when the app should act on the press.
+    """
+    RISING_EDGE, FALLING_EDGE = 1, 2
+
+    def __init__(self, bounce_edges=4, bounce_s=0.003, seed=1):
+        import random
+        self.rng = random.Random(seed)
+        self.bounce_edges, self.bounce_s = bounce_edges, bounce_s
+        self.edges = []  # (t, level) not yet delivered, level 0 = pressed
+        self.level = 1
+        self._cond = threading.Condition()
+
+    def request(self, consumer="", type=None, flags=0, default_val=0):
+        pass
+
+    def release(self):
+        pass
+
+    def press(self, hold_s=0.1):
+        t_down = time.monotonic() + 0.001
+        t_up = t_down + hold_s
+        burst = []
+        for t, level in ((t_down, 0), (t_up, 1)):
+            k = self.rng.randint(0, self.bounce_edges // 2) * 2
+            ts = sorted(self.rng.uniform(0, min(self.bounce_s, hold_s / 2)) for _ in range(k))
+            burst.append((t, level))
+            burst += [(t + dt, level if j % 2 else 1 - level) for j, dt in enumerate(ts)]
+        with self._cond:
+            self.edges = sorted(self.edges + burst)
+            self._cond.notify_all()
+        return t_up
+
+    def get_value(self):
+        with self._cond:
+            due = self._due()
+            return due[-1][1] if due else self.level
+
+    def _due(self):
+        now = time.monotonic()
+        return [e for e in self.edges if e[0] <= now]
+
+    def event_wait(self, sec=0, nsec=0):
+        end = time.monotonic() + sec + nsec / 1e9
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self.edges and self.edges[0][0] <= now:
+                    return True
+                if now >= end:
+                    return False
+                nxt = self.edges[0][0] if self.edges else end
+                self._cond.wait(min(end, nxt) - now)
+
+    def event_read_multiple(self):
+        with self._cond:
+            due = self._due()
+            del self.edges[:len(due)]
+        if due:
+            self.level = due[-1][1]
+        return [FakeEvent(self.FALLING_EDGE if level == 0 else self.RISING_EDGE, t) for t, level in due]
+
+class FakeHardware:
+    """gpiod (v1 API) and luma (i2c + ssd1306) modules backed by the fakes above, so the Pi apps
+    import and run unchanged: install() before importing an app. Every chip, line and OLED the app
+    opens is kept here for inspection; `inputs` pre-wires input lines by offset (e.g. a LiveButtonLine).
+    """
+    def __init__(self, inputs=None, i2c_delay_s=0.0):
+        self.inputs = dict(inputs or {})
+        self.i2c_delay_s = i2c_delay_s
+        self.chips = {}  # path -> FakeChip
+        self.oleds = []
+
+    def reset(self, inputs=None):
+        """Forget the previous run's chips and OLEDs (the installed modules stay)."""
+        self.inputs = dict(inputs or {})
+        self.chips.clear(); self.oleds.clear()
+
+    def line(self, offset, path=None):
+        chip = self.chips[path] if path else next(iter(self.chips.values()))
+        return chip.get_line(offset)
+
+    def _chip(self, path=""):
+        if path not in self.chips:
+            chip = self.chips[path] = FakeChip(path)
+            chip.lines.update(self.inputs)
+        return self.chips[path]
+
+    def _ssd1306(self, serial=None, width=128, height=64, **kw):
+        dev = FakeSSD1306(width, height, self.i2c_delay_s)
+        self.oleds.append(dev)
+        return dev
+
+    def install(self):
+        gpiod = types.ModuleType("gpiod")
+        gpiod.Chip = self._chip
+        gpiod.LINE_REQ_DIR_IN, gpiod.LINE_REQ_DIR_OUT, gpiod.LINE_REQ_EV_BOTH_EDGES = 1, 2, 6
+        gpiod.LINE_REQ_FLAG_BIAS_PULL_UP = 32
+        serial = types.ModuleType("luma.core.interface.serial")
+        serial.i2c = lambda port=1, address=0x3C: ("i2c", port, address)
+        device = types.ModuleType("luma.oled.device")
+        device.ssd1306 = self._ssd1306
+        mods = {"gpiod": gpiod, "luma.core.interface.serial": serial, "luma.oled.device": device}
+        for name in ("luma", "luma.core", "luma.core.interface", "luma.oled"):
+            mods[name] = types.ModuleType(name)
+        sys.modules.update(mods)
+        return self
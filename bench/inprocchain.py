@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# In-process dev chain for the end-to-end benchmarks when no Hardhat node is running: eth-tester (py-evm)
+# behind a local JSON-RPC HTTP server, so the Pi apps talk to it through their normal HTTP providers.
+# Blocks are mined every `block_s` seconds (interval mining, like an L2 sequencer); the test accounts
+# are unlocked for eth_sendTransaction and their keys are in `keys`. Single-threaded EVM: requests
+# are served one at a time.
+# eth-tester's own pending block checks every tx against the last mined state, so it holds one tx per
+# sender; sent txs are kept in a mempool here instead (signed with the test keys if unsigned) and
+# applied in arrival order when the next block is mined, so a sender can have several in flight.
+# eth-tester also numbers logIndex per receipt; logs are renumbered block-wide, as a node does.
+import sys, json, time, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def _jsonable(x):
+    if isinstance(x, (bytes, bytearray)):
+        return "0x" + bytes(x).hex()
+    if isinstance(x, dict):
+        return {k: _jsonable(v) for k, v in x.items()}
+    if isinstance(x, (list, tuple)):
+        return [_jsonable(v) for v in x]
+    return x
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *a):
+        pass
+
+    def do_POST(self):
+        req = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        out = [self.server.answer(r) for r in req] if isinstance(req, list) else self.server.answer(req)
+        data = json.dumps(out).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+class InprocChain(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, block_s=2.0, port=0):
+        global Account, keccak
+        from eth_account import Account
+        from eth_utils import keccak
+        from eth_tester import EthereumTester
+        from web3 import Web3, EthereumTesterProvider
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.tester = EthereumTester()
+        self.tester.disable_auto_mine_transactions()
+        w3 = Web3(EthereumTesterProvider(self.tester), middleware=[])
+        self._send = w3.provider.request_func(w3, w3.middleware_onion)  # only eth-tester's own request/result mapping
+        self.keys = [k.to_hex() for k in self.tester.backend.account_keys]
+        self._key = {k.public_key.to_checksum_address().lower(): k.to_hex() for k in self.tester.backend.account_keys}
+        self.chain_id = self._send("eth_chainId", [])["result"]
+        self.mempool = []  # (sender, raw tx) for the next block
+        self._log_base = {}  # block number -> block-wide index of each tx's first log
+        self.block_s = block_s
+        self.requests = 0
+        self.lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def handle_error(self, request, client_address):
+        pass
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        threading.Thread(target=self._mine, name="miner", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.shutdown(); self.server_close()
+
+    def _mine(self):
+        t = time.monotonic()
+        while True:
+            t += self.block_s
+            if self._stop.wait(max(0.0, t - time.monotonic())):
+                return
+            with self.lock:
+                self._mine_block()
+
+    def _mine_block(self):
+        for _, raw in self.mempool:
+            try:
+                self.tester.backend.send_raw_transaction(raw)  # onto the block being built
+            except Exception as e:
+                print(f"[Chain] dropped tx 0x{keccak(raw).hex()}: {e}", file=sys.stderr)
+        self.mempool.clear()
+        self.tester.mine_blocks(1)
+
+    def _fix_logs(self, logs):
+        for lg in logs:
+            if isinstance(lg, dict) and "logIndex" in lg:
+                lg["logIndex"] += self._first_log(lg["blockNumber"])[lg["transactionIndex"]]
+        return logs
+
+    def _first_log(self, n):
+        if n not in self._log_base:
+            base, acc = [], 0
+            for txh in self._send("eth_getBlockByNumber", [hex(n), False])["result"]["transactions"]:
+                base.append(acc)
+                acc += len(self._send("eth_getTransactionReceipt", [txh])["result"]["logs"])
+            self._log_base[n] = base
+        return self._log_base[n]
+
+    def _queued(self, sender):
+        return sum(s == sender for s, _ in self.mempool)
+
+    def _sign(self, tx):
+        tx = {k: int(v, 16) if isinstance(v, str) and k not in ("from", "to", "data", "input") else v
+              for k, v in tx.items()}
+        sender = tx.pop("from").lower()
+        tx["data"] = tx.pop("input", tx.get("data", "0x"))
+        tx.setdefault("chainId", self.chain_id)
+        tx.setdefault("value", 0)
+        if "nonce" not in tx:
+            tx["nonce"] = self._send("eth_getTransactionCount", [sender, "latest"])["result"] + self._queued(sender)
+        if "gasPrice" not in tx and "maxFeePerGas" not in tx:
+            base = self._send("eth_getBlockByNumber", ["latest", False])["result"]["baseFeePerGas"]
+            tx["maxPriorityFeePerGas"] = tx.get("maxPriorityFeePerGas", 10**9)
+            tx["maxFeePerGas"] = 2 * base + tx["maxPriorityFeePerGas"]
+        if "gas" not in tx:
+            tx["gas"] = self._send("eth_estimateGas", [dict(tx, **{"from": sender})])["result"]
+        return bytes(Account.sign_transaction(tx, self._key[sender]).raw_transaction)
+
+    def answer(self, req):
+        rid = req.get("id")
+        with self.lock:
+            self.requests += 1
+            try:
+                method, params = req["method"], req.get("params") or []
+                if method == "evm_mine":
+                    self._mine_block()
+                    return {"jsonrpc": "2.0", "id": rid, "result": "0x0"}
+                if method in ("eth_sendTransaction", "eth_sendRawTransaction"):
+                    raw = self._sign(params[0]) if method == "eth_sendTransaction" else bytes.fromhex(params[0][2:])
+                    sender = Account.recover_transaction(raw).lower()
+                    self.mempool.append((sender, raw))
+                    return {"jsonrpc": "2.0", "id": rid, "result": "0x" + keccak(raw).hex()}
+                if method == "eth_getTransactionCount" and params[1:] == ["pending"]:
+                    n = self._send(method, [params[0], "latest"])["result"]
+                    return {"jsonrpc": "2.0", "id": rid, "result": hex(n + self._queued(params[0].lower()))}
+                resp = self._send(method, params)
+                if method in ("eth_getLogs", "eth_getFilterLogs", "eth_getFilterChanges") and resp.get("result"):
+                    self._fix_logs(resp["result"])
+                elif method == "eth_getTransactionReceipt" and resp.get("result"):
+                    self._fix_logs(resp["result"]["logs"])
+            except Exception as e:
+                return {"jsonrpc": "2.0", "id": rid, "error": {"code": -32000, "message": str(e)}}
+        resp = _jsonable(dict(resp))
+        resp["id"] = rid
+        return resp
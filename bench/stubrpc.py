@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# Local stub JSON-RPC servers for the RPC benchmarks: a tiny fake chain behind HTTP/1.1 keep-alive
+# with injectable latency (base + jitter + rare spikes) and faults. Change `mode` at runtime:
+#   ok         answer normally
+#   500        HTTP 500
+#   ratelimit  HTTP 200 with JSON-RPC error -32005
+#   drop       close the connection without answering
+#   hang       sleep `hang_s` before answering (client timeouts)
+# Counts TCP connections, HTTP requests and batches so keep-alive reuse and batching can be checked.
+import json, time, random, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def _abi_string(text):
+    data = text.encode()
+    return "0x" + (32).to_bytes(32, "big").hex() + len(data).to_bytes(32, "big").hex() + data.ljust(32, b"\0").hex()
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *a):
+        pass
+
+    def do_POST(self):
+        srv = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with srv.lock:
+            srv.requests += 1
+            delay = srv.latency_s + srv.rng.uniform(0, srv.jitter_s)
+            if srv.rng.random() < srv.spike_p:
+                delay += srv.spike_s
+        mode = srv.mode
+        if mode == "drop":
+            self.close_connection = True
+            return
+        time.sleep(srv.hang_s if mode == "hang" else delay)
+        if mode == "500":
+            return self._send(500, b"upstream error")
+        req = json.loads(body)
+        if isinstance(req, list) and not srv.batch:
+            out = {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "batch requests are not supported"}}
+        elif isinstance(req, list):
+            with srv.lock:
+                srv.batches += 1
+            out = [srv.answer(r) for r in req]
+        else:
+            out = srv.answer(req)
+        self._send(200, json.dumps(out).encode())
+
+    def _send(self, code, data):
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+class StubRPC(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency_s=0.02, jitter_s=0.005, spike_p=0.0, spike_s=0.5, hang_s=30.0, seed=0, port=0, batch=True, block_s=0.0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency_s, self.jitter_s, self.spike_p, self.spike_s, self.hang_s = latency_s, jitter_s, spike_p, spike_s, hang_s
+        self.mode = "ok"
+        self.batch = batch  # False: answer batches with a single -32600 error, like some public RPCs
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.connections = self.requests = self.batches = 0
+        self.block = 100
+        self.block_s = block_s  # >0: a new block every block_s seconds
+        self._t0 = time.monotonic()
+        self.state = False
+        self.methods = {}  # method -> count
+        self._filters = 0
+
+    def handle_error(self, request, client_address):
+        pass  # clients hanging up on a slow/hung answer (timeouts, hedging) are expected
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown(); self.server_close()
+
+    def head(self):
+        return self.block + (int((time.monotonic() - self._t0) / self.block_s) if self.block_s else 0)
+
+    def answer(self, req):
+        m, rid = req.get("method"), req.get("id")
+        with self.lock:
+            self.methods[m] = self.methods.get(m, 0) + 1
+        if self.mode == "ratelimit":
+            return {"jsonrpc": "2.0", "id": rid, "error": {"code": -32005, "message": "rate limit exceeded"}}
+        if m == "eth_newFilter":
+            with self.lock:
+                self._filters += 1
+                res = hex(self._filters)
+        else:
+            res = {
+                "web3_clientVersion": "stubrpc/1.0",
+                "eth_chainId": "0x7a69",
+                "eth_blockNumber": hex(self.head()),
+                "eth_getTransactionCount": "0x5",
+                "eth_call": _abi_string("ON" if self.state else "OFF"),  # Switch.readState()
+                "eth_getLogs": [],
+                "eth_getFilterChanges": [],
+                "eth_uninstallFilter": True,
+            }.get(m)
+        if res is None:
+            return {"jsonrpc": "2.0", "id": rid, "error": {"code": -32601, "message": f"method {m} not found"}}
+        return {"jsonrpc": "2.0", "id": rid, "result": res}
@@ -0,0 +1,2 @@
+# Shared helpers for the Pi apps (ButtonToContract/pi, TokenGate/pi).
+# The apps put the repo root on sys.path and import `pi_common.<module>`.
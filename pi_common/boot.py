@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Staged cold start for the Pi apps: stage timestamps, boot threads, a report.
+
+Importing web3 takes seconds on a Pi Zero-class board, so the apps import
+only what the display and GPIO need, show a first frame, and load web3 (and
+connect) on a boot thread meanwhile. Boot.mark(stage) records when a stage
+was reached, in seconds since the process was exec'd (from /proc/self/stat,
+so interpreter startup and module imports count); Boot.background() runs a
+step on its own thread and marks it when done. Boot.report() prints
+`[Boot] {json}` with time-to-first-frame and time-to-ready and, with
+BOOT_PROFILE set, appends it to that file to track them across releases.
+bench/bench_startup.py runs both apps cold and compares with a baseline.
+"""
+import os, sys, json, time, threading
+from concurrent.futures import Future
+
+def process_start():
+    """time.monotonic() at process start; now if /proc is not there."""
+    try:
+        with open("/proc/self/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        started = int(fields[19]) / os.sysconf("SC_CLK_TCK")  # field 22: starttime, ticks after boot
+        return time.monotonic() - (time.clock_gettime(time.CLOCK_BOOTTIME) - started)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.monotonic()
+
+class Boot:
+    def __init__(self, app, t0=None):
+        self.app = app
+        self.t0 = process_start() if t0 is None else t0
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def mark(self, stage):
+        """Seconds since process start at which `stage` was reached (first mark wins)."""
+        t = round(time.monotonic() - self.t0, 3)
+        with self._lock:
+            return self.stages.setdefault(stage, t)
+
+    def background(self, stage, fn, *args):
+        """fn(*args) on a boot thread; marks `stage` when it returns. result() re-raises,
+        including SystemExit from a config check."""
+        fut = Future()
+        def run():
+            try:
+                res = fn(*args)
+            except BaseException as e:
+                self.mark(stage); fut.set_exception(e)
+            else:
+                self.mark(stage); fut.set_result(res)
+        threading.Thread(target=run, name=f"boot-{stage}", daemon=True).start()
+        return fut
+
+    def report(self) -> dict:
+        with self._lock:
+            stages = dict(sorted(self.stages.items(), key=lambda kv: kv[1]))
+        out = {"app": self.app, "first_frame_s": stages.get("first_frame"), "ready_s": stages.get("ready"),
+               "stages": stages}
+        print(f"[Boot] {json.dumps(out, separators=(',', ':'))}", flush=True)
+        path = os.getenv("BOOT_PROFILE")
+        if path:
+            try:
+                with open(path, "a") as f:
+                    f.write(json.dumps(dict(out, at=time.strftime("%Y-%m-%dT%H:%M:%S%z"))) + "\n")
+            except OSError as e:
+                print(f"[Boot] cannot write {path}: {e}", file=sys.stderr)
+        return out
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Latest-wins display thread: the only code that touches the I2C bus.
+
+Callers (servo worker, RPC/toggle loop) post render requests into a single
+slot and return immediately; a newer request simply replaces one that has
+not been drawn yet, so a slow transfer never stretches hardware timing and a
+backlog of stale frames can never build up. Frames are drawn at most `fps`
+times per second; superseded requests are counted as coalesced. Frames
+handed to prerender() are rendered into the Oled cache while the thread has
+nothing to draw (boot screens, the states the app is about to show).
+"""
+import sys, threading, time
+from collections import deque
+
+class DisplayService:
+    """Non-blocking front for a pi_common.oled.Oled (same lines/center/clear API)."""
+    def __init__(self, oled, fps=10.0):
+        self.oled = oled
+        self.min_gap_s = 1.0 / fps if fps else 0.0
+        self.posted = self.drawn = self.coalesced = self.errors = self.prerendered = 0
+        self._slot = None
+        self._warm = deque()  # (method, args) to render ahead while idle
+        self._stop = False
+        self._busy = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="display", daemon=True)
+        self._thread.start()
+
+    # ----- producer API (never blocks on the bus) -----
+    def post(self, method, *args):
+        with self._cond:
+            if self._slot is not None:
+                self.coalesced += 1
+            self._slot = (method, args)
+            self.posted += 1
+            self._cond.notify()
+
+    def lines(self, lines):          self.post("lines", tuple(lines))
+    def center(self, text, note=None): self.post("center", text, note)
+    def clear(self):                 self.post("clear")
+
+    def prerender(self, frames):
+        """Render (method, *args) frames, e.g. ("center", "ON", "Press to toggle"), when idle."""
+        with self._cond:
+            self._warm.extend((f[0], tuple(f[1:])) for f in frames)
+            self._cond.notify()
+
+    def flush(self, timeout=2.0) -> bool:
+        """Wait until the latest posted frame has been drawn (shutdown screens)."""
+        end = time.monotonic() + timeout
+        with self._cond:
+            while self._slot is not None or self._busy:
+                left = end - time.monotonic()
+                if left <= 0:
+                    return False
+                self._cond.wait(left)
+        return True
+
+    def stop(self, timeout=2.0):
+        self.flush(timeout)
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        self._thread.join(timeout=timeout)
+
+    def stats(self) -> dict:
+        return {"posted": self.posted, "drawn": self.drawn, "coalesced": self.coalesced,
+                "bytes_sent": self.oled.bytes_sent, "identical_skipped": self.oled.skipped,
+                "prerendered": self.prerendered}
+
+    # ----- display thread -----
+    def _run(self):
+        last = 0.0
+        while True:
+            with self._cond:
+                while self._slot is None and not self._stop and not self._warm:
+                    self._cond.wait()
+                if self._slot is None and self._stop:
+                    return
+                warm = self._warm.popleft() if self._slot is None else None
+            if warm is not None:
+                try:
+                    self.oled.prerender(warm[0], *warm[1])
+                    self.prerendered += 1
+                except Exception as e:
+                    print(f"[Display] prerender error: {e}", file=sys.stderr)
+                continue
+            # rate limit; requests posted meanwhile replace the pending one
+            wait = last + self.min_gap_s - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            with self._cond:
+                method, args = self._slot
+                self._slot = None
+                self._busy = True
+            try:
+                getattr(self.oled, method)(*args)
+                self.drawn += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"[Display] error: {e}", file=sys.stderr)
+            last = time.monotonic()
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
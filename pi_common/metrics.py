@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Counters, gauges and fixed-bucket histograms for the Pi apps, exposed as
+Prometheus text on a local HTTP endpoint and as a periodic log line.
+
+Instruments are created once at import time, module level, and updated on
+the hot paths: Histogram.observe() is a bisect over a short tuple of bucket
+bounds plus two adds under an uncontended lock, Counter.inc() one add; no
+allocation per update, and nothing is summed or formatted until a scrape or
+a log line asks for it. Labelled instruments hand out one child per label
+value (a dict lookup; keep a reference to it in tight loops); unlabelled
+ones are returned as the instrument itself.
+
+Gauges and counters can also read an existing number at collection time
+(set_function), e.g. a queue's qsize() or a pipeline's `failed` count.
+
+Exporter(port, log_s).start() serves GET /metrics on `addr` (127.0.0.1 by
+default) and prints `[Metrics] {json}` every log_s seconds: counters and
+gauges as values, histograms as n / sum / p50 / p95 estimated from the
+buckets. bench/bench_metrics.py measures the update cost.
+"""
+import sys, json, threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(v):
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names, values, extra=""):
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _num(v):
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+# ---------- Instruments ----------
+class Counter:
+    __slots__ = ("value", "_fn", "_lock")
+    def __init__(self):
+        self.value, self._fn = 0, None
+        self._lock = threading.Lock()
+
+    def inc(self, n=1):
+        with self._lock:
+            self.value += n
+
+    def set_function(self, fn):
+        """Report fn() instead of the counted value (an existing monotonic count)."""
+        self._fn = fn
+
+    def get(self):
+        if self._fn is None:
+            return self.value
+        try:
+            return self._fn()
+        except Exception:
+            return None  # left out of this collection
+
+class Gauge(Counter):
+    __slots__ = ()
+    def set(self, v):
+        self.value = v
+
+    def dec(self, n=1):
+        self.inc(-n)
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last: above the largest bound (+Inf)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, v):
+        i = bisect_left(self.bounds, v)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += v
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum
+
+    def quantile(self, q, counts=None):
+        """Estimate from the buckets (linear within a bucket, like histogram_quantile)."""
+        counts = counts if counts is not None else self.snapshot()[0]
+        n = sum(counts)
+        if not n:
+            return None
+        rank, seen = q * n, 0
+        for i, c in enumerate(counts):
+            if seen + c >= rank and c:
+                if i == len(self.bounds):
+                    return self.bounds[-1]
+                lo = self.bounds[i - 1] if i else 0.0
+                return lo + (self.bounds[i] - lo) * (rank - seen) / c
+            seen += c
+        return self.bounds[-1]
+
+class Family:
+    """A named instrument and its children, one per label value tuple."""
+    def __init__(self, kind, name, help, labels, make):
+        self.kind, self.name, self.help, self.labelnames = kind, name, help, tuple(labels)
+        self._make = make
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._make()
+        return child
+
+    def children(self):
+        with self._lock:
+            return list(self._children.items())
+
+# ---------- Registry ----------
+class Registry:
+    def __init__(self):
+        self.families = {}
+        self._lock = threading.Lock()
+
+    def _add(self, kind, name, help, labels, make):
+        with self._lock:
+            fam = self.families.get(name)
+            if fam is None:
+                fam = self.families[name] = Family(kind, name, help, labels, make)
+            elif fam.kind != kind or fam.labelnames != tuple(labels):
+                raise ValueError(f"metric {name} already registered as a {fam.kind} {fam.labelnames}")
+        return fam if fam.labelnames else fam.labels()  # unlabelled: the instrument itself
+
+    def counter(self, name, help, labels=()):
+        return self._add("counter", name, help, labels, Counter)
+
+    def gauge(self, name, help, labels=()):
+        return self._add("gauge", name, help, labels, Gauge)
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS, labels=()):
+        bounds = tuple(sorted(buckets))
+        return self._add("histogram", name, help, labels, lambda: Histogram(bounds))
+
+    def render(self) -> str:
+        """Prometheus text exposition format 0.0.4."""
+        out = []
+        for fam in list(self.families.values()):
+            out.append(f"# HELP {fam.name} {fam.help}")
+            out.append(f"# TYPE {fam.name} {fam.kind}")
+            for values, child in fam.children():
+                if fam.kind != "histogram":
+                    v = child.get()
+                    if v is not None:
+                        out.append(f"{fam.name}{_labels(fam.labelnames, values)} {_num(v)}")
+                    continue
+                counts, total = child.snapshot()
+                cum = 0
+                for bound, c in zip(child.bounds + ("+Inf",), counts):
+                    cum += c
+                    le = 'le="' + (bound if bound == "+Inf" else _num(float(bound))) + '"'
+                    out.append(f"{fam.name}_bucket{_labels(fam.labelnames, values, le)} {cum}")
+                out.append(f"{fam.name}_sum{_labels(fam.labelnames, values)} {_num(float(total))}")
+                out.append(f"{fam.name}_count{_labels(fam.labelnames, values)} {cum}")
+        return "\n".join(out) + "\n"
+
+    def summary(self) -> dict:
+        """Compact snapshot for the log line; instruments without data are left out."""
+        out = {}
+        for fam in list(self.families.values()):
+            series = {}
+            for values, child in fam.children():
+                key = ",".join(map(str, values)) if values else None
+                if fam.kind == "histogram":
+                    counts, total = child.snapshot()
+                    n = sum(counts)
+                    if not n:
+                        continue
+                    p50, p95 = child.quantile(0.5, counts), child.quantile(0.95, counts)
+                    v = {"n": n, "sum": round(total, 4), "p50": round(p50, 4), "p95": round(p95, 4)}
+                else:
+                    v = child.get()
+                    if v is None:
+                        continue
+                    v = round(v, 4) if isinstance(v, float) else v
+                series[key] = v
+            if series:
+                out[fam.name] = series[None] if list(series) == [None] else series
+        return out
+
+REGISTRY = Registry()
+counter, gauge, histogram = REGISTRY.counter, REGISTRY.gauge, REGISTRY.histogram
+
+# ---------- Exporter ----------
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *a):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404); return
+        body = self.server.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class Exporter:
+    """/metrics endpoint (port > 0) and a [Metrics] JSON line every log_s seconds (log_s > 0)."""
+    def __init__(self, port=0, log_s=60.0, addr="127.0.0.1", registry=REGISTRY):
+        self.port, self.log_s, self.addr, self.registry = port, log_s, addr, registry
+        self.server = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self.port:
+            try:
+                self.server = ThreadingHTTPServer((self.addr, self.port), _Handler)
+            except OSError as e:
+                print(f"[Metrics] cannot serve on {self.addr}:{self.port}: {e}", file=sys.stderr)
+            else:
+                self.server.daemon_threads = True
+                self.server.registry = self.registry
+                threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True).start()
+                print(f"[Metrics] http://{self.addr}:{self.server.server_address[1]}/metrics")
+        if self.log_s > 0:
+            threading.Thread(target=self._log_loop, name="metrics-log", daemon=True).start()
+        return self
+
+    def log(self):
+        print(f"[Metrics] {json.dumps(self.registry.summary(), separators=(',', ':'))}", flush=True)
+
+    def _log_loop(self):
+        while not self._stop.wait(self.log_s):
+            self.log()
+
+    def stop(self):
+        """Stop serving; prints a last log line (if logging) so short runs report too."""
+        self._stop.set()
+        if self.server is not None:
+            self.server.shutdown(); self.server.server_close()
+        if self.log_s > 0:
+            self.log()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Cached, diff-based SSD1306 rendering shared by both Pi apps.
+
+Frames are rendered once per distinct content: fonts and text metrics are
+cached, and finished frames (already packed into SSD1306 page order) sit in an
+LRU keyed by the layout and its line tuple. Each new frame is compared with
+what the panel currently shows; only the changed column span of each changed
+8-pixel page is sent over I2C, and an identical frame costs no transfer at all.
+Devices without the SSD1306 addressing commands fall back to `display(image)`.
+Frame renders (cache misses) and transfers are timed in oled_render_seconds
+and oled_transfer_seconds; cache hits and identical frames are not.
+"""
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from PIL import Image, ImageDraw, ImageFont
+from pi_common import metrics
+
+COLUMNADDR, PAGEADDR = 0x21, 0x22
+WINDOW_OVERHEAD = 6  # command bytes to address one window
+
+FRAME_BUCKETS    = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+RENDER_SECONDS   = metrics.histogram("oled_render_seconds", "OLED frame render + page packing (cache misses)", FRAME_BUCKETS)
+TRANSFER_SECONDS = metrics.histogram("oled_transfer_seconds", "OLED frame I2C transfer (changed windows only)", FRAME_BUCKETS)
+TRANSFER_BYTES   = metrics.counter("oled_transfer_bytes_total", "OLED bytes sent over I2C")
+
+# bit-reversal table: PIL packs pixels MSB-first, SSD1306 pages are LSB = top row
+_REV = bytes(int(f"{i:08b}"[::-1], 2) for i in range(256))
+
+@lru_cache(maxsize=8)
+def load_font(path=None, size=12):
+    """Truetype font at `path` (default bitmap font if None or missing)."""
+    if path:
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            pass
+    return ImageFont.load_default()
+
+@lru_cache(maxsize=512)
+def text_size(font, text):
+    box = font.getbbox(text)
+    return box[2], box[3]
+
+def pack_pages(img):
+    """1-bit image -> SSD1306 GDDRAM bytes (page-major, one byte = 8 rows of a column)."""
+    w, h = img.size
+    raw = img.transpose(Image.Transpose.TRANSPOSE).tobytes().translate(_REV)
+    per_col = h // 8
+    return b"".join(raw[p::per_col] for p in range(per_col))
+
+class Oled:
+    """SSD1306 front-end with a frame LRU and partial (page/column window) updates."""
+    def __init__(self, dev, font=None, cache_size=64):
+        self.dev = dev
+        self.width, self.height = dev.size
+        self.pages = self.height // 8
+        self.font = font or load_font()
+        box = self.font.getbbox("A")
+        self.line_h = (box[3] - box[1]) + 2
+        self._colstart = getattr(dev, "_colstart", 0)
+        self._partial = hasattr(dev, "command") and hasattr(dev, "data")
+        self._frames = OrderedDict()
+        self._cache_size = cache_size
+        self._shown = None
+        self.frames = self.skipped = self.cache_hits = self.bytes_sent = 0
+
+    # ----- layouts -----
+    def lines(self, lines):
+        """Lines stacked from the top-left corner."""
+        return self.show(("lines",) + tuple(lines), self._draw_lines)
+
+    def center(self, text, note=None):
+        """`text` centred on the panel, optional `note` centred along the bottom."""
+        return self.show(("center", text, note), self._draw_center)
+
+    def clear(self):
+        return self.show(("clear",), lambda d, key: None)
+
+    def prerender(self, method, *args):
+        """Render the frame `method(*args)` would show into the cache; nothing is sent."""
+        if method == "lines":
+            self.render(("lines",) + tuple(args[0]), self._draw_lines)
+        elif method == "center":
+            self.render(("center",) + (args + (None,))[:2], self._draw_center)
+
+    def _draw_lines(self, d, key):
+        y = 0
+        for ln in key[1:]:
+            d.text((0, y), ln, 255, font=self.font)
+            y += self.line_h
+
+    def _draw_center(self, d, key):
+        _, text, note = key
+        w, h = text_size(self.font, text)
+        d.text(((self.width - w) // 2, (self.height - h) // 2), text, 255, font=self.font)
+        if note:
+            w2, h2 = text_size(self.font, note)
+            d.text(((self.width - w2) // 2, self.height - h2 - 2), note, 255, font=self.font)
+
+    # ----- frame cache + transfer -----
+    def render(self, key, draw):
+        frame = self._frames.get(key)
+        if frame is not None:
+            self._frames.move_to_end(key)
+            self.cache_hits += 1
+            return frame
+        t0 = time.monotonic()
+        img = Image.new("1", (self.width, self.height), 0)
+        draw(ImageDraw.Draw(img), key)
+        frame = (img, pack_pages(img))
+        RENDER_SECONDS.observe(time.monotonic() - t0)
+        self._frames[key] = frame
+        if len(self._frames) > self._cache_size:
+            self._frames.popitem(last=False)
+        return frame
+
+    def show(self, key, draw):
+        """Render (or reuse) the frame for `key` and push only what changed; returns bytes sent."""
+        img, buf = self.render(key, draw)
+        self.frames += 1
+        if buf == self._shown:
+            self.skipped += 1
+            return 0
+        t0 = time.monotonic()
+        if not self._partial:
+            self.dev.display(img)
+            sent = len(buf)
+        else:
+            sent = self._push(buf)
+        TRANSFER_SECONDS.observe(time.monotonic() - t0)
+        TRANSFER_BYTES.inc(sent)
+        self._shown = buf
+        self.bytes_sent += sent
+        return sent
+
+    def _push(self, buf):
+        w, old = self.width, self._shown
+        spans = []  # (page, first_col, last_col)
+        for p in range(self.pages):
+            row = buf[p * w:(p + 1) * w]
+            if old is None:
+                spans.append((p, 0, w - 1)); continue
+            prev = old[p * w:(p + 1) * w]
+            if row == prev:
+                continue
+            c0 = next(i for i in range(w) if row[i] != prev[i])
+            c1 = next(i for i in range(w - 1, -1, -1) if row[i] != prev[i])
+            spans.append((p, c0, c1))
+
+        # one bounding window if that is cheaper than addressing each page separately
+        per_page = sum(c1 - c0 + 1 + WINDOW_OVERHEAD for _, c0, c1 in spans)
+        p0, p1 = spans[0][0], spans[-1][0]
+        c0, c1 = min(s[1] for s in spans), max(s[2] for s in spans)
+        if (p1 - p0 + 1) * (c1 - c0 + 1) + WINDOW_OVERHEAD <= per_page:
+            spans = [(p0, c0, c1, p1)]
+        else:
+            spans = [(p, a, b, p) for p, a, b in spans]
+
+        sent = 0
+        for pa, a, b, pb in spans:
+            self.dev.command(COLUMNADDR, self._colstart + a, self._colstart + b, PAGEADDR, pa, pb)
+            data = [byte for p in range(pa, pb + 1) for byte in buf[p * w + a:p * w + b + 1]]
+            self.dev.data(data)
+            sent += len(data) + WINDOW_OVERHEAD
+        return sent
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Pooled JSON-RPC client over several HTTP endpoints, with a web3 provider on top.
+
+Each Endpoint keeps a keep-alive requests.Session and tracks its own health:
+an EWMA of latency and of the error rate, a window of recent latencies for a
+p95, and a circuit breaker. RpcPool routes every request to the healthy
+endpoint with the best score (latency EWMA weighted by the error EWMA, which
+fades with a half-life so a demoted endpoint is tried again later):
+
+  reads     if the chosen endpoint has not answered by its own p95 (clamped to
+            hedge_min_s..hedge_max_s), the same request is sent to the next
+            best endpoint and the first good answer wins
+  writes    (eth_sendRawTransaction) not hedged, but failed over
+  filters   eth_newFilter & co. are node-local: the filter id is pinned to the
+            endpoint that created it, and never hedged
+
+A transport error, HTTP 429/5xx, a non-JSON body or a rate-limit error from
+the node counts against the endpoint and the request moves on to the next
+one; other JSON-RPC errors are real answers and are returned. After
+`breaker_failures` consecutive failures an endpoint is ejected for
+`cooldown_s` (doubling up to max_cooldown_s while it keeps failing); after
+the cooldown one probe request is let through and a success closes the
+breaker again. If every endpoint is ejected, the one due back first is tried
+anyway rather than failing without a request.
+
+PooledHTTPProvider / AsyncPooledHTTPProvider plug the pool into Web3 /
+AsyncWeb3, including JSON-RPC batch requests (one pool request per batch,
+see rpcbatch.py); they answer eth_chainId from memory after the first time. RPC URLs are given comma-separated (RPC_URL / RPCURL).
+bench/bench_rpc.py exercises routing, hedging and failover against local
+stub servers (bench/stubrpc.py). Every pool request is timed per method
+(rpc_request_seconds, hedging and failover included; batches as "batch")
+and requests that end in an endpoint error count in rpc_errors_total.
+"""
+import sys, time, asyncio, threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
+from requests.adapters import HTTPAdapter
+from web3.providers.base import JSONBaseProvider
+from web3.providers.async_base import AsyncJSONBaseProvider
+from pi_common import metrics
+
+WRITE_METHODS  = {"eth_sendRawTransaction", "eth_sendTransaction"}
+FILTER_CREATE  = {"eth_newFilter", "eth_newBlockFilter", "eth_newPendingTransactionFilter"}
+FILTER_METHODS = {"eth_getFilterChanges", "eth_getFilterLogs", "eth_uninstallFilter"}
+RATE_LIMIT_CODES = {-32005, 429}
+
+RPC_SECONDS = metrics.histogram("rpc_request_seconds", "JSON-RPC request latency by method", labels=("method",))
+RPC_ERRORS  = metrics.counter("rpc_errors_total", "JSON-RPC requests that failed on every endpoint", labels=("method",))
+
+def split_urls(value):
+    """'https://a, https://b' -> ['https://a', 'https://b']"""
+    return [u.strip() for u in (value or "").split(",") if u.strip()]
+
+class EndpointError(OSError):
+    """The endpoint failed (not a JSON-RPC error answer)."""
+
+class Endpoint:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, url, timeout=20.0, alpha=0.2, pool_size=4, err_halflife_s=30.0):
+        self.url, self.timeout, self.alpha = url, timeout, alpha
+        self.err_halflife_s = err_halflife_s
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter); self.session.mount("https://", adapter)
+        self.lat = None   # EWMA seconds
+        self.err = 0.0    # EWMA of failures (0..1), fading with time since the last one
+        self.err_t = 0.0
+        self.recent = deque(maxlen=64)
+        self.state = self.CLOSED
+        self.fails = 0
+        self.open_until = 0.0
+        self.cooldown_s = 0.0
+        self.calls = self.errors = self.ejections = 0
+        self._lock = threading.Lock()
+
+    def p95(self):
+        xs = sorted(self.recent)
+        return xs[min(len(xs) - 1, int(0.95 * len(xs)))] if xs else None
+
+    def error_rate(self, now=None):
+        # decays while idle too, so an endpoint demoted by a few errors gets retried eventually
+        dt = (time.monotonic() if now is None else now) - self.err_t
+        return self.err * 0.5 ** (dt / self.err_halflife_s)
+
+    def score(self):
+        # unknown endpoints look fast, so each one gets tried early
+        return (self.lat if self.lat is not None else 0.0) * (1.0 + 4.0 * self.error_rate())
+
+    def post(self, body):
+        """Response dict, or EndpointError."""
+        t0 = time.monotonic()
+        try:
+            r = self.session.post(self.url, data=body, headers={"Content-Type": "application/json"}, timeout=self.timeout)
+            if r.status_code == 429 or r.status_code >= 500:
+                raise EndpointError(f"HTTP {r.status_code}")
+            r.raise_for_status()
+            resp = r.json()
+        except (requests.RequestException, ValueError) as e:
+            raise EndpointError(f"{type(e).__name__}: {e}") from e
+        for item in (resp if isinstance(resp, list) else [resp]):
+            err = item.get("error") if isinstance(item, dict) else None
+            if isinstance(err, dict) and (err.get("code") in RATE_LIMIT_CODES or "rate limit" in str(err.get("message", "")).lower()):
+                raise EndpointError(f"rate limited: {err.get('message')}")
+        return resp, time.monotonic() - t0
+
+    def ok(self, dt):
+        with self._lock:
+            self.calls += 1
+            self.lat = dt if self.lat is None else self.lat + self.alpha * (dt - self.lat)
+            now = time.monotonic()
+            self.err, self.err_t = (1.0 - self.alpha) * self.error_rate(now), now
+            self.recent.append(dt)
+            self.fails = 0
+            if self.state != self.CLOSED:
+                print(f"[RPC] {self.url} back in rotation", file=sys.stderr)
+            self.state, self.cooldown_s = self.CLOSED, 0.0
+
+    def slow(self, dt):
+        """Lost a hedge race after `dt`: at least that slow, answer still pending."""
+        with self._lock:
+            if self.lat is None or dt > self.lat:
+                self.lat = dt if self.lat is None else self.lat + self.alpha * (dt - self.lat)
+
+    def failed(self, breaker_failures, cooldown_s, max_cooldown_s):
+        with self._lock:
+            self.calls += 1; self.errors += 1
+            now = time.monotonic()
+            self.err, self.err_t = self.error_rate(now) + self.alpha * (1.0 - self.error_rate(now)), now
+            self.fails += 1
+            if self.state == self.HALF_OPEN or self.fails >= breaker_failures:
+                self.cooldown_s = min(max_cooldown_s, self.cooldown_s * 2 if self.cooldown_s else cooldown_s)
+                if self.state != self.OPEN:
+                    self.ejections += 1
+                    print(f"[RPC] {self.url} ejected for {self.cooldown_s:.1f}s", file=sys.stderr)
+                self.state, self.open_until = self.OPEN, time.monotonic() + self.cooldown_s
+
+    def admit(self, now) -> bool:
+        """May a request go here now? Moves an expired OPEN breaker to HALF_OPEN (one probe)."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and now >= self.open_until:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def stats(self) -> dict:
+        p95 = self.p95()
+        return {"url": self.url, "state": self.state, "calls": self.calls, "errors": self.errors,
+                "lat_ms": round(self.lat * 1000, 1) if self.lat is not None else None,
+                "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+                "err": round(self.error_rate(), 3), "ejections": self.ejections}
+
+class RpcPool:
+    def __init__(self, urls, timeout=20.0, alpha=0.2, hedge=True, hedge_min_s=0.05, hedge_max_s=2.0,
+                 breaker_failures=3, cooldown_s=5.0, max_cooldown_s=120.0, pool_size=4, err_halflife_s=30.0):
+        urls = split_urls(urls) if isinstance(urls, str) else list(urls)
+        if not urls:
+            raise ValueError("RpcPool needs at least one URL")
+        self.endpoints = [Endpoint(u, timeout, alpha, pool_size, err_halflife_s) for u in urls]
+        self.hedge, self.hedge_min_s, self.hedge_max_s = hedge, hedge_min_s, hedge_max_s
+        self.breaker_failures, self.cooldown_s, self.max_cooldown_s = breaker_failures, cooldown_s, max_cooldown_s
+        self.calls = self.hedges = self.hedge_wins = self.failovers = 0
+        self._pins = {}  # filter id -> Endpoint
+        self._exec = ThreadPoolExecutor(max_workers=2 * len(urls) + 2, thread_name_prefix="rpc")
+        self._lock = threading.Lock()
+
+    def ranked(self):
+        now = time.monotonic()
+        up = sorted((ep for ep in self.endpoints if ep.admit(now)), key=Endpoint.score)
+        if up:
+            return up
+        return sorted(self.endpoints, key=lambda ep: ep.open_until)[:1]
+
+    def _try(self, ep, body):
+        try:
+            resp, dt = ep.post(body)
+        except EndpointError as e:
+            ep.failed(self.breaker_failures, self.cooldown_s, self.max_cooldown_s)
+            return False, e
+        ep.ok(dt)
+        return True, resp
+
+    def _failover(self, eps, body, last=None):
+        for i, ep in enumerate(eps):
+            if i or last is not None:
+                self.failovers += 1
+            ok, res = self._try(ep, body)
+            if ok:
+                return ep, res
+            last = res
+        raise last
+
+    def _hedged(self, eps, body):
+        primary, backup = eps[0], eps[1]
+        deadline = min(self.hedge_max_s, max(self.hedge_min_s, primary.p95() or self.hedge_max_s))
+        t0 = time.monotonic()
+        f1 = self._exec.submit(self._try, primary, body)
+        done, _ = wait([f1], timeout=deadline)
+        if done:
+            ok, res = f1.result()
+            if ok:
+                return primary, res
+            return self._failover(eps[1:], body, res)
+        self.hedges += 1
+        f2 = self._exec.submit(self._try, backup, body)
+        pending, by = {f1, f2}, {f1: primary, f2: backup}
+        last = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                ok, res = f.result()
+                if ok:
+                    if f is f2:
+                        self.hedge_wins += 1
+                        primary.slow(time.monotonic() - t0)
+                    return by[f], res
+                last = res
+        return self._failover(eps[2:], body, last)
+
+    def request(self, method, params, body):
+        """JSON-RPC response dict for one request (`body` already encoded)."""
+        t0 = time.monotonic()
+        try:
+            return self._request(method, params, body)
+        except EndpointError:
+            RPC_ERRORS.labels(method).inc()
+            raise
+        finally:
+            RPC_SECONDS.labels(method).observe(time.monotonic() - t0)
+
+    def _request(self, method, params, body):
+        with self._lock:
+            self.calls += 1
+        pinned = self._pins.get(params[0]) if method in FILTER_METHODS and params else None
+        if pinned is not None:
+            ok, res = self._try(pinned, body)
+            if not ok:
+                raise res
+            if method == "eth_uninstallFilter":
+                self._pins.pop(params[0], None)
+            return res
+        ep, res = self._route(body, method not in WRITE_METHODS and method not in FILTER_CREATE)
+        if method in FILTER_CREATE and "result" in res:
+            self._pins[res["result"]] = ep
+        return res
+
+    def request_batch(self, requests, body):
+        """JSON-RPC batch (list of (method, params), `body` already encoded): one round trip.
+        Hedged only if every call is a plain read; filter calls in a batch are not pinned."""
+        t0 = time.monotonic()
+        with self._lock:
+            self.calls += 1
+        methods = {m for m, _ in requests}
+        try:
+            return self._route(body, not methods & (WRITE_METHODS | FILTER_CREATE | FILTER_METHODS))[1]
+        except EndpointError:
+            RPC_ERRORS.labels("batch").inc()
+            raise
+        finally:
+            RPC_SECONDS.labels("batch").observe(time.monotonic() - t0)
+
+    def _route(self, body, hedge):
+        eps = self.ranked()
+        if self.hedge and hedge and len(eps) > 1:
+            return self._hedged(eps, body)
+        return self._failover(eps, body)
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "hedges": self.hedges, "hedge_wins": self.hedge_wins, "failovers": self.failovers,
+                "endpoints": [ep.stats() for ep in self.endpoints]}
+
+    def close(self):
+        self._exec.shutdown(wait=False)
+        for ep in self.endpoints:
+            ep.session.close()
+
+def _by_id(resp):
+    # JSON-RPC does not promise batch answers in request order; a single object is a batch refusal
+    if isinstance(resp, list) and all(isinstance(r, dict) and r.get("id") is not None for r in resp):
+        return sorted(resp, key=lambda r: r["id"])
+    return resp
+
+def _cached(method, cache):
+    # eth_chainId never changes, but web3's validation asks for it around every eth_call
+    if method == "eth_chainId" and cache:
+        return {"jsonrpc": "2.0", "id": 0, "result": cache[0]}
+    return None
+
+def _remember(method, resp, cache):
+    if method == "eth_chainId" and "result" in resp:
+        cache[:] = [resp["result"]]
+    return resp
+
+class PooledHTTPProvider(JSONBaseProvider):
+    """Web3 provider backed by an RpcPool (a pool, a URL list or a comma-separated string)."""
+    def __init__(self, urls, **pool_kwargs):
+        super().__init__()
+        self.pool = urls if isinstance(urls, RpcPool) else RpcPool(urls, **pool_kwargs)
+        self._chain_id = []
+
+    @property
+    def calls(self):
+        return self.pool.calls
+
+    def make_request(self, method, params):
+        resp = _cached(method, self._chain_id)
+        if resp is None:
+            resp = _remember(method, self.pool.request(method, params, self.encode_rpc_request(method, params)), self._chain_id)
+        return resp
+
+    def make_batch_request(self, requests):
+        return _by_id(self.pool.request_batch(requests, self.encode_batch_rpc_request(requests)))
+
+class AsyncPooledHTTPProvider(AsyncJSONBaseProvider):
+    """AsyncWeb3 provider on the same pool; each request runs in a worker thread."""
+    def __init__(self, urls, **pool_kwargs):
+        super().__init__()
+        self.pool = urls if isinstance(urls, RpcPool) else RpcPool(urls, **pool_kwargs)
+        self._chain_id = []
+
+    @property
+    def calls(self):
+        return self.pool.calls
+
+    async def make_request(self, method, params):
+        resp = _cached(method, self._chain_id)
+        if resp is None:
+            resp = await asyncio.to_thread(self.pool.request, method, params, self.encode_rpc_request(method, params))
+            _remember(method, resp, self._chain_id)
+        return resp
+
+    async def make_batch_request(self, requests):
+        resp = await asyncio.to_thread(self.pool.request_batch, requests, self.encode_batch_rpc_request(requests))
+        return _by_id(resp)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Group independent web3 calls into one JSON-RPC batch request (one round trip).
+
+    batch = Batcher(w3)
+    tip, logs = batch.run(lambda: w3.eth.block_number,
+                          lambda: w3.eth.get_logs({...}),
+                          return_exceptions=True)
+
+Each argument is a zero-argument callable making one ordinary web3 call (a
+contract function's .call() works too). run() builds the requests with web3's
+own batching support, so parameters and results are formatted exactly as for
+single calls, sends them in one POST, and splits the response per call: a
+failing call raises (or, with return_exceptions=True, comes back as the
+exception in its slot) without affecting the others.
+
+Providers or nodes that refuse batches (no make_batch_request, or a single
+error object instead of a list) are detected on the first try; the calls are
+then made one by one and batching is retried after `retry_s`; callers that
+only batch speculatively can check batching() and take their plain path.
+Transport errors are not a reason to fall back and are raised as they are.
+
+piggyback(call, on_result) queues a call that is not urgent (e.g. the pending
+nonce at startup) to ride along with the next batch; on_result(value) runs
+after it, and a failed piggybacked call is simply dropped.
+
+stats() counts calls against HTTP round trips, i.e. how many were saved.
+AsyncBatcher is the same for an AsyncWeb3 (the callables return coroutines;
+the fallback sends the calls concurrently).
+"""
+import sys, time, asyncio, threading
+from web3.exceptions import Web3TypeError
+
+class BatchUnsupported(Exception):
+    """The provider or node does not accept JSON-RPC batches."""
+
+def _unsupported(e) -> bool:
+    # Web3TypeError: web3 itself refuses batching on this provider type (nothing was sent)
+    return isinstance(e, (NotImplementedError, Web3TypeError, BatchUnsupported))
+
+class _Base:
+    def __init__(self, w3, retry_s=600.0):
+        self.w3 = w3
+        self.retry_s = retry_s
+        self.supported = True
+        self.calls = self.round_trips = self.batches = self.fallbacks = 0
+        self._retry_at = 0.0
+        self._piggy = []
+        self._lock = threading.Lock()
+
+    def piggyback(self, call, on_result):
+        with self._lock:
+            self._piggy.append((call, on_result))
+
+    def _take(self, calls):
+        with self._lock:
+            piggy, self._piggy = self._piggy, []
+        return list(calls) + [c for c, _ in piggy], piggy
+
+    def batching(self) -> bool:
+        """Will the next run() send a batch? (False while a refusal is fresh.)"""
+        if not self.supported and time.monotonic() >= self._retry_at:
+            self.supported = True
+        return self.supported
+
+    def _use_batch(self, n) -> bool:
+        return n >= 2 and self.batching()
+
+    def _refused(self, e):
+        self.supported, self._retry_at = False, time.monotonic() + self.retry_s
+        print(f"[Batch] RPC does not take batches ({e}); sending calls one by one", file=sys.stderr)
+
+    def _finish(self, results, piggy, n, return_exceptions):
+        for (_, on_result), r in zip(piggy, results[n:]):
+            if not isinstance(r, Exception):
+                on_result(r)
+        out = results[:n]
+        if not return_exceptions:
+            for r in out:
+                if isinstance(r, Exception):
+                    raise r
+        return out
+
+    def _split(self, infos, responses):
+        if not isinstance(responses, list) or len(responses) != len(infos):
+            err = responses.get("error") if isinstance(responses, dict) else None
+            raise BatchUnsupported(err or "batch response is not a list")
+        out = []
+        for info, resp in zip(infos, responses):
+            try:
+                out.append(self.w3.manager._format_batched_response(info, resp))
+            except Exception as e:
+                out.append(e)
+        return out
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "round_trips": self.round_trips, "saved": self.calls - self.round_trips,
+                "batches": self.batches, "fallbacks": self.fallbacks, "batching": self.supported}
+
+class Batcher(_Base):
+    def run(self, *calls, return_exceptions=False):
+        """Results of `calls`, in order, from one round trip where possible."""
+        calls, piggy = self._take(calls)
+        n = len(calls) - len(piggy)
+        self.calls += len(calls)
+        if self._use_batch(len(calls)):
+            try:
+                results = self._batch(calls)
+                self.batches += 1; self.round_trips += 1
+                return self._finish(results, piggy, n, return_exceptions)
+            except Exception as e:
+                if not _unsupported(e):
+                    raise
+                self.round_trips += isinstance(e, BatchUnsupported)
+                self._refused(e)
+        self.fallbacks += len(calls) > 1
+        results = []
+        for call in calls:
+            self.round_trips += 1
+            try:
+                results.append(call())
+            except Exception as e:
+                results.append(e)
+        return self._finish(results, piggy, n, return_exceptions)
+
+    def _batch(self, calls):
+        with self.w3.batch_requests():
+            infos = [call() for call in calls]  # request info, nothing sent yet
+            send = self.w3.provider.batch_request_func(self.w3, self.w3.middleware_onion)
+            responses = send([info[0] for info in infos])
+        return self._split(infos, responses)
+
+class AsyncBatcher(_Base):
+    async def run(self, *calls, return_exceptions=False):
+        calls, piggy = self._take(calls)
+        n = len(calls) - len(piggy)
+        self.calls += len(calls)
+        if self._use_batch(len(calls)):
+            try:
+                results = await self._batch(calls)
+                self.batches += 1; self.round_trips += 1
+                return self._finish(results, piggy, n, return_exceptions)
+            except Exception as e:
+                if not _unsupported(e):
+                    raise
+                self.round_trips += isinstance(e, BatchUnsupported)
+                self._refused(e)
+        self.fallbacks += len(calls) > 1
+        self.round_trips += len(calls)
+        results = await asyncio.gather(*(call() for call in calls), return_exceptions=True)
+        return self._finish(list(results), piggy, n, return_exceptions)
+
+    async def _batch(self, calls):
+        async with self.w3.batch_requests():
+            infos = [await call() for call in calls]
+            send = await self.w3.provider.batch_request_func(self.w3, self.w3.middleware_onion)
+            responses = await send([info[0] for info in infos])
+        return self._split(infos, responses)